@@ -1,4 +1,4 @@
-from aws_cdk import RemovalPolicy, Stack, aws_s3 as s3
+from aws_cdk import Duration, RemovalPolicy, Stack, aws_s3 as s3
 from constructs import Construct
 from aws_cdk import CfnOutput
 from cdk.record_processing import RecordProcessing
@@ -9,6 +9,8 @@ from aws_cdk import aws_cognito as cognito
 from aws_cdk import aws_lambda as _lambda
 from aws_cdk import aws_secretsmanager as secretsmanager
 
+POWERTOOLS_LAYER_VERSION_ARN = "arn:aws:lambda:us-west-2:017000801446:layer:AWSLambdaPowertoolsPythonV3-python39-x86_64:18"
+
 
 class AudiologyApiStack(Stack):
 
@@ -23,6 +25,31 @@ class AudiologyApiStack(Stack):
             description="Layer for Audiology API error handling",
         )
 
+        # Powertools Metrics and Tracer, used by every handler
+        self.powertools_layer = _lambda.LayerVersion.from_layer_version_arn(
+            self,
+            "PowertoolsLayer",
+            layer_version_arn=POWERTOOLS_LAYER_VERSION_ARN,
+        )
+
+        self.metrics_layer = _lambda.LayerVersion(
+            self,
+            "AudiologyMetricsLayer",
+            code=_lambda.Code.from_asset("lambda/layers/audiology_metrics"),
+            compatible_runtimes=[_lambda.Runtime.PYTHON_3_13],
+            description="Layer for Audiology API metrics and tracing",
+        )
+
+        # Streaming uploads and template helpers shared by the record
+        # processor and completion recorder
+        self.common_layer = _lambda.LayerVersion(
+            self,
+            "AudiologyCommonLayer",
+            code=_lambda.Code.from_asset("lambda/layers/audiology_common"),
+            compatible_runtimes=[_lambda.Runtime.PYTHON_3_13],
+            description="Layer for Audiology API streaming uploads and templates",
+        )
+
         # Create Cognito User Pool at the top of the stack
         self.user_pool = cognito.UserPool(
             self,
@@ -80,6 +107,21 @@ class AudiologyApiStack(Stack):
             ),
             billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
             removal_policy=RemovalPolicy.DESTROY,
+            # Set on job creation; expired jobs are removed without a scan
+            time_to_live_attribute="expires_at",
+        )
+
+        # Lets GET /jobs list jobs by status, newest first, without a scan
+        self.audiology_table.add_global_secondary_index(
+            index_name="status-created_at-index",
+            partition_key=dynamodb.Attribute(
+                name="status", type=dynamodb.AttributeType.STRING
+            ),
+            sort_key=dynamodb.Attribute(
+                name="created_at", type=dynamodb.AttributeType.STRING
+            ),
+            projection_type=dynamodb.ProjectionType.INCLUDE,
+            non_key_attributes=["job_name", "completed_at"],
         )
 
         self.config_table = dynamodb.Table(
@@ -92,6 +134,17 @@ class AudiologyApiStack(Stack):
             removal_policy=RemovalPolicy.DESTROY,
         )
 
+        # Model-call leases of the record processors' fair-share scheduler
+        self.scheduler_table = dynamodb.Table(
+            self,
+            "ModelSchedulerTable",
+            partition_key=dynamodb.Attribute(
+                name="pool_id", type=dynamodb.AttributeType.STRING
+            ),
+            billing_mode=dynamodb.BillingMode.PAY_PER_REQUEST,
+            removal_policy=RemovalPolicy.DESTROY,
+        )
+
         self.bucket = s3.Bucket(
             self,
             "AudiologyBucket",
@@ -112,6 +165,13 @@ class AudiologyApiStack(Stack):
                     allowed_origins=["*"],
                     allowed_headers=["*"],
                     max_age=3000,
+                    # Lets browser clients read part ETags for multipart uploads
+                    exposed_headers=["ETag"],
+                )
+            ],
+            lifecycle_rules=[
+                s3.LifecycleRule(
+                    abort_incomplete_multipart_upload_after=Duration.days(1),
                 )
             ],
         )
@@ -131,6 +191,8 @@ class AudiologyApiStack(Stack):
             "WebSocketApi",
             job_table=self.audiology_table,
             error_layer=self.error_layer,
+            powertools_layer=self.powertools_layer,
+            metrics_layer=self.metrics_layer,
             user_pool_id=self.user_pool.user_pool_id,
             user_pool_client_id=self.user_pool_client.user_pool_client_id,
             api_keys_secret_name=self.api_keys_secret.secret_name,
@@ -142,9 +204,13 @@ class AudiologyApiStack(Stack):
             job_table=self.audiology_table,
             websocket_api_id=self.web_socket_api.websocket_api_id,
             config_table=self.config_table,
+            scheduler_table=self.scheduler_table,
             bucket=self.bucket,
             output_bucket=self.output_bucket,
             error_layer=self.error_layer,
+            powertools_layer=self.powertools_layer,
+            metrics_layer=self.metrics_layer,
+            common_layer=self.common_layer,
         )
 
         self.submission_api = SubmissionApi(
@@ -152,11 +218,16 @@ class AudiologyApiStack(Stack):
             "SubmissionApi",
             job_table=self.audiology_table,
             step_function=self.record_processing.step_function,
+            lane_step_functions=self.record_processing.step_functions,
+            record_processor=self.record_processing.record_processor,
             config_table=self.config_table,
             bucket=self.bucket,
+            output_bucket=self.output_bucket,
             user_pool=self.user_pool,
             user_pool_client=self.user_pool_client,
             error_layer=self.error_layer,
+            powertools_layer=self.powertools_layer,
+            metrics_layer=self.metrics_layer,
             api_keys_secret=self.api_keys_secret,
         )
 
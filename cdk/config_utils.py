@@ -56,4 +56,77 @@ def read_model_config() -> Dict[str, Any]:
                 f"Missing required field '{field}' in inference_config section"
             )
 
+    # Validate optional budgets section
+    budgets = config.get("budgets", {})
+    token_budget = budgets.get("token_budget_per_job", 0)
+    if not isinstance(token_budget, int) or token_budget < 0:
+        raise ValueError("'token_budget_per_job' must be a non-negative integer")
+
+    # Validate optional packing section
+    packing = config.get("packing", {})
+    if not isinstance(packing.get("enabled", False), bool):
+        raise ValueError("'enabled' in packing section must be a bool")
+    for field in ("max_reports", "max_report_tokens", "output_tokens_per_report"):
+        if packing.get("enabled", False) and field not in packing:
+            raise ValueError(f"Missing required field '{field}' in packing section")
+        if field in packing and (
+            not isinstance(packing[field], int) or packing[field] < 1
+        ):
+            raise ValueError(f"'{field}' must be a positive integer")
+
+    # Validate optional hedging section
+    hedging = config.get("hedging", {})
+    if not isinstance(hedging.get("enabled", False), bool):
+        raise ValueError("'enabled' in hedging section must be a bool")
+    percentile = hedging.get("percentile", 95)
+    if not isinstance(percentile, (int, float)) or not 0 < percentile < 100:
+        raise ValueError("'percentile' must be a number between 0 and 100")
+    for field in ("initial_delay_ms", "min_delay_ms", "window"):
+        if field in hedging and (
+            not isinstance(hedging[field], int) or hedging[field] < 1
+        ):
+            raise ValueError(f"'{field}' must be a positive integer")
+    max_hedge_rate = hedging.get("max_hedge_rate", 0.05)
+    if not isinstance(max_hedge_rate, (int, float)) or not 0 <= max_hedge_rate <= 1:
+        raise ValueError("'max_hedge_rate' must be a number between 0 and 1")
+    if not all(isinstance(region, str) for region in hedging.get("regions", [])):
+        raise ValueError("All items in 'regions' must be strings")
+
+    # Validate optional cascade section
+    cascade = config.get("cascade", {})
+    if not isinstance(cascade.get("enabled", False), bool):
+        raise ValueError("'enabled' in cascade section must be a bool")
+    escalate_values = cascade.get("escalate_values", [])
+    if not isinstance(escalate_values, list) or not all(
+        isinstance(value, str) for value in escalate_values
+    ):
+        raise ValueError("'escalate_values' must be a list of strings")
+    if cascade.get("enabled", False) and not cascade.get("tiers", []):
+        raise ValueError("The cascade section must have tiers when enabled")
+    for tier in cascade.get("tiers", []):
+        for field in ("name", "inference_profile", "model_id"):
+            if not isinstance(tier.get(field, None), str):
+                raise ValueError(f"'{field}' of each cascade tier must be a str")
+
+    # Validate optional fair_share section
+    fair_share = config.get("fair_share", {})
+    if not isinstance(fair_share.get("enabled", False), bool):
+        raise ValueError("'enabled' in fair_share section must be a bool")
+    if fair_share.get("enabled", False) and "capacity" not in fair_share:
+        raise ValueError("Missing required field 'capacity' in fair_share section")
+    for field in ("capacity", "lease_seconds", "waiting_seconds", "max_wait_seconds"):
+        if field in fair_share and (
+            not isinstance(fair_share[field], int) or fair_share[field] < 1
+        ):
+            raise ValueError(f"'{field}' must be a positive integer")
+    default_weight = fair_share.get("default_weight", 1)
+    if not isinstance(default_weight, (int, float)) or default_weight <= 0:
+        raise ValueError("'default_weight' must be a positive number")
+    for institution, weight in fair_share.get("weights", {}).items():
+        if not isinstance(weight, (int, float)) or weight <= 0:
+            raise ValueError(f"Weight of '{institution}' must be a positive number")
+    for institution, cap in fair_share.get("caps", {}).items():
+        if not isinstance(cap, int) or cap < 1:
+            raise ValueError(f"Cap of '{institution}' must be a positive integer")
+
     return config
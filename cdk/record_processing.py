@@ -10,8 +10,48 @@ from aws_cdk import (
 from constructs import Construct
 from aws_cdk import Duration
 from .config_utils import read_model_config
+from .warm_start import live_alias, snap_start_config
 import json
 
+# Processing lanes, each with its own record processor and state machine, so
+# bulk backfills can't starve interactive jobs. Reserved concurrency both
+# guarantees a lane's capacity and caps it; jobs beyond it wait, retrying
+# throttled invocations, for up to the lane's state machine timeout.
+#
+# Each lane's record processor runs for up to lambda_timeout_seconds per
+# invocation, and the Step Function retries an invocation that runs out of
+# time or crashes up to job_retries times (passed to it as JOB_RETRIES, so
+# that its last attempt finishes the job), resuming multi-patient jobs from
+# their checkpoints. These retries are counted in the payload's "attempt",
+# apart from the retries of throttled invocations, which never reach the
+# record processor. Interactive jobs are small and waited on, so they get
+# short invocations; bulk jobs get the longest Lambda allows, and retries
+# for jobs that outlast even that, within the lane's timeout_minutes.
+LANES = {
+    "interactive": {
+        "id_suffix": "",
+        "reserved_concurrency": 10,
+        "throttle_retries": 10,
+        "timeout_minutes": 5,
+        "lambda_timeout_seconds": 15,
+        "job_retries": 3,
+    },
+    "bulk": {
+        "id_suffix": "Bulk",
+        "reserved_concurrency": 5,
+        "throttle_retries": 60,
+        "timeout_minutes": 120,
+        "lambda_timeout_seconds": 900,
+        "job_retries": 5,
+    },
+}
+DEFAULT_LANE = "interactive"
+
+# CDK context key enabling the Parquet export of multi-patient jobs, e.g.
+# cdk deploy -c parquet_export=true. It deploys pyarrow as a layer of the
+# completion recorder, which can't export Parquet without it.
+PARQUET_CONTEXT_KEY = "parquet_export"
+
 
 class RecordProcessing(Construct):
     def __init__(
@@ -21,9 +61,13 @@ class RecordProcessing(Construct):
         job_table: dynamodb.Table,
         websocket_api_id: str,
         config_table: dynamodb.Table,
+        scheduler_table: dynamodb.Table,
         bucket: s3.Bucket,
         output_bucket: s3.Bucket,
         error_layer: _lambda.LayerVersion,
+        powertools_layer: _lambda.ILayerVersion,
+        metrics_layer: _lambda.LayerVersion,
+        common_layer: _lambda.LayerVersion,
         **kwargs,
     ) -> None:
         super().__init__(scope, construct_id, **kwargs)
@@ -46,43 +90,62 @@ class RecordProcessing(Construct):
             for region in model_regions
         ]
 
-        record_processor_lambda = _lambda.Function(
-            self,
-            "AudiologyRecordProcessor",
-            runtime=_lambda.Runtime.PYTHON_3_13,
-            handler="handler.handler",
-            code=_lambda.Code.from_asset(
-                "lambda/record_processor",
-                bundling={
-                    "image": _lambda.Runtime.PYTHON_3_13.bundling_image,
-                    "command": [
-                        "bash",
-                        "-c",
-                        "pip install -r requirements.txt -t /asset-output && cp -au . /asset-output",
-                    ],
-                },
-            ),
-            timeout=Duration.seconds(15),
-            memory_size=512,
-            environment={
-                "JOB_TABLE": job_table.table_name,
-                "CONFIG_TABLE": config_table.table_name,
-                "INFERENCE_PROFILE_ARN": inference_profile_arn,
-                "BUCKET_NAME": bucket.bucket_name,
-                "INFERENCE_CONFIG": json.dumps(model_config["inference_config"]),
-            },
-            layers=[error_layer],
-        )
+        # Smaller models tried before the primary one, see [cascade]
+        cascade = model_config.get("cascade", {})
+        cascade_tiers = [
+            {
+                "name": tier["name"],
+                "model_id": f"arn:aws:bedrock:{self.region}:{self.account}:inference-profile/{tier['inference_profile']}",
+            }
+            for tier in cascade.get("tiers", [])
+        ]
+        cascade_model_arns = [tier["model_id"] for tier in cascade_tiers] + [
+            f"arn:aws:bedrock:{region}::foundation-model/{tier['model_id']}"
+            for tier in cascade.get("tiers", [])
+            for region in model_regions
+        ]
 
-        job_table.grant_read_write_data(record_processor_lambda)
-        bucket.grant_read(record_processor_lambda)
-        config_table.grant_read_data(record_processor_lambda)
-        record_processor_lambda.add_to_role_policy(
-            iam.PolicyStatement(
-                actions=["bedrock:InvokeModel"],
-                resources=foundation_model_arns + [inference_profile_arn],
-            )
+        # Slow model requests may be resent to these regions, see [hedging]
+        hedging = model_config.get("hedging", {})
+        hedge_profiles = [inference_profile] + [
+            tier["inference_profile"] for tier in cascade.get("tiers", [])
+        ]
+        hedge_profile_arns = [
+            f"arn:aws:bedrock:{region}:{self.account}:inference-profile/{profile}"
+            for region in hedging.get("regions", [])
+            for profile in hedge_profiles
+        ]
+
+        parquet_export = (
+            str(self.node.try_get_context(PARQUET_CONTEXT_KEY) or "false").lower()
+            == "true"
         )
+        completion_recorder_layers = [
+            powertools_layer,
+            error_layer,
+            metrics_layer,
+            common_layer,
+        ]
+        if parquet_export:
+            completion_recorder_layers.append(
+                _lambda.LayerVersion(
+                    self,
+                    "PyarrowLayer",
+                    code=_lambda.Code.from_asset(
+                        "lambda/layers/pyarrow",
+                        bundling={
+                            "image": _lambda.Runtime.PYTHON_3_13.bundling_image,
+                            "command": [
+                                "bash",
+                                "-c",
+                                "pip install -r requirements.txt -t /asset-output/python",
+                            ],
+                        },
+                    ),
+                    compatible_runtimes=[_lambda.Runtime.PYTHON_3_13],
+                    description="Layer for Parquet export of job results",
+                )
+            )
 
         completion_recorder_lambda = _lambda.Function(
             self,
@@ -105,12 +168,16 @@ class RecordProcessing(Construct):
             environment={
                 "JOB_TABLE": job_table.table_name,
                 "OUTPUT_BUCKET_NAME": output_bucket.bucket_name,
+                "PARQUET_EXPORT": "true" if parquet_export else "false",
+                "POWERTOOLS_SERVICE_NAME": "audiology-completion-recorder",
             },
-            layers=[error_layer],
+            layers=completion_recorder_layers,
+            tracing=_lambda.Tracing.ACTIVE,
         )
 
-        job_table.grant_read_write_data(record_processor_lambda)
         job_table.grant_read_write_data(completion_recorder_lambda)
+        output_bucket.grant_put(completion_recorder_lambda)
+        output_bucket.grant_read(completion_recorder_lambda)
 
         completion_recorder_lambda.add_to_role_policy(
             iam.PolicyStatement(
@@ -121,38 +188,188 @@ class RecordProcessing(Construct):
             )
         )
 
-        # Adds the execution ID to the payload for the record processor
-        prep_payload = sfn.Pass(
-            self,
-            "PrepareStepPayload",
-            parameters={
-                "jobId.$": "$.jobId",
-                "executionId.$": "$$.Execution.Id",
-            },
-        )
+        # Each lane has its own record processor and state machine, keeping
+        # the IDs of the original ones for the interactive lane
+        self.record_processors = {}
+        self.step_functions = {}
+        for lane, options in LANES.items():
+            suffix = options["id_suffix"]
+            warm_start_name = f"record_processor_{lane}"
 
-        # Passes job name and execution ID to the record processor in payload
-        record_processor_task = tasks.LambdaInvoke(
-            self,
-            "RecordProcessorTask",
-            lambda_function=record_processor_lambda,
-            output_path="$.Payload",  # Pass the record processor output to the completion recorder
-        )
+            record_processor_lambda = _lambda.Function(
+                self,
+                f"AudiologyRecordProcessor{suffix}",
+                runtime=_lambda.Runtime.PYTHON_3_13,
+                handler="handler.handler",
+                code=_lambda.Code.from_asset(
+                    "lambda/record_processor",
+                    bundling={
+                        "image": _lambda.Runtime.PYTHON_3_13.bundling_image,
+                        "command": [
+                            "bash",
+                            "-c",
+                            "pip install -r requirements.txt -t /asset-output && cp -au . /asset-output",
+                        ],
+                    },
+                ),
+                timeout=Duration.seconds(options["lambda_timeout_seconds"]),
+                memory_size=512,
+                reserved_concurrent_executions=options["reserved_concurrency"],
+                environment={
+                    "JOB_TABLE": job_table.table_name,
+                    "CONFIG_TABLE": config_table.table_name,
+                    "INFERENCE_PROFILE_ARN": inference_profile_arn,
+                    "BUCKET_NAME": bucket.bucket_name,
+                    "OUTPUT_BUCKET_NAME": output_bucket.bucket_name,
+                    "INFERENCE_CONFIG": json.dumps(model_config["inference_config"]),
+                    "MODEL_BACKEND": "bedrock",
+                    "TOKEN_BUDGET_PER_JOB": str(
+                        model_config.get("budgets", {}).get("token_budget_per_job", 0)
+                    ),
+                    "PACKING_CONFIG": json.dumps(model_config.get("packing", {})),
+                    "HEDGING_CONFIG": json.dumps(hedging),
+                    "JOB_RETRIES": str(options["job_retries"]),
+                    "CASCADE_CONFIG": json.dumps(
+                        {
+                            "enabled": cascade.get("enabled", False),
+                            "escalate_values": cascade.get("escalate_values", []),
+                            "tiers": cascade_tiers,
+                        }
+                    ),
+                    "LANE": lane,
+                    "SCHEDULER_TABLE": scheduler_table.table_name,
+                    "FAIR_SHARE_CONFIG": json.dumps(model_config.get("fair_share", {})),
+                    "POWERTOOLS_SERVICE_NAME": "audiology-record-processor",
+                },
+                layers=[powertools_layer, error_layer, metrics_layer, common_layer],
+                tracing=_lambda.Tracing.ACTIVE,
+                **snap_start_config(self, warm_start_name),
+            )
 
-        completion_recorder_task = tasks.LambdaInvoke(
-            self,
-            "CompletionRecorderTask",
-            lambda_function=completion_recorder_lambda,
-        )
+            # Invoked through its live alias when warm starts are configured
+            self.record_processors[lane] = live_alias(
+                self,
+                record_processor_lambda,
+                warm_start_name,
+                options["reserved_concurrency"],
+            )
 
-        output_bucket.grant_put(completion_recorder_lambda)
+            job_table.grant_read_write_data(record_processor_lambda)
+            bucket.grant_read(record_processor_lambda)
+            output_bucket.grant_put(record_processor_lambda)
+            # Checkpoints of multi-patient jobs are read back and deleted
+            output_bucket.grant_read(record_processor_lambda)
+            output_bucket.grant_delete(record_processor_lambda)
+            config_table.grant_read_data(record_processor_lambda)
+            scheduler_table.grant_read_write_data(record_processor_lambda)
+            record_processor_lambda.add_to_role_policy(
+                iam.PolicyStatement(
+                    actions=["bedrock:InvokeModel"],
+                    resources=foundation_model_arns
+                    + [inference_profile_arn]
+                    + cascade_model_arns
+                    + hedge_profile_arns,
+                )
+            )
+
+            # Adds the execution ID to the payload for the record processor, keeping
+            # the execution input (e.g. reports submitted inline) under "input"
+            prep_payload = sfn.Pass(
+                self,
+                f"PrepareStepPayload{suffix}",
+                parameters={
+                    "jobId.$": "$.jobId",
+                    "executionId.$": "$$.Execution.Id",
+                    "input.$": "$",
+                    "attempt": 0,
+                },
+            )
 
-        definition = prep_payload.next(record_processor_task)
-        definition = definition.next(completion_recorder_task)
+            # Passes job name and execution ID to the record processor in payload,
+            # and the attempt so its last attempt finishes the job regardless
+            record_processor_task = tasks.LambdaInvoke(
+                self,
+                f"RecordProcessorTask{suffix}",
+                lambda_function=self.record_processors[lane],
+                payload=sfn.TaskInput.from_object(
+                    {
+                        "jobId.$": "$.jobId",
+                        "executionId.$": "$.executionId",
+                        "input.$": "$.input",
+                        "attempt.$": "$.attempt",
+                    }
+                ),
+                output_path="$.Payload",  # Pass the record processor output to the completion recorder
+            )
 
-        self.step_function = sfn.StateMachine(
-            self,
-            "RecordProcessingStateMachine",
-            definition=definition,
-            timeout=Duration.minutes(5),
-        )
+            # Multi-patient jobs that run out of time or crash are retried,
+            # resuming from their checkpointed records, with the attempt
+            # counted in the payload rather than by a Retrier, which would
+            # share $$.State.RetryCount with the throttling retries below
+            next_attempt = (
+                sfn.Pass(
+                    self,
+                    f"NextRecordProcessorAttempt{suffix}",
+                    parameters={
+                        "jobId.$": "$.jobId",
+                        "executionId.$": "$.executionId",
+                        "input.$": "$.input",
+                        "attempt.$": "States.MathAdd($.attempt, 1)",
+                    },
+                )
+                .next(
+                    sfn.Wait(
+                        self,
+                        f"RecordProcessorRetryWait{suffix}",
+                        time=sfn.WaitTime.duration(Duration.seconds(2)),
+                    )
+                )
+                .next(record_processor_task)
+            )
+            retry_job = (
+                sfn.Choice(self, f"RetryRecordProcessor{suffix}")
+                .when(
+                    sfn.Condition.number_less_than("$.attempt", options["job_retries"]),
+                    next_attempt,
+                )
+                .otherwise(
+                    sfn.Fail(
+                        self,
+                        f"RecordProcessorFailed{suffix}",
+                        error="JobIncomplete",
+                        cause="The record processor ran out of attempts.",
+                    )
+                )
+            )
+            record_processor_task.add_catch(
+                retry_job,
+                errors=["JobIncomplete", "Sandbox.Timedout", "Lambda.Unknown"],
+                result_path="$.error",
+            )
+            # Jobs wait for the lane's reserved concurrency to free up
+            record_processor_task.add_retry(
+                errors=["Lambda.TooManyRequestsException"],
+                interval=Duration.seconds(2),
+                max_attempts=options["throttle_retries"],
+                backoff_rate=1.5,
+                max_delay=Duration.seconds(60),
+            )
+
+            completion_recorder_task = tasks.LambdaInvoke(
+                self,
+                f"CompletionRecorderTask{suffix}",
+                lambda_function=completion_recorder_lambda,
+            )
+
+            definition = prep_payload.next(record_processor_task)
+            definition = definition.next(completion_recorder_task)
+
+            self.step_functions[lane] = sfn.StateMachine(
+                self,
+                f"RecordProcessingStateMachine{suffix}",
+                definition=definition,
+                timeout=Duration.minutes(options["timeout_minutes"]),
+            )
+
+        self.record_processor = self.record_processors[DEFAULT_LANE]
+        self.step_function = self.step_functions[DEFAULT_LANE]
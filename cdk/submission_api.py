@@ -15,9 +15,9 @@ from aws_cdk import aws_secretsmanager as secretsmanager
 from aws_cdk import aws_iam as iam
 from aws_cdk import aws_cognito as cognito
 from datetime import datetime
+import json
 
-
-POWERTOOLS_LAYER_VERSION_ARN = "arn:aws:lambda:us-west-2:017000801446:layer:AWSLambdaPowertoolsPythonV3-python39-x86_64:18"
+from .warm_start import live_alias, snap_start_config
 
 
 class SubmissionApi(Construct):
@@ -27,11 +27,16 @@ class SubmissionApi(Construct):
         construct_id: str,
         job_table: dynamodb.Table,
         step_function: stepfunctions.StateMachine,
+        lane_step_functions: dict[str, stepfunctions.StateMachine],
+        record_processor: _lambda.IFunction,
         config_table: dynamodb.Table,
         bucket: s3.Bucket,
+        output_bucket: s3.Bucket,
         user_pool: cognito.UserPool,
         user_pool_client: cognito.UserPoolClient,
         error_layer: _lambda.LayerVersion,
+        powertools_layer: _lambda.ILayerVersion,
+        metrics_layer: _lambda.LayerVersion,
         api_keys_secret: secretsmanager.Secret,
         **kwargs,
     ) -> None:
@@ -59,27 +64,35 @@ class SubmissionApi(Construct):
                 "BUCKET_NAME": bucket.bucket_name,
                 "JOB_TABLE": job_table.table_name,
                 "STEP_FUNCTION_ARN": step_function.state_machine_arn,
+                # Jobs are started in the state machine of their priority's lane
+                "STEP_FUNCTION_ARNS": json.dumps({
+                    lane: machine.state_machine_arn
+                    for lane, machine in lane_step_functions.items()
+                }),
+                "POWERTOOLS_SERVICE_NAME": "audiology-bucket-response",
             },
-            layers=[error_layer],
+            layers=[powertools_layer, error_layer, metrics_layer],
+            tracing=_lambda.Tracing.ACTIVE,
         )
 
         bucket.grant_read(bucket_response)
-        step_function.grant_start_execution(bucket_response)
+        for machine in lane_step_functions.values():
+            machine.grant_start_execution(bucket_response)
 
         job_table.grant_read_write_data(bucket_response)
 
-        # Triggers for files of the form "input_reports/*"
-        bucket.add_event_notification(
+        # Triggers for files of the form "input_reports/*", uploaded with a
+        # presigned PUT or POST or as a multipart upload
+        for event_type in (
             s3.EventType.OBJECT_CREATED_PUT,
-            s3n.LambdaDestination(bucket_response),
-            s3.NotificationKeyFilter(prefix="input_reports/"),
-        )
-
-        self.powertools_layer = _lambda.LayerVersion.from_layer_version_arn(
-            self,
-            "PowertoolsLayer",
-            layer_version_arn=POWERTOOLS_LAYER_VERSION_ARN,
-        )
+            s3.EventType.OBJECT_CREATED_POST,
+            s3.EventType.OBJECT_CREATED_COMPLETE_MULTIPART_UPLOAD,
+        ):
+            bucket.add_event_notification(
+                event_type,
+                s3n.LambdaDestination(bucket_response),
+                s3.NotificationKeyFilter(prefix="input_reports/"),
+            )
 
         self.api_handler = _lambda.Function(
             self,
@@ -97,19 +110,33 @@ class SubmissionApi(Construct):
                     ],
                 },
             ),
-            timeout=Duration.seconds(15),
+            # Long enough for /classify/sync, within the API Gateway limit of 29 seconds
+            timeout=Duration.seconds(29),
             memory_size=512,
             environment={
                 "BUCKET_NAME": bucket.bucket_name,
                 "TABLE_NAME": job_table.table_name,
                 "JOB_TABLE": job_table.table_name,
                 "CONFIG_TABLE_NAME": config_table.table_name,
+                "OUTPUT_BUCKET_NAME": output_bucket.bucket_name,
+                "STEP_FUNCTION_ARN": step_function.state_machine_arn,
+                "RECORD_PROCESSOR_FUNCTION": record_processor.function_name,
+                "POWERTOOLS_SERVICE_NAME": "audiology-api-lambda",
             },
-            layers=[self.powertools_layer, error_layer],
+            layers=[powertools_layer, error_layer, metrics_layer],
+            tracing=_lambda.Tracing.ACTIVE,
+            **snap_start_config(self, "api"),
         )
 
+        # Invoked by API Gateway through its live alias when warm starts are configured
+        api_handler_target = live_alias(self, self.api_handler, "api")
+
+        record_processor.grant_invoke(self.api_handler)
+        step_function.grant_start_execution(self.api_handler)
+        step_function.grant_read(self.api_handler)
         config_table.grant_read_write_data(self.api_handler)
         bucket.grant_put(self.api_handler)
+        output_bucket.grant_read(self.api_handler)
         job_table.grant_read_write_data(self.api_handler)
 
         cors_options = apigateway.CorsOptions(
@@ -149,8 +176,11 @@ class SubmissionApi(Construct):
                 "USER_POOL_ID": user_pool.user_pool_id,
                 "USER_POOL_CLIENT_ID": user_pool_client.user_pool_client_id,
                 "API_KEYS_SECRET_NAME": api_keys_secret.secret_name,
+                "POWERTOOLS_SERVICE_NAME": "audiology-api-authorizer",
             },
-            layers=[error_layer],
+            layers=[powertools_layer, error_layer, metrics_layer],
+            tracing=_lambda.Tracing.ACTIVE,
+            **snap_start_config(self, "api_authorizer"),
         )
 
         # Grant the authorizer function permission to read the secret
@@ -169,7 +199,7 @@ class SubmissionApi(Construct):
         self.authorizer = apigateway.RequestAuthorizer(
             self,
             "ApiAuthorizer",
-            handler=self.authorizer_function,
+            handler=live_alias(self, self.authorizer_function, "api_authorizer"),
             identity_sources=[
                 # Technically required for both JWT and API key authorizers but can be set
                 # to a placeholder for JWT auth.
@@ -181,14 +211,65 @@ class SubmissionApi(Construct):
         upload_resource = self.api.root.add_resource("upload")
         upload_resource.add_method(
             "POST",
-            apigateway.LambdaIntegration(self.api_handler),
+            apigateway.LambdaIntegration(api_handler_target),
             authorizer=self.authorizer,
             # TODO: possibly define responses with method_responses
         )
 
+        upload_batch_resource = self.api.root.add_resource("upload_batch")
+        upload_batch_resource.add_method(
+            "POST",
+            apigateway.LambdaIntegration(api_handler_target),
+            authorizer=self.authorizer,
+        )
+
+        upload_multipart_resource = self.api.root.add_resource("upload_multipart")
+        upload_multipart_resource.add_method(
+            "POST",
+            apigateway.LambdaIntegration(api_handler_target),
+            authorizer=self.authorizer,
+        )
+
+        complete_multipart_resource = upload_multipart_resource.add_resource(
+            "complete"
+        )
+        complete_multipart_resource.add_method(
+            "POST",
+            apigateway.LambdaIntegration(api_handler_target),
+            authorizer=self.authorizer,
+        )
+
+        classify_resource = self.api.root.add_resource("classify")
+        classify_resource.add_method(
+            "POST",
+            apigateway.LambdaIntegration(api_handler_target),
+            authorizer=self.authorizer,
+        )
+
+        classify_sync_resource = classify_resource.add_resource("sync")
+        classify_sync_resource.add_method(
+            "POST",
+            apigateway.LambdaIntegration(api_handler_target),
+            authorizer=self.authorizer,
+        )
+
+        jobs_resource = self.api.root.add_resource("jobs")
+        jobs_resource.add_method(
+            "GET",
+            apigateway.LambdaIntegration(api_handler_target),
+            authorizer=self.authorizer,
+        )
+
+        job_resource = jobs_resource.add_resource("{job_id}")
+        job_resource.add_method(
+            "GET",
+            apigateway.LambdaIntegration(api_handler_target),
+            authorizer=self.authorizer,
+        )
+
         upload_config_resource = self.api.root.add_resource("upload_config")
         upload_config_resource.add_method(
             "POST",
-            apigateway.LambdaIntegration(self.api_handler),
+            apigateway.LambdaIntegration(api_handler_target),
             authorizer=self.authorizer,
         )
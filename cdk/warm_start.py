@@ -0,0 +1,144 @@
+import json
+from typing import Any, Dict
+
+from aws_cdk import (
+    TimeZone,
+    aws_applicationautoscaling as appscaling,
+    aws_lambda as _lambda,
+)
+from constructs import Construct
+
+# CDK context key of the warm start options, set in cdk.json or on deploy,
+# e.g. cdk deploy -c 'warm_start={"snap_start": true}'
+CONTEXT_KEY = "warm_start"
+
+# Hours during which clinic_hours_concurrency is provisioned
+DEFAULT_CLINIC_HOURS = {
+    "timezone": "America/Los_Angeles",
+    "days": "MON-FRI",
+    "open": 7,
+    "close": 19,
+}
+
+
+def warm_start_options(scope: Construct, name: str) -> Dict[str, Any]:
+    """
+    Warm start options of the function called name under "functions" in the
+    warm_start context, along with the shared snap_start and clinic_hours:
+
+    - provisioned_concurrency: environments kept initialized at all times
+    - clinic_hours_concurrency: environments kept initialized during clinic
+      hours, scaled to on a schedule
+    - max_concurrency: upper bound for scaling on utilization_target, the
+      fraction of provisioned environments in use
+    """
+
+    options = scope.node.try_get_context(CONTEXT_KEY) or {}
+    if isinstance(options, str):
+        options = json.loads(options)
+
+    function_options = options.get("functions", {}).get(name, {})
+    for field in (
+        "provisioned_concurrency",
+        "clinic_hours_concurrency",
+        "max_concurrency",
+    ):
+        value = function_options.get(field, 0)
+        if not isinstance(value, int) or value < 0:
+            raise ValueError(f"'{field}' of {name} must be a non-negative integer")
+
+    return {
+        "snap_start": bool(options.get("snap_start", False)),
+        "clinic_hours": {**DEFAULT_CLINIC_HOURS, **options.get("clinic_hours", {})},
+        **function_options,
+    }
+
+
+def provisioned(options: Dict[str, Any]) -> bool:
+    return bool(
+        options.get("provisioned_concurrency", 0)
+        or options.get("clinic_hours_concurrency", 0)
+    )
+
+
+def snap_start_config(scope: Construct, name: str) -> Dict[str, Any]:
+    """
+    Function arguments enabling SnapStart when the warm_start context asks
+    for it and the function has no provisioned concurrency, which Lambda
+    doesn't allow alongside SnapStart.
+    """
+
+    options = warm_start_options(scope, name)
+    if not options["snap_start"] or provisioned(options):
+        return {}
+
+    return {"snap_start": _lambda.SnapStartConf.ON_PUBLISHED_VERSIONS}
+
+
+def live_alias(
+    scope: Construct,
+    function: _lambda.Function,
+    name: str,
+    reserved_concurrency: int | None = None,
+) -> _lambda.IFunction:
+    """
+    The "live" alias of function's current version, with provisioned
+    concurrency and clinic hours scaling if configured, for callers to invoke
+    instead of the function. SnapStart and provisioned concurrency only apply
+    to published versions. Returns function itself without warm start
+    options, leaving it invoked on demand.
+    """
+
+    options = warm_start_options(scope, name)
+    if not options["snap_start"] and not provisioned(options):
+        return function
+
+    always = options.get("provisioned_concurrency", 0)
+    clinic_hours = options.get("clinic_hours_concurrency", 0)
+    maximum = max(always, clinic_hours, options.get("max_concurrency", 0))
+    if reserved_concurrency is not None and maximum > reserved_concurrency:
+        raise ValueError(
+            f"Provisioned concurrency of {name} exceeds its reserved concurrency of {reserved_concurrency}"
+        )
+
+    alias = _lambda.Alias(
+        scope,
+        f"{function.node.id}LiveAlias",
+        alias_name="live",
+        version=function.current_version,
+        provisioned_concurrent_executions=always or None,
+    )
+
+    if clinic_hours or options.get("utilization_target", None):
+        # Application Auto Scaling keeps at least one environment provisioned
+        outside_hours = max(always, 1)
+        scaling = alias.add_auto_scaling(
+            min_capacity=outside_hours, max_capacity=max(maximum, outside_hours)
+        )
+
+        if clinic_hours:
+            hours = options["clinic_hours"]
+            time_zone = TimeZone.of(hours["timezone"])
+            scaling.scale_on_schedule(
+                "ClinicHoursOpen",
+                schedule=appscaling.Schedule.cron(
+                    minute="0", hour=str(hours["open"]), week_day=hours["days"]
+                ),
+                min_capacity=clinic_hours,
+                time_zone=time_zone,
+            )
+            scaling.scale_on_schedule(
+                "ClinicHoursClose",
+                schedule=appscaling.Schedule.cron(
+                    minute="0", hour=str(hours["close"]), week_day=hours["days"]
+                ),
+                min_capacity=outside_hours,
+                time_zone=time_zone,
+            )
+
+        if options.get("utilization_target", None):
+            scaling.scale_on_utilization(
+                utilization_target=options["utilization_target"]
+            )
+
+    return alias
@@ -16,6 +16,8 @@ from aws_cdk import (
 from constructs import Construct
 from datetime import datetime
 
+from .warm_start import live_alias, snap_start_config
+
 
 class WebSocketApi(Construct):
     def __init__(
@@ -24,6 +26,8 @@ class WebSocketApi(Construct):
         construct_id: str,
         job_table: dynamodb.Table,
         error_layer: _lambda.LayerVersion,
+        powertools_layer: _lambda.ILayerVersion,
+        metrics_layer: _lambda.LayerVersion,
         user_pool_id: str,
         user_pool_client_id: str,
         api_keys_secret_name: str,
@@ -67,8 +71,11 @@ class WebSocketApi(Construct):
                 "USER_POOL_ID": user_pool_id,
                 "USER_POOL_CLIENT_ID": user_pool_client_id,
                 "API_KEYS_SECRET_NAME": api_keys_secret_name,
+                "POWERTOOLS_SERVICE_NAME": "audiology-websocket-authorizer",
             },
-            layers=[error_layer],
+            layers=[powertools_layer, error_layer, metrics_layer],
+            tracing=_lambda.Tracing.ACTIVE,
+            **snap_start_config(self, "websocket_authorizer"),
         )
 
         # Grant permissions to read from Secrets Manager
@@ -92,8 +99,10 @@ class WebSocketApi(Construct):
             memory_size=512,
             environment={
                 "JOB_TABLE": job_table.table_name,
+                "POWERTOOLS_SERVICE_NAME": "audiology-websocket",
             },
-            layers=[error_layer],
+            layers=[powertools_layer, error_layer, metrics_layer],
+            tracing=_lambda.Tracing.ACTIVE,
         )
 
         job_table.grant_read_write_data(websocket_handler)
@@ -101,7 +110,7 @@ class WebSocketApi(Construct):
         # Create WebSocket Lambda authorizer
         lambda_authorizer = authorizers.WebSocketLambdaAuthorizer(
             "WebSocketAuthorizer",
-            handler=websocket_authorizer,
+            handler=live_alias(self, websocket_authorizer, "websocket_authorizer"),
             identity_source=["route.request.querystring.ApiKey"],
         )
 
@@ -1,20 +1,31 @@
 from aws_lambda_powertools.event_handler.api_gateway import (
     ApiGatewayResolver,
     CORSConfig,
+    Response,
 )
 from aws_lambda_powertools.utilities.typing import LambdaContext
 from aws_lambda_powertools import Logger, Tracer
 import boto3
-from datetime import datetime
+from botocore.config import Config
+from datetime import datetime, timezone
+import base64
+import hashlib
 import os
 import json
 from botocore.utils import ClientError
 import sys
 import logging
+import time
 import uuid
 
-from audiology_errors.errors import ValidationError, InternalServerError
+from audiology_errors.errors import (
+    ValidationError,
+    InternalServerError,
+    NotFoundError,
+)
 from audiology_errors.utils import handle_errors
+from audiology_metrics.instrumentation import instrument_client, metrics, tag_job
+from audiology_metrics.snapstart import after_restore
 
 sys.path.append("/opt/python")  # For lambda layers
 
@@ -28,20 +39,163 @@ resolver = ApiGatewayResolver(cors=cors_config)
 tracer = Tracer(service="audiology-api-lambda")
 logger = Logger(service="audiology-api-lambda")
 
-s3 = boto3.client("s3")
-dynamodb = boto3.client("dynamodb")
+
+@after_restore
+def create_clients() -> None:
+    """Create the AWS clients.
+
+    Called at init and again after a SnapStart restore, so that restored
+    execution environments don't share connections.
+
+    """
+    global s3, dynamodb, sfn, lambda_client
+
+    s3 = instrument_client(boto3.client("s3"))
+    dynamodb = instrument_client(boto3.client("dynamodb"))
+    sfn = instrument_client(boto3.client("stepfunctions"))
+    # Not retried, since a retried invocation would classify the report again
+    lambda_client = instrument_client(
+        boto3.client(
+            "lambda", config=Config(read_timeout=30, retries={"total_max_attempts": 1})
+        )
+    )
+
+
+create_clients()
 
 JOB_TABLE = os.environ.get("JOB_TABLE", None)
 CONFIG_TABLE_NAME = os.environ.get("CONFIG_TABLE_NAME", None)
+OUTPUT_BUCKET_NAME = os.environ.get("OUTPUT_BUCKET_NAME", None)
+STEP_FUNCTION_ARN = os.environ.get("STEP_FUNCTION_ARN", None)
+RECORD_PROCESSOR_FUNCTION = os.environ.get("RECORD_PROCESSOR_FUNCTION", None)
+
+JOB_STATUS_INDEX = "status-created_at-index"
+
+# Job items expire through the table's TTL this long after they are created
+JOB_RETENTION_DAYS = 30
+
+JOB_STATUSES = ("created", "started", "processing", "completed", "failed")
+
+# Processing lanes jobs can be submitted to; each has its own reserved
+# concurrency, so interactive jobs aren't held up behind bulk ones
+JOB_PRIORITIES = ("interactive", "bulk")
+DEFAULT_PRIORITY = "interactive"
+
+# Priority of jobs uploaded with /upload_batch that don't give one
+DEFAULT_BATCH_PRIORITY = "bulk"
+
+SUPPORTED_TYPES = {
+    "text/csv": {
+        "extension": "csv",
+    },
+    "application/json": {
+        "extension": "json",
+    },
+}
+
+# Most jobs accepted by a single /upload_batch request
+MAX_BATCH_JOBS = 500
+
+# DynamoDB batch_write_item accepts at most 25 items per request
+BATCH_WRITE_SIZE = 25
+BATCH_WRITE_ATTEMPTS = 5
+
+# Largest file accepted through a presigned POST upload
+MAX_UPLOAD_BYTES = 5 * 1024 * 1024 * 1024
+
+# S3 multipart upload limits; parts other than the last must be at least 5 MB
+MIN_PART_BYTES = 5 * 1024 * 1024
+MAX_PART_BYTES = 5 * 1024 * 1024 * 1024
+DEFAULT_PART_BYTES = 64 * 1024 * 1024
+
+# Most part URLs issued for a single multipart upload
+MAX_UPLOAD_PARTS = 1000
+
+# Largest report accepted inline by /classify; well under the Step Function
+# input limit of 256 KB
+MAX_INLINE_REPORT_BYTES = 64 * 1024
+
+# Longest /classify waits for the result before returning the job ID
+MAX_CLASSIFY_WAIT_SECONDS = 10
+CLASSIFY_POLL_SECONDS = 0.5
+
+# Job details returned by GET /jobs/{job_id}, and the subset returned per job
+# by GET /jobs
+JOB_DETAIL_FIELDS = (
+    "job_id",
+    "job_name",
+    "status",
+    "config_id",
+    "institution_id",
+    "priority",
+    "created_at",
+    "started_at",
+    "completed_at",
+    "processing_ms",
+    "input_tokens",
+    "output_tokens",
+    "model_calls",
+    "token_budget_exceeded",
+    "result_key",
+    "result",
+)
+JOB_LIST_FIELDS = ("job_id", "job_name", "status", "created_at", "completed_at")
+
+DEFAULT_JOB_LIST_LIMIT = 50
+MAX_JOB_LIST_LIMIT = 100
+
+# Key attributes of a page of GET /jobs: the table's key and the index's
+JOB_PAGE_KEY_ATTRIBUTES = ("job_id", "status", "created_at")
+
+# Identical /classify/sync requests share one job ID derived from this namespace
+SYNC_CLASSIFY_NAMESPACE = uuid.UUID("5f1e8d3a-7c2b-4e96-a0d4-3b8f6c1e9a27")
+
+# A finished classification is returned to identical requests for this long
+SYNC_CLASSIFY_REUSE_SECONDS = 300
+
+# A classification still marked as processing after this long is assumed lost
+SYNC_CLASSIFY_STALE_SECONDS = 60
+
+# Longest an identical request waits on a classification already in flight,
+# and the time it keeps back from the Lambda timeout to respond
+SYNC_CLASSIFY_WAIT_SECONDS = 25
+SYNC_CLASSIFY_RESERVE_SECONDS = 1
+
+
+def job_item(
+    job_id: str,
+    job_name: str,
+    config_id: str,
+    institution_id: str,
+    status: str = "created",
+    priority: str = DEFAULT_PRIORITY,
+) -> dict:
+    """Build the DynamoDB item for a newly created job."""
+    now = datetime.now(timezone.utc)
+    return {
+        "job_id": {"S": job_id},
+        "job_name": {"S": job_name},
+        "config_id": {"S": config_id},
+        "institution_id": {"S": institution_id},
+        "status": {"S": status},
+        "priority": {"S": priority},
+        "created_at": {"S": now.isoformat()},
+        "expires_at": {"N": str(int(now.timestamp()) + JOB_RETENTION_DAYS * 86400)},
+    }
 
 
 def create_dynamo_job(
     job_name: str,
     config_id: str,
     institution_id: str,
+    status: str = "created",
+    priority: str = DEFAULT_PRIORITY,
 ) -> str:
     """Create a new job in the DynamoDB job table.
 
+    The job's priority picks the processing lane it is started in once its
+    input is uploaded.
+
     Raises:
         ValidationError: If the job name already exists in the job table.
         InternalServerError: If there is an error creating the job in DynamoDB or checking job existence.
@@ -56,13 +210,9 @@ def create_dynamo_job(
     try:
         dynamodb.put_item(
             TableName=JOB_TABLE,
-            Item={
-                "job_id": {"S": job_id},
-                "job_name": {"S": job_name},
-                "config_id": {"S": config_id},
-                "institution_id": {"S": institution_id},
-                "status": {"S": "created"},
-            },
+            Item=job_item(
+                job_id, job_name, config_id, institution_id, status, priority
+            ),
         )
     except ClientError as e:
         logger.error(f"Error creating job in job table: {e}")
@@ -71,6 +221,61 @@ def create_dynamo_job(
     return job_id
 
 
+def create_dynamo_jobs(jobs: list[dict]) -> list[str]:
+    """Create many jobs in the DynamoDB job table with batched writes.
+
+    Items are written in chunks of 25, retrying unprocessed items with
+    exponential backoff.
+
+    Raises:
+        InternalServerError: If the jobs could not all be written to DynamoDB.
+
+    Returns:
+        list[str]: The UUIDs of the created jobs, in the order given.
+
+    """
+
+    job_ids = [str(uuid.uuid4()) for _ in jobs]
+    items = [
+        job_item(
+            job_id,
+            job["job_name"],
+            job["config_id"],
+            job["institution_id"],
+            priority=job.get("priority", DEFAULT_BATCH_PRIORITY),
+        )
+        for job_id, job in zip(job_ids, jobs)
+    ]
+
+    for start in range(0, len(items), BATCH_WRITE_SIZE):
+        requests = [
+            {"PutRequest": {"Item": item}}
+            for item in items[start : start + BATCH_WRITE_SIZE]
+        ]
+
+        for attempt in range(BATCH_WRITE_ATTEMPTS):
+            try:
+                response = dynamodb.batch_write_item(RequestItems={JOB_TABLE: requests})
+            except ClientError as e:
+                logger.error(f"Error creating jobs in job table: {e}")
+                raise InternalServerError(f"Error creating jobs in DynamoDB.") from e
+
+            requests = response.get("UnprocessedItems", {}).get(JOB_TABLE, [])
+            if not requests:
+                break
+
+            logger.warning(
+                f"Retrying {len(requests)} unprocessed job items, attempt {attempt + 1}"
+            )
+            time.sleep(0.05 * 2**attempt)
+
+        if requests:
+            logger.error(f"Could not write {len(requests)} job items")
+            raise InternalServerError("Error creating jobs in DynamoDB.")
+
+    return job_ids
+
+
 def generate_presigned_url(bucket_name, file_key, mime_type) -> str:
     """Generate a pre-signed URL for uploading a file to S3.
 
@@ -97,21 +302,124 @@ def generate_presigned_url(bucket_name, file_key, mime_type) -> str:
     return presigned_url
 
 
+def generate_presigned_post(bucket_name, file_key, mime_type) -> dict:
+    """Generate a pre-signed POST for uploading a file to S3 from a form.
+
+    Raises:
+        InternalServerError: If there is an error generating the pre-signed POST.
+
+    """
+    try:
+        presigned_post = s3.generate_presigned_post(
+            Bucket=bucket_name,
+            Key=file_key,
+            Fields={"Content-Type": mime_type},
+            Conditions=[
+                {"Content-Type": mime_type},
+                ["content-length-range", 1, MAX_UPLOAD_BYTES],
+            ],
+            ExpiresIn=3600,  # POST expires in 1 hour
+        )
+    except ClientError as e:
+        logger.error(f"Error generating pre-signed POST: {e}")
+        raise InternalServerError(
+            "Could not generate pre-signed POST for S3 upload."
+        ) from e
+
+    return presigned_post
+
+
+def create_multipart_upload(bucket_name, file_key, mime_type) -> str:
+    """Start an S3 multipart upload, returning its upload ID.
+
+    Raises:
+        InternalServerError: If the multipart upload could not be started.
+
+    """
+    try:
+        response = s3.create_multipart_upload(
+            Bucket=bucket_name,
+            Key=file_key,
+            ContentType=mime_type,
+        )
+    except ClientError as e:
+        logger.error(f"Error starting multipart upload: {e}")
+        raise InternalServerError("Could not start multipart upload to S3.") from e
+
+    return response["UploadId"]
+
+
+def generate_presigned_part_urls(
+    bucket_name, file_key, upload_id, part_count
+) -> list[dict]:
+    """Generate a pre-signed URL for uploading each part of a multipart upload.
+
+    Raises:
+        InternalServerError: If there is an error generating the pre-signed URLs.
+
+    """
+    try:
+        return [
+            {
+                "part_number": part_number,
+                "url": s3.generate_presigned_url(
+                    "upload_part",
+                    Params={
+                        "Bucket": bucket_name,
+                        "Key": file_key,
+                        "UploadId": upload_id,
+                        "PartNumber": part_number,
+                    },
+                    ExpiresIn=3600 * 12,  # URLs expire in 12 hours
+                ),
+            }
+            for part_number in range(1, part_count + 1)
+        ]
+    except ClientError as e:
+        logger.error(f"Error generating pre-signed part URLs: {e}")
+        raise InternalServerError(
+            "Could not generate pre-signed URLs for multipart upload."
+        ) from e
+
+
+def multipart_layout(json_body: dict) -> tuple[int, int]:
+    """Choose the part size and part count for a multipart upload.
+
+    Uses "file_size" when given, picking the smallest part size that fits
+    the file in the part limit; otherwise uses "part_count" parts of the
+    default size.
+
+    Raises:
+        ValidationError: If the file cannot be split within the part limits.
+
+    """
+    if "file_size" in json_body:
+        file_size = json_body["file_size"]
+        part_size = max(
+            DEFAULT_PART_BYTES,
+            -(-file_size // MAX_UPLOAD_PARTS),
+        )
+        if part_size > MAX_PART_BYTES:
+            raise ValidationError(
+                "File is too large for a multipart upload.", field="file_size"
+            )
+
+        return part_size, max(1, -(-file_size // part_size))
+
+    return DEFAULT_PART_BYTES, json_body["part_count"]
+
+
+def input_key(job_id: str, mime_type: str) -> str:
+    """S3 key the input file for a job is uploaded to."""
+    return f"input_reports/{job_id}.{SUPPORTED_TYPES[mime_type]['extension']}"
+
+
 @resolver.post("/upload")
 @tracer.capture_method
 def upload_handler():
     """Handle file upload events by generating a pre-signed URL."""
     logger.info("Received file upload event")
 
-    supported_types = {
-        "text/csv": {
-            "extension": "csv",
-        },
-        "application/json": {
-            "extension": "json",
-        },
-    }
-
     event = resolver.current_event
     json_body = event.json_body
 
@@ -121,6 +429,7 @@ def upload_handler():
     config_id = json_body["config_id"]
     institution_id = json_body["institution_id"]
     mime_type = json_body["mime_type"]
+    tag_job(institution_id, config_id)
 
     logger.info("Job name: %s", job_name)
 
@@ -128,9 +437,10 @@ def upload_handler():
         job_name=job_name,
         config_id=config_id,
         institution_id=institution_id,
+        priority=json_body.get("priority", DEFAULT_PRIORITY),
     )
 
-    file_key = f"input_reports/{job_id}.{supported_types[mime_type]['extension']}"
+    file_key = input_key(job_id, mime_type)
 
     presigned_url = generate_presigned_url(
         bucket_name=os.environ["BUCKET_NAME"],
@@ -147,6 +457,716 @@ def upload_handler():
     }
 
 
+@resolver.post("/upload_batch")
+@tracer.capture_method
+def upload_batch_handler():
+    """Handle bulk upload events by creating many jobs and pre-signed uploads at once."""
+    logger.info("Received batch upload event")
+
+    event = resolver.current_event
+    json_body = event.json_body
+
+    validate_upload_batch(json_body)
+
+    jobs = json_body["jobs"]
+    upload_method = json_body.get("upload_method", "put")
+    bucket_name = os.environ["BUCKET_NAME"]
+
+    job_ids = create_dynamo_jobs(jobs)
+
+    uploads = []
+    for job_id, job in zip(job_ids, jobs):
+        file_key = input_key(job_id, job["mime_type"])
+        upload = {"job_id": job_id, "job_name": job["job_name"], "key": file_key}
+
+        if upload_method == "post":
+            presigned_post = generate_presigned_post(
+                bucket_name=bucket_name,
+                file_key=file_key,
+                mime_type=job["mime_type"],
+            )
+            upload["url"] = presigned_post["url"]
+            upload["fields"] = presigned_post["fields"]
+        else:
+            upload["url"] = generate_presigned_url(
+                bucket_name=bucket_name,
+                file_key=file_key,
+                mime_type=job["mime_type"],
+            )
+
+        uploads.append(upload)
+
+    logger.info(f"Created {len(uploads)} jobs in batch upload")
+
+    return {
+        "statusCode": 200,
+        "body": {"jobs": uploads},
+        "headers": {"Content-Type": "application/json"},
+    }
+
+
+@resolver.post("/upload_multipart")
+@tracer.capture_method
+def upload_multipart_handler():
+    """Handle large file upload events by starting a multipart upload and
+    generating a pre-signed URL for each part."""
+    logger.info("Received multipart upload event")
+
+    event = resolver.current_event
+    json_body = event.json_body
+
+    validate_upload_multipart(json_body)
+
+    mime_type = json_body["mime_type"]
+    bucket_name = os.environ["BUCKET_NAME"]
+    part_size, part_count = multipart_layout(json_body)
+    tag_job(json_body["institution_id"], json_body["config_id"])
+
+    job_id = create_dynamo_job(
+        job_name=json_body["job_name"],
+        config_id=json_body["config_id"],
+        institution_id=json_body["institution_id"],
+        priority=json_body.get("priority", DEFAULT_PRIORITY),
+    )
+
+    file_key = input_key(job_id, mime_type)
+    upload_id = create_multipart_upload(bucket_name, file_key, mime_type)
+    parts = generate_presigned_part_urls(bucket_name, file_key, upload_id, part_count)
+
+    logger.info(f"Started multipart upload for job {job_id} with {part_count} parts")
+
+    return {
+        "statusCode": 200,
+        "body": {
+            "job_id": job_id,
+            "key": file_key,
+            "upload_id": upload_id,
+            "part_size": part_size,
+            "parts": parts,
+        },
+        "headers": {"Content-Type": "application/json"},
+    }
+
+
+@resolver.post("/upload_multipart/complete")
+@tracer.capture_method
+def complete_multipart_handler():
+    """Handle completed multipart uploads by assembling the uploaded parts.
+    Processing starts once S3 reports the completed upload."""
+    logger.info("Received multipart upload completion event")
+
+    event = resolver.current_event
+    json_body = event.json_body
+
+    validate_complete_multipart(json_body)
+
+    job_id = json_body["job_id"]
+    file_key = json_body["key"]
+
+    try:
+        s3.complete_multipart_upload(
+            Bucket=os.environ["BUCKET_NAME"],
+            Key=file_key,
+            UploadId=json_body["upload_id"],
+            MultipartUpload={
+                "Parts": sorted(
+                    (
+                        {"PartNumber": part["part_number"], "ETag": part["etag"]}
+                        for part in json_body["parts"]
+                    ),
+                    key=lambda part: part["PartNumber"],
+                )
+            },
+        )
+    except ClientError as e:
+        error_code = e.response.get("Error", {}).get("Code", "Unknown")
+        logger.error(f"Error completing multipart upload: {e}")
+        if error_code in ("NoSuchUpload", "InvalidPart", "InvalidPartOrder"):
+            raise ValidationError(
+                f"Could not complete multipart upload: {error_code}", field="parts"
+            ) from e
+        raise InternalServerError("Could not complete multipart upload.") from e
+
+    return {
+        "statusCode": 200,
+        "body": {"job_id": job_id, "key": file_key, "message": "Upload complete."},
+        "headers": {"Content-Type": "application/json"},
+    }
+
+
+def start_inline_processing(job_id: str, job: dict, report: str) -> str:
+    """Start record processing for a report passed inline, returning the
+    execution ARN.
+
+    Raises:
+        InternalServerError: If the step function could not be started.
+
+    """
+    try:
+        response = sfn.start_execution(
+            stateMachineArn=STEP_FUNCTION_ARN,
+            input=json.dumps({"jobId": job_id, "job": job, "report": report}),
+        )
+    except ClientError as e:
+        logger.error(f"Error starting record processing: {e}")
+        raise InternalServerError("Could not start processing for job.") from e
+
+    return response["executionArn"]
+
+
+def wait_for_result(execution_arn: str, wait_seconds: float) -> dict | None:
+    """Wait up to wait_seconds for the processing execution to finish.
+
+    Returns:
+        dict | None: The job result if processing finished in time, or None.
+
+    Raises:
+        InternalServerError: If the execution could not be described.
+
+    """
+    deadline = time.monotonic() + wait_seconds
+
+    while True:
+        try:
+            execution = sfn.describe_execution(executionArn=execution_arn)
+        except ClientError as e:
+            logger.error(f"Error describing execution: {e}")
+            raise InternalServerError("Could not check processing status.") from e
+
+        if execution["status"] == "SUCCEEDED":
+            output = json.loads(execution.get("output", "{}"))
+            return output.get("Payload", {}).get("result", None)
+
+        if execution["status"] != "RUNNING":
+            logger.error(f"Execution {execution_arn} ended as {execution['status']}")
+            return {"error": "Processing did not complete."}
+
+        if time.monotonic() + CLASSIFY_POLL_SECONDS > deadline:
+            return None
+
+        time.sleep(CLASSIFY_POLL_SECONDS)
+
+
+@resolver.post("/classify")
+@tracer.capture_method
+def classify_handler():
+    """Handle reports submitted inline by starting processing directly, without
+    an S3 upload. Waits up to "wait_seconds" for the result."""
+    logger.info("Received inline classification event")
+
+    event = resolver.current_event
+    json_body = event.json_body
+
+    validate_classify(json_body)
+
+    job = {
+        "config_id": json_body["config_id"],
+        "institution_id": json_body["institution_id"],
+    }
+    tag_job(job["institution_id"], job["config_id"])
+
+    job_id = create_dynamo_job(
+        job_name=json_body.get("job_name", "inline_report"),
+        config_id=job["config_id"],
+        institution_id=job["institution_id"],
+        status="started",
+    )
+
+    execution_arn = start_inline_processing(job_id, job, json_body["report"])
+
+    wait_seconds = json_body.get("wait_seconds", 0)
+    result = wait_for_result(execution_arn, wait_seconds) if wait_seconds else None
+
+    if result is None:
+        return {
+            "statusCode": 202,
+            "body": {"job_id": job_id, "status": "started"},
+            "headers": {"Content-Type": "application/json"},
+        }
+
+    return {
+        "statusCode": 200,
+        "body": {
+            "job_id": job_id,
+            "status": "failed" if "error" in result else "completed",
+            "result": result,
+        },
+        "headers": {"Content-Type": "application/json"},
+    }
+
+
+def sync_classify_job_id(report: str, config_id: str, institution_id: str) -> str:
+    """Job ID shared by every request classifying the same report under the
+    same config and institution."""
+    report_hash = hashlib.sha256(report.encode("utf-8")).hexdigest()
+    return str(
+        uuid.uuid5(
+            SYNC_CLASSIFY_NAMESPACE, "\n".join([config_id, institution_id, report_hash])
+        )
+    )
+
+
+def claim_sync_classification(
+    job_id: str, job_name: str, config_id: str, institution_id: str
+) -> bool:
+    """Claim the job for a synchronous classification unless an identical one
+    is already in flight or recently finished.
+
+    A failed, stale or expired job with the same ID is claimed again in place:
+    only its claim fields are updated and its superseded result dropped, so
+    the job keeps its name, creation time and the errors of earlier attempts.
+
+    Raises:
+        InternalServerError: If the job could not be written to DynamoDB.
+
+    Returns:
+        bool: Whether this request should run the classification.
+
+    """
+    now = datetime.now(timezone.utc)
+    item = job_item(job_id, job_name, config_id, institution_id, status="processing")
+    try:
+        dynamodb.update_item(
+            TableName=JOB_TABLE,
+            Key={"job_id": item["job_id"]},
+            UpdateExpression=(
+                "SET job_name = if_not_exists(job_name, :job_name), "
+                "config_id = if_not_exists(config_id, :config_id), "
+                "institution_id = if_not_exists(institution_id, :institution_id), "
+                "#priority = if_not_exists(#priority, :priority), "
+                "created_at = if_not_exists(created_at, :created_at), "
+                "#status = :processing, claimed_at = :created_at, "
+                "expires_at = :expires_at "
+                "REMOVE #result, completed_at"
+            ),
+            ConditionExpression=(
+                "attribute_not_exists(job_id) OR #status = :failed "
+                "OR completed_at < :reuse_cutoff "
+                "OR (#status = :processing AND (claimed_at < :stale_cutoff "
+                "OR (attribute_not_exists(claimed_at) AND created_at < :stale_cutoff)))"
+            ),
+            ExpressionAttributeNames={
+                "#status": "status",
+                "#priority": "priority",
+                "#result": "result",
+            },
+            ExpressionAttributeValues={
+                ":job_name": item["job_name"],
+                ":config_id": item["config_id"],
+                ":institution_id": item["institution_id"],
+                ":priority": item["priority"],
+                ":created_at": item["created_at"],
+                ":expires_at": item["expires_at"],
+                ":failed": {"S": "failed"},
+                ":processing": {"S": "processing"},
+                ":reuse_cutoff": {
+                    "S": datetime.fromtimestamp(
+                        now.timestamp() - SYNC_CLASSIFY_REUSE_SECONDS, timezone.utc
+                    ).isoformat()
+                },
+                ":stale_cutoff": {
+                    "S": datetime.fromtimestamp(
+                        now.timestamp() - SYNC_CLASSIFY_STALE_SECONDS, timezone.utc
+                    ).isoformat()
+                },
+            },
+        )
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") == "ConditionalCheckFailedException":
+            return False
+        logger.error(f"Error creating job in job table: {e}")
+        raise InternalServerError("Error creating job in DynamoDB.") from e
+
+    return True
+
+
+def invoke_record_processor(
+    job_id: str, job: dict, report: str
+) -> tuple[dict, dict | None]:
+    """Classify a report by invoking the record processor synchronously.
+
+    Raises:
+        InternalServerError: If the record processor could not be invoked or failed.
+
+    Returns:
+        tuple[dict, dict | None]: The result, with either an "output" or an
+            "error" key, and the model tokens used.
+
+    """
+    try:
+        response = lambda_client.invoke(
+            FunctionName=RECORD_PROCESSOR_FUNCTION,
+            InvocationType="RequestResponse",
+            Payload=json.dumps(
+                {"source": "api", "jobId": job_id, "job": job, "report": report}
+            ),
+        )
+        payload = json.loads(response["Payload"].read())
+    except (ClientError, json.JSONDecodeError) as e:
+        logger.error(f"Error invoking record processor: {e}")
+        raise InternalServerError("Could not process report.") from e
+
+    if "FunctionError" in response:
+        logger.error(f"Record processor failed for job {job_id}: {payload}")
+        raise InternalServerError("Could not process report.")
+
+    return (
+        payload.get("result", None) or {"error": "Processing did not complete."},
+        payload.get("usage", None),
+    )
+
+
+def record_sync_classification(
+    job_id: str, result: dict, usage: dict | None = None
+) -> None:
+    """Store the result of a synchronous classification on its job, where
+    identical requests waiting on it pick it up, along with the model tokens
+    it used. Errors are also appended to the job's error history, which
+    outlives the result when the job is claimed again.
+
+    Raises:
+        InternalServerError: If the job could not be updated in DynamoDB.
+
+    """
+    update_expression = (
+        "SET #status = :status, #result = :result, completed_at = :completed_at"
+    )
+    expression_values = {
+        ":status": {"S": "failed" if "error" in result else "completed"},
+        ":result": {"S": json.dumps(result, separators=(",", ":"))},
+        ":completed_at": {"S": datetime.now(timezone.utc).isoformat()},
+    }
+
+    if "error" in result:
+        update_expression += (
+            ", errors = list_append(if_not_exists(errors, :no_errors), :error)"
+        )
+        expression_values[":no_errors"] = {"L": []}
+        expression_values[":error"] = {
+            "L": [
+                {
+                    "M": {
+                        "error": {"S": str(result["error"])},
+                        "failed_at": expression_values[":completed_at"],
+                    }
+                }
+            ]
+        }
+
+    if usage:
+        update_expression += (
+            ", input_tokens = :input_tokens, output_tokens = :output_tokens"
+            ", model_calls = :model_calls, token_budget_exceeded = :budget_exceeded"
+        )
+        expression_values[":input_tokens"] = {"N": str(usage["input_tokens"])}
+        expression_values[":output_tokens"] = {"N": str(usage["output_tokens"])}
+        expression_values[":model_calls"] = {"N": str(usage["model_calls"])}
+        expression_values[":budget_exceeded"] = {
+            "BOOL": bool(usage.get("budget_exceeded", False))
+        }
+
+    try:
+        dynamodb.update_item(
+            TableName=JOB_TABLE,
+            Key={"job_id": {"S": job_id}},
+            UpdateExpression=update_expression,
+            ExpressionAttributeNames={"#status": "status", "#result": "result"},
+            ExpressionAttributeValues=expression_values,
+        )
+    except ClientError as e:
+        logger.error(f"Error recording result for job {job_id}: {e}")
+        raise InternalServerError("Error updating job in DynamoDB.") from e
+
+
+def wait_for_sync_classification(job_id: str, wait_seconds: float) -> dict | None:
+    """Wait up to wait_seconds for an identical classification in flight.
+
+    Returns:
+        dict | None: The shared result if it finished in time, or None.
+
+    Raises:
+        InternalServerError: If the job could not be read from DynamoDB.
+
+    """
+    deadline = time.monotonic() + wait_seconds
+
+    while True:
+        try:
+            item = dynamodb.get_item(
+                TableName=JOB_TABLE,
+                Key={"job_id": {"S": job_id}},
+                ProjectionExpression="#status, #result",
+                ExpressionAttributeNames={"#status": "status", "#result": "result"},
+            ).get("Item", {})
+        except ClientError as e:
+            logger.error(f"Error reading job {job_id}: {e}")
+            raise InternalServerError("Could not check processing status.") from e
+
+        if "result" in item:
+            return json.loads(item["result"]["S"])
+
+        if time.monotonic() + CLASSIFY_POLL_SECONDS > deadline:
+            return None
+
+        time.sleep(CLASSIFY_POLL_SECONDS)
+
+
+def sync_classify_wait_seconds() -> float:
+    """How long a request may wait on a classification in flight: at most
+    SYNC_CLASSIFY_WAIT_SECONDS, and never past the invocation's remaining
+    time, so it answers 202 rather than timing out."""
+    context = resolver.lambda_context
+    if context is None:
+        return SYNC_CLASSIFY_WAIT_SECONDS
+
+    remaining = context.get_remaining_time_in_millis() / 1000
+    return max(
+        0, min(SYNC_CLASSIFY_WAIT_SECONDS, remaining - SYNC_CLASSIFY_RESERVE_SECONDS)
+    )
+
+
+@resolver.post("/classify/sync")
+@tracer.capture_method
+def classify_sync_handler():
+    """Handle reports submitted inline by classifying them within the request.
+    Identical requests in flight at the same time share one classification."""
+    logger.info("Received synchronous classification event")
+
+    event = resolver.current_event
+    json_body = event.json_body
+
+    validate_classify(json_body)
+
+    report = json_body["report"]
+    job = {
+        "config_id": json_body["config_id"],
+        "institution_id": json_body["institution_id"],
+    }
+    tag_job(job["institution_id"], job["config_id"])
+    job_id = sync_classify_job_id(report, job["config_id"], job["institution_id"])
+
+    if claim_sync_classification(
+        job_id,
+        json_body.get("job_name", "inline_report"),
+        job["config_id"],
+        job["institution_id"],
+    ):
+        try:
+            result, usage = invoke_record_processor(job_id, job, report)
+        except InternalServerError:
+            record_sync_classification(
+                job_id, {"error": "Processing did not complete."}
+            )
+            raise
+        record_sync_classification(job_id, result, usage)
+    else:
+        logger.info(f"Sharing classification already started for job {job_id}")
+        result = wait_for_sync_classification(job_id, sync_classify_wait_seconds())
+
+    if result is None:
+        return {
+            "statusCode": 202,
+            "body": {"job_id": job_id, "status": "processing"},
+            "headers": {"Content-Type": "application/json"},
+        }
+
+    return {
+        "statusCode": 200,
+        "body": {
+            "job_id": job_id,
+            "status": "failed" if "error" in result else "completed",
+            "result": result,
+        },
+        "headers": {"Content-Type": "application/json"},
+    }
+
+
+def projection(fields: tuple[str, ...]) -> dict:
+    """Build ProjectionExpression arguments for the given job fields,
+    aliasing every field so reserved words such as "status" can be used."""
+    return {
+        "ProjectionExpression": ", ".join(f"#{field}" for field in fields),
+        "ExpressionAttributeNames": {f"#{field}": field for field in fields},
+    }
+
+
+def attribute_value(value: dict):
+    """Convert a DynamoDB attribute value to a plain value."""
+    if "N" in value:
+        return int(value["N"])
+    if "S" in value:
+        return value["S"]
+    if "BOOL" in value:
+        return value["BOOL"]
+    return None
+
+
+def job_etag(body: dict) -> str:
+    """Strong ETag over a response body, letting pollers skip unchanged jobs."""
+    digest = hashlib.sha256(
+        json.dumps(body, sort_keys=True, separators=(",", ":")).encode("utf-8")
+    ).hexdigest()
+    return f'"{digest[:32]}"'
+
+
+def conditional_response(body: dict) -> Response:
+    """Respond with the body and its ETag, or with 304 Not Modified when the
+    request's If-None-Match already names it."""
+    etag = job_etag(body)
+    if_none_match = resolver.current_event.headers.get("If-None-Match") or ""
+
+    if etag in (tag.strip() for tag in if_none_match.split(",")):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    return Response(
+        status_code=200,
+        content_type="application/json",
+        body={
+            "statusCode": 200,
+            "body": body,
+            "headers": {"Content-Type": "application/json"},
+        },
+        headers={"ETag": etag},
+    )
+
+
+def generate_presigned_get(bucket_name, file_key) -> str:
+    """Generate a pre-signed URL for downloading a job result from S3.
+
+    Raises:
+        InternalServerError: If there is an error generating the pre-signed URL.
+
+    """
+    try:
+        return s3.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": bucket_name, "Key": file_key},
+            ExpiresIn=3600,  # URL expires in 1 hour
+        )
+    except ClientError as e:
+        logger.error(f"Error generating pre-signed download URL: {e}")
+        raise InternalServerError(
+            "Could not generate pre-signed URL for job result."
+        ) from e
+
+
+def encode_page_token(last_evaluated_key: dict | None) -> str | None:
+    if not last_evaluated_key:
+        return None
+    return base64.urlsafe_b64encode(
+        json.dumps(last_evaluated_key, separators=(",", ":")).encode("utf-8")
+    ).decode("ascii")
+
+
+def decode_page_token(token: str, status: str) -> dict:
+    """Decode a "next_token" from a previous page of GET /jobs for status.
+
+    Raises:
+        ValidationError: If the token is malformed, or isn't the key of a job
+            with the given status.
+
+    """
+    try:
+        key = json.loads(base64.urlsafe_b64decode(token.encode("ascii")))
+    except (ValueError, UnicodeEncodeError) as e:
+        raise ValidationError("Invalid next_token.", field="next_token") from e
+
+    if (
+        not isinstance(key, dict)
+        or set(key) != set(JOB_PAGE_KEY_ATTRIBUTES)
+        or not all(
+            isinstance(value, dict)
+            and list(value) == ["S"]
+            and isinstance(value["S"], str)
+            for value in key.values()
+        )
+        or key["status"]["S"] != status
+    ):
+        raise ValidationError("Invalid next_token.", field="next_token")
+
+    return key
+
+
+@resolver.get("/jobs/<job_id>")
+@tracer.capture_method
+def get_job_handler(job_id: str):
+    """Handle job status requests, returning the job's progress and, once it
+    has completed, a pre-signed URL for its result."""
+    logger.info(f"Received job status request for job {job_id}")
+
+    try:
+        item = dynamodb.get_item(
+            TableName=JOB_TABLE,
+            Key={"job_id": {"S": job_id}},
+            **projection(JOB_DETAIL_FIELDS),
+        ).get("Item", None)
+    except ClientError as e:
+        logger.error(f"Error reading job {job_id}: {e}")
+        raise InternalServerError("Could not retrieve job.") from e
+
+    if not item:
+        raise NotFoundError(f"No job found with ID: {job_id}", field="job_id")
+
+    job = {field: attribute_value(value) for field, value in item.items()}
+    if "result" in job:
+        job["result"] = json.loads(job["result"])
+
+    response = conditional_response(job)
+
+    if response.status_code == 200 and job.get("result_key"):
+        response.body["body"]["result_url"] = generate_presigned_get(
+            OUTPUT_BUCKET_NAME, job["result_key"]
+        )
+
+    return response
+
+
+@resolver.get("/jobs")
+@tracer.capture_method
+def list_jobs_handler():
+    """Handle job listing requests for a single status, newest first."""
+    logger.info("Received job list request")
+
+    event = resolver.current_event
+    status = event.get_query_string_value("status", default_value=None)
+    limit = event.get_query_string_value(
+        "limit", default_value=str(DEFAULT_JOB_LIST_LIMIT)
+    )
+    next_token = event.get_query_string_value("next_token", default_value=None)
+
+    limit = validate_list_jobs(status, limit)
+
+    query = {
+        "TableName": JOB_TABLE,
+        "IndexName": JOB_STATUS_INDEX,
+        "KeyConditionExpression": "#status = :status",
+        "ExpressionAttributeValues": {":status": {"S": status}},
+        "ScanIndexForward": False,
+        "Limit": limit,
+        **projection(JOB_LIST_FIELDS),
+    }
+    if next_token:
+        query["ExclusiveStartKey"] = decode_page_token(next_token, status)
+
+    try:
+        response = dynamodb.query(**query)
+    except ClientError as e:
+        logger.error(f"Error listing jobs with status {status}: {e}")
+        raise InternalServerError("Could not list jobs.") from e
+
+    jobs = [
+        {field: attribute_value(value) for field, value in item.items()}
+        for item in response.get("Items", [])
+    ]
+
+    return conditional_response(
+        {
+            "jobs": jobs,
+            "next_token": encode_page_token(response.get("LastEvaluatedKey", None)),
+        }
+    )
+
+
 def store_or_update_config(
     config_name: str,
     config_data: dict,
@@ -224,7 +1244,14 @@ def validate_env() -> None:
         InternalServerError: If any required environment variable is missing.
 
     """
-    required_env_vars = ["JOB_TABLE", "BUCKET_NAME", "CONFIG_TABLE_NAME"]
+    required_env_vars = [
+        "JOB_TABLE",
+        "BUCKET_NAME",
+        "CONFIG_TABLE_NAME",
+        "OUTPUT_BUCKET_NAME",
+        "STEP_FUNCTION_ARN",
+        "RECORD_PROCESSOR_FUNCTION",
+    ]
     missing_vars = [var for var in required_env_vars if not os.environ.get(var)]
     if missing_vars:
         raise InternalServerError()
@@ -249,7 +1276,8 @@ def validate_upload(json_body: dict) -> bool:
     """Validate the JSON body of the upload request.
 
     Raises:
-        ValidationError: If any required field is missing in the JSON body.
+        ValidationError: If any required field is missing in the JSON body,
+            or the mime type or priority is unknown.
 
     """
     required_fields = ["job_name", "config_id", "institution_id", "mime_type"]
@@ -259,7 +1287,189 @@ def validate_upload(json_body: dict) -> bool:
             logger.error(f"Missing required field: {field}")
             raise ValidationError(f"Missing required field: {field}", field=field)
 
+    if json_body["mime_type"] not in SUPPORTED_TYPES:
+        logger.error(f"Unsupported mime type: {json_body['mime_type']}")
+        raise ValidationError(
+            f"Unsupported mime type: {json_body['mime_type']}", field="mime_type"
+        )
+
+    if json_body.get("priority", DEFAULT_PRIORITY) not in JOB_PRIORITIES:
+        logger.error(f"Unknown priority: {json_body['priority']}")
+        raise ValidationError(
+            f"Field 'priority' must be one of {', '.join(JOB_PRIORITIES)}.",
+            field="priority",
+        )
+
+
+def validate_upload_batch(json_body: dict) -> None:
+    """Validate the JSON body of the batch upload request.
+
+    Raises:
+        ValidationError: If the job list is missing, empty or too long, the
+            upload method is unknown, or any job is invalid.
+
+    """
+    jobs = json_body.get("jobs", None)
+
+    if not isinstance(jobs, list) or not jobs:
+        logger.error("Missing or empty job list")
+        raise ValidationError("Field 'jobs' must be a non-empty list.", field="jobs")
+
+    if len(jobs) > MAX_BATCH_JOBS:
+        logger.error(f"Too many jobs in batch upload: {len(jobs)}")
+        raise ValidationError(
+            f"At most {MAX_BATCH_JOBS} jobs can be uploaded at once.", field="jobs"
+        )
+
+    if json_body.get("upload_method", "put") not in ("put", "post"):
+        raise ValidationError(
+            "Field 'upload_method' must be 'put' or 'post'.", field="upload_method"
+        )
+
+    for i, job in enumerate(jobs):
+        if not isinstance(job, dict):
+            raise ValidationError(f"Job {i} must be an object.", field=f"jobs[{i}]")
+
+        try:
+            validate_upload(job)
+        except ValidationError as e:
+            raise ValidationError(
+                f"Job {i}: {e.message}", field=f"jobs[{i}].{e.field}"
+            ) from e
+
+
+def validate_upload_multipart(json_body: dict) -> None:
+    """Validate the JSON body of the multipart upload request.
+
+    Raises:
+        ValidationError: If any upload field is invalid, or neither a valid
+            file size nor a valid part count is given.
+
+    """
+    validate_upload(json_body)
+
+    if "file_size" in json_body:
+        file_size = json_body["file_size"]
+        if not isinstance(file_size, int) or file_size <= 0:
+            raise ValidationError(
+                "Field 'file_size' must be a positive integer.", field="file_size"
+            )
+    elif "part_count" in json_body:
+        part_count = json_body["part_count"]
+        if not isinstance(part_count, int) or not 1 <= part_count <= MAX_UPLOAD_PARTS:
+            raise ValidationError(
+                f"Field 'part_count' must be between 1 and {MAX_UPLOAD_PARTS}.",
+                field="part_count",
+            )
+    else:
+        raise ValidationError(
+            "Missing required field: file_size or part_count", field="file_size"
+        )
+
+
+def validate_complete_multipart(json_body: dict) -> None:
+    """Validate the JSON body of the multipart upload completion request.
+
+    Raises:
+        ValidationError: If any required field is missing, the key does not
+            belong to the job, or the part list is malformed.
+
+    """
+    required_fields = ["job_id", "key", "upload_id", "parts"]
+
+    for field in required_fields:
+        if field not in json_body:
+            logger.error(f"Missing required field: {field}")
+            raise ValidationError(f"Missing required field: {field}", field=field)
+
+    job_id = json_body["job_id"]
+    if json_body["key"] not in (
+        input_key(job_id, mime_type) for mime_type in SUPPORTED_TYPES
+    ):
+        raise ValidationError("Key does not belong to the job.", field="key")
+
+    parts = json_body["parts"]
+    if not isinstance(parts, list) or not parts:
+        raise ValidationError("Field 'parts' must be a non-empty list.", field="parts")
+
+    for part in parts:
+        if (
+            not isinstance(part, dict)
+            or not isinstance(part.get("part_number"), int)
+            or not isinstance(part.get("etag"), str)
+        ):
+            raise ValidationError(
+                "Each part must have an integer 'part_number' and a string 'etag'.",
+                field="parts",
+            )
+
+
+def validate_classify(json_body: dict) -> None:
+    """Validate the JSON body of the inline classification request.
+
+    Raises:
+        ValidationError: If any required field is missing, the report is
+            empty or too large, or the wait time is out of range.
+
+    """
+    required_fields = ["config_id", "institution_id", "report"]
+
+    for field in required_fields:
+        if field not in json_body:
+            logger.error(f"Missing required field: {field}")
+            raise ValidationError(f"Missing required field: {field}", field=field)
+
+    report = json_body["report"]
+    if not isinstance(report, str) or not report.strip():
+        raise ValidationError(
+            "Field 'report' must be a non-empty string.", field="report"
+        )
+
+    if len(report.encode("utf-8")) > MAX_INLINE_REPORT_BYTES:
+        raise ValidationError(
+            f"Reports over {MAX_INLINE_REPORT_BYTES} bytes must be uploaded with /upload.",
+            field="report",
+        )
+
+    wait_seconds = json_body.get("wait_seconds", 0)
+    if (
+        not isinstance(wait_seconds, (int, float))
+        or not 0 <= wait_seconds <= MAX_CLASSIFY_WAIT_SECONDS
+    ):
+        raise ValidationError(
+            f"Field 'wait_seconds' must be between 0 and {MAX_CLASSIFY_WAIT_SECONDS}.",
+            field="wait_seconds",
+        )
+
+
+def validate_list_jobs(status: str | None, limit: str) -> int:
+    """Validate the query parameters of the job list request.
+
+    Raises:
+        ValidationError: If the status is missing or unknown, or the limit is
+            out of range.
+
+    Returns:
+        int: The page size.
+
+    """
+    if status not in JOB_STATUSES:
+        raise ValidationError(
+            f"Query parameter 'status' must be one of: {', '.join(JOB_STATUSES)}",
+            field="status",
+        )
+
+    if not limit.isdigit() or not 1 <= int(limit) <= MAX_JOB_LIST_LIMIT:
+        raise ValidationError(
+            f"Query parameter 'limit' must be between 1 and {MAX_JOB_LIST_LIMIT}.",
+            field="limit",
+        )
+
+    return int(limit)
+
 
+@metrics.log_metrics(capture_cold_start_metric=True)
+@tracer.capture_lambda_handler
 @handle_errors
 def handler(event: dict, context: LambdaContext) -> dict:
     """Handle API Gateway events."""
@@ -8,13 +8,27 @@ from typing import Dict, Any, Optional
 import sys
 
 from audiology_errors.errors import InternalServerError
+from audiology_metrics.instrumentation import instrument_client, metrics, tracer
+from audiology_metrics.snapstart import after_restore
 
 sys.path.append("/opt/python")  # For lambda layers
 
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-secrets_client = boto3.client("secretsmanager")
+
+@after_restore
+def create_clients() -> None:
+    """
+    Creates the AWS clients, at init and again after a SnapStart restore so
+    that restored environments don't share connections.
+    """
+    global secrets_client
+
+    secrets_client = instrument_client(boto3.client("secretsmanager"))
+
+
+create_clients()
 
 # Environment variables
 USER_POOL_ID = os.environ.get("USER_POOL_ID")
@@ -45,6 +59,8 @@ def validate_environment() -> None:
         raise InternalServerError()
 
 
+@metrics.log_metrics(capture_cold_start_metric=True)
+@tracer.capture_lambda_handler
 def handler(event: Dict[str, Any], context: Any) -> Dict[str, Any]:
     """
     Lambda authorizer that validates both API keys and Cognito JWT tokens.
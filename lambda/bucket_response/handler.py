@@ -1,12 +1,16 @@
+import hashlib
 import json
 import logging
 import os
+import re
 import boto3
 import uuid
 import sys
+from datetime import datetime, timezone
 
 sys.path.append("/opt/python")  # For lambda layers
 
+from audiology_metrics.instrumentation import count, instrument_client, metrics, tracer
 from botocore.utils import ClientError
 
 logger = logging.getLogger()
@@ -14,10 +18,18 @@ logger.setLevel(logging.INFO)
 
 
 JOB_TABLE = os.environ.get("JOB_TABLE", None)
-dynamodb = boto3.client("dynamodb")
+dynamodb = instrument_client(boto3.client("dynamodb"))
 
 step_function_arn = os.getenv("STEP_FUNCTION_ARN", None)
-sfn = boto3.client("stepfunctions")
+sfn = instrument_client(boto3.client("stepfunctions"))
+
+# State machine of each processing lane, by job priority; jobs of a priority
+# without one are started in STEP_FUNCTION_ARN
+step_function_arns = json.loads(os.getenv("STEP_FUNCTION_ARNS", "{}"))
+DEFAULT_PRIORITY = "interactive"
+
+# Step Functions execution names: up to 80 letters, digits, - and _
+EXECUTION_NAME_LENGTH = 80
 
 
 def job_exists(job_id: str) -> bool:
@@ -38,9 +50,37 @@ def job_exists(job_id: str) -> bool:
         raise ValueError(f"Error checking job existence: {str(e)}") from e
 
 
-def record_job_dynamo(job_id: str, bucket_name: str, input_key: str):
+def object_version(s3_object: dict) -> str:
+    """
+    Identifies the uploaded object: its version ID in a versioned bucket,
+    otherwise its ETag, which is the same for a re-upload of the same file.
+    """
+
+    return s3_object.get("versionId", None) or s3_object.get("eTag", None) or ""
+
+
+def execution_name(job_id: str, version: str) -> str:
+    """
+    Deterministic Step Functions execution name for processing a version of
+    a job's input, so duplicate events for it can't start a second execution.
+    """
+
+    name = job_id
+    if version:
+        name += "-" + hashlib.sha256(version.encode("utf-8")).hexdigest()[:32]
+
+    return re.sub(r"[^0-9A-Za-z_-]", "-", name)[:EXECUTION_NAME_LENGTH]
+
+
+def record_job_dynamo(
+    job_id: str, bucket_name: str, input_key: str, version: str = ""
+) -> str | None:
     """
-    Updates the DynamoDB job record with the input s3 path and status.
+    Updates the DynamoDB job record with the input s3 path and status,
+    moving a created job to started, and returns the job's priority.
+    Returns None without updating it for a duplicate event, when the job has
+    already moved past started or was started for another version of its
+    input.
     """
 
     if JOB_TABLE is None:
@@ -48,27 +88,49 @@ def record_job_dynamo(job_id: str, bucket_name: str, input_key: str):
 
     s3_path = f"s3://{bucket_name}/{input_key}"
 
-    if not job_exists(job_id):
-        raise ValueError(f"Job with ID {job_id} does not exist.")
-
     try:
-        dynamodb.update_item(
+        response = dynamodb.update_item(
             TableName=JOB_TABLE,
             Key={"job_id": {"S": job_id}},
-            UpdateExpression="SET input_bucket = :input_bucket, input_key = :input_key, #status = :status",
+            UpdateExpression="SET input_bucket = :input_bucket, input_key = :input_key, input_version = :input_version, #status = :status, queued_at = if_not_exists(queued_at, :queued_at)",
+            # Events repeated before the execution started can start it again,
+            # which is idempotent under its deterministic name, and keep the
+            # time the job was first queued
+            ConditionExpression=(
+                "attribute_exists(job_id) AND (#status = :created "
+                "OR (#status = :status AND input_version = :input_version))"
+            ),
             ExpressionAttributeValues={
                 ":input_bucket": {"S": bucket_name},
                 ":input_key": {"S": input_key},
+                ":input_version": {"S": version},
                 ":status": {"S": "started"},
+                ":created": {"S": "created"},
+                ":queued_at": {"S": datetime.now(timezone.utc).isoformat()},
             },
             ExpressionAttributeNames={
                 "#status": "status",
             },
+            ReturnValues="ALL_NEW",
+            ReturnValuesOnConditionCheckFailure="ALL_OLD",
         )
 
         logger.info(f"Successfully recorded job {job_id} with S3 path {s3_path}")
+        attributes = response.get("Attributes", {})
+        return attributes.get("priority", {}).get("S", None) or DEFAULT_PRIORITY
 
     except ClientError as e:
+        if e.response["Error"]["Code"] == "ConditionalCheckFailedException":
+            if "Item" not in e.response:
+                raise ValueError(f"Job with ID {job_id} does not exist.")
+
+            status = e.response["Item"].get("status", {}).get("S", None)
+            logger.warning(
+                f"Ignoring duplicate start of job {job_id} (status: {status})."
+            )
+            count("DuplicateJobStart")
+            return None
+
         error_code = e.response["Error"]["Code"]
         error_message = e.response["Error"]["Message"]
         logger.error(f"DynamoDB ClientError: {error_code} - {error_message}")
@@ -81,28 +143,58 @@ def record_job_dynamo(job_id: str, bucket_name: str, input_key: str):
         raise Exception(f"Failed to record job {job_id}: {str(e)}")
 
 
-def trigger_record_processing(job_id: str):
+def lane_step_function_arn(priority: str) -> str:
+    """
+    The state machine of the processing lane for jobs of the given priority.
+    """
+
+    return step_function_arns.get(priority, None) or step_function_arn
+
+
+def trigger_record_processing(
+    job_id: str, name: str | None = None, priority: str = DEFAULT_PRIORITY
+):
     """
-    Triggers the step function for record processing with the given job name.
+    Triggers the step function of the job's processing lane for record
+    processing with the given job name. Returns None if an execution with the
+    given execution name already exists.
     """
 
+    state_machine_arn = lane_step_function_arn(priority)
+
     try:
         response = sfn.start_execution(
-            stateMachineArn=step_function_arn,
+            stateMachineArn=state_machine_arn,
+            name=name or execution_name(job_id, ""),
             input=json.dumps({"jobId": job_id}),
         )
         logger.info(
             f"Step function triggered for job {job_id}. Execution ARN: {response['executionArn']}"
         )
+        count(f"Lane{priority.capitalize()}Started")
         return response["executionArn"]
+    except sfn.exceptions.ExecutionAlreadyExists:
+        logger.warning(f"Execution {name} for job {job_id} already exists.")
+        count("DuplicateJobStart")
+        return None
     except Exception as e:
         raise ValueError(f"Error triggering step function: {str(e)}") from e
 
 
+@metrics.log_metrics(capture_cold_start_metric=True)
+@tracer.capture_lambda_handler
 def handler(event: dict, context: dict) -> dict:
     """
     Responds to put events by logging the job and triggering a
     step function response.
+
+    S3 delivers events at least once, so starts are idempotent: a job is
+    only started from the created status, under an execution name derived
+    from the job ID and the uploaded object's version, and duplicate events
+    are ignored.
+
+    Jobs are started in the state machine of their priority's processing
+    lane, and each lane's queue depth is reported as jobs are started.
     """
     if step_function_arn is None:
         raise ValueError("STEP_FUNCTION_ARN environment variable is not set.")
@@ -114,15 +206,25 @@ def handler(event: dict, context: dict) -> dict:
         logger.debug("Processing record:", json.dumps(record, indent=2))
         event_name = record.get("eventName", "")
 
-        # Only respond to ObjectCreated:Put events
+        # Only respond to uploads through presigned PUT and POST requests and
+        # completed multipart uploads
         match event_name:
-            case "ObjectCreated:Put":
+            case (
+                "ObjectCreated:Put"
+                | "ObjectCreated:Post"
+                | "ObjectCreated:CompleteMultipartUpload"
+            ):
                 bucket_name = record["s3"]["bucket"]["name"]
                 object_key = record["s3"]["object"]["key"]
                 job_id = os.path.splitext(object_key.split("/")[-1])[0]
+                version = object_version(record["s3"]["object"])
 
                 try:
-                    record_job_dynamo(job_id, bucket_name, object_key)
+                    priority = record_job_dynamo(
+                        job_id, bucket_name, object_key, version
+                    )
+                    if priority is None:
+                        continue
                     logger.info(f"Job {job_id} recorded successfully.")
 
                 except ValueError as e:
@@ -132,7 +234,9 @@ def handler(event: dict, context: dict) -> dict:
                 # TODO: more correct error handling
                 try:
                     # TODO: return val
-                    trigger_record_processing(job_id)
+                    trigger_record_processing(
+                        job_id, execution_name(job_id, version), priority
+                    )
                     logger.info(f"Step function triggered for job {job_id}.")
                 except ValueError as e:
                     logger.error(f"Error triggering step function: {str(e)}")
@@ -0,0 +1,148 @@
+import gzip
+import io
+import json
+import os
+from typing import Iterable, Iterator
+
+from columns import compile_columns, record_row
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:  # Parquet export is optional
+    pa = None
+    pq = None
+
+COMPACT_SEPARATORS = (",", ":")
+
+# Rows buffered before being written as a Parquet row group; only one row
+# group is held in memory at a time
+PARQUET_ROW_GROUP_ROWS = 10_000
+
+
+def is_batch(job_info: dict) -> bool:
+    """
+    Whether the job result holds processed records from a multi-patient job,
+    either inline or already archived by the record processor.
+    """
+
+    return is_archived(job_info) or isinstance(job_info.get("records", None), list)
+
+
+def is_archived(job_info: dict) -> bool:
+    """
+    Whether the record processor already streamed the job's records to the
+    output bucket, leaving only a summary in the result.
+    """
+
+    return bool(job_info.get("records_key", None))
+
+
+def archive_key(job_id: str, job_info: dict) -> str:
+    """
+    Output bucket key of the archived job result.
+    """
+
+    if is_archived(job_info):
+        return job_info["records_key"]
+
+    if is_batch(job_info):
+        return f"completed_jobs/{job_id}.jsonl.gz"
+
+    return f"completed_jobs/{job_id}.json"
+
+
+def serialize_archive(job_info: dict) -> dict:
+    """
+    Serializes a job result for the output bucket, returning the put_object
+    arguments for the body and its content headers.
+
+    Single reports are stored as compact JSON. Multi-patient results are
+    stored as gzip-compressed JSON Lines, one processed record per line.
+    """
+
+    if not is_batch(job_info):
+        return {
+            "Body": json.dumps(job_info, separators=COMPACT_SEPARATORS).encode("utf-8"),
+            "ContentType": "application/json",
+        }
+
+    buffer = io.BytesIO()
+    with gzip.GzipFile(fileobj=buffer, mode="wb") as compressed:
+        for record in job_info["records"]:
+            compressed.write(
+                json.dumps(record, separators=COMPACT_SEPARATORS).encode("utf-8")
+            )
+            compressed.write(b"\n")
+
+    return {
+        "Body": buffer.getvalue(),
+        "ContentType": "application/x-ndjson",
+        "ContentEncoding": "gzip",
+    }
+
+
+def archived_records(s3, bucket_name: str, key: str) -> Iterator[dict]:
+    """
+    Streams processed records back from a gzipped JSON Lines archive without
+    loading the whole archive into memory.
+    """
+
+    body = s3.get_object(Bucket=bucket_name, Key=key)["Body"]
+
+    with gzip.GzipFile(fileobj=body, mode="rb") as compressed:
+        for line in compressed:
+            if line.strip():
+                yield json.loads(line)
+
+
+def parquet_enabled() -> bool:
+    return os.getenv("PARQUET_EXPORT", "false").lower() == "true"
+
+
+def parquet_chunks(
+    records: Iterable[dict], template: dict, headers: list[str]
+) -> Iterator[bytes]:
+    """
+    Serializes processed records to Parquet with one string column per CSV
+    header of the institution, yielding the encoded file a row group at a
+    time so it can be streamed to S3.
+    """
+
+    if pa is None:
+        raise ValueError("Parquet export requires pyarrow to be installed.")
+
+    columns = compile_columns(template, headers)
+    schema = pa.schema([(header, pa.string()) for header in headers])
+    # The writer tracks its own offsets, so the buffer is emptied after
+    # each row group
+    buffer = io.BytesIO()
+    writer = pq.ParquetWriter(buffer, schema, compression="snappy")
+
+    def row_group(rows: list[list[str]]) -> bytes:
+        writer.write_table(
+            pa.Table.from_arrays(
+                [
+                    pa.array([row[i] for row in rows], pa.string())
+                    for i in range(len(headers))
+                ],
+                schema=schema,
+            )
+        )
+        chunk = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return chunk
+
+    rows = []
+    for record in records:
+        rows.append(record_row(record, columns))
+        if len(rows) >= PARQUET_ROW_GROUP_ROWS:
+            yield row_group(rows)
+            rows = []
+
+    if rows:
+        yield row_group(rows)
+
+    writer.close()
+    yield buffer.getvalue()
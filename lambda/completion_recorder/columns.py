@@ -0,0 +1,112 @@
+import json
+import logging
+from typing import Any, Callable
+
+from audiology_common.templates import leaf_paths
+
+logger = logging.getLogger()
+
+# Headers filled from the patient record's input rather than the model output
+INPUT_COLUMNS = {
+    "patient index": ("record_id",),
+    "raw report": ("report",),
+    "audiometric test results": ("results",),
+}
+
+
+def path_labels(path: tuple[str, ...]) -> set[str]:
+    """
+    Header labels a template path can be exported under: any trailing run of
+    its keys, e.g. "Left Ear Type of Loss" for (..., "Left Ear", "Type of Loss"),
+    or the leaf followed by its parent, e.g. "Tier One Risk Factors" for
+    (..., "Risk Factors", "Tier One").
+    """
+
+    labels = {" ".join(path[-k:]).lower() for k in range(1, len(path) + 1)}
+    if len(path) >= 2:
+        labels.add(f"{path[-1]} {path[-2]}".lower())
+
+    return labels
+
+
+def column_paths(template: dict, headers: list[str]) -> list[tuple[str, ...] | None]:
+    """
+    Maps each CSV header to the record path holding its value. Template
+    values are read from the record's "output"; when several template paths
+    match a header, the shallowest one is used (e.g. the overall "Reasoning"
+    over an ear-specific one). Headers matching nothing map to None.
+    """
+
+    candidates = sorted(leaf_paths(template), key=len)
+    labelled = [(path, path_labels(path)) for path in candidates]
+
+    paths = []
+    for header in headers:
+        label = " ".join(header.split()).lower()
+
+        if label in INPUT_COLUMNS:
+            paths.append(INPUT_COLUMNS[label])
+            continue
+
+        match = next((path for path, labels in labelled if label in labels), None)
+        if match is None:
+            logger.warning(f"No template value found for CSV header: {header}")
+            paths.append(None)
+        else:
+            paths.append(("output",) + match)
+
+    return paths
+
+
+def path_getter(path: tuple[str, ...] | None) -> Callable[[dict], Any]:
+    """
+    Builds an accessor for a record path, returning None where any part of
+    the path is missing.
+    """
+
+    if path is None:
+        return lambda record: None
+
+    def get(record: dict) -> Any:
+        value = record
+        for key in path:
+            if not isinstance(value, dict):
+                return None
+            value = value.get(key, None)
+        return value
+
+    return get
+
+
+def cell_value(value: Any) -> str:
+    """
+    Formats a record value as a single tabular cell.
+    """
+
+    if value is None:
+        return ""
+    if isinstance(value, list) and all(isinstance(item, str) for item in value):
+        return "; ".join(value)
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, separators=(",", ":"))
+
+    return str(value)
+
+
+def compile_columns(template: dict, headers: list[str]) -> list[Callable[[dict], str]]:
+    """
+    Precompiles one accessor per header so rows can be produced without
+    re-resolving the template for every record.
+    """
+
+    getters = [path_getter(path) for path in column_paths(template, headers)]
+
+    return [lambda record, get=get: cell_value(get(record)) for get in getters]
+
+
+def record_row(record: dict, columns: list[Callable[[dict], str]]) -> list[str]:
+    """
+    Flattens a processed patient record into a row of cells.
+    """
+
+    return [column(record) for column in columns]
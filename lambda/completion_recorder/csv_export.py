@@ -0,0 +1,82 @@
+import csv
+import io
+from typing import Iterable, Iterator
+
+from audiology_common.streams import TRANSFER_CONFIG, IterStream
+
+from archive import archived_records, is_archived
+from columns import compile_columns, record_row
+
+# Rows are encoded and handed to the upload in chunks of about this size
+CSV_CHUNK_BYTES = 64 * 1024
+
+
+def csv_chunks(
+    records: Iterable[dict], template: dict, headers: list[str]
+) -> Iterator[bytes]:
+    """
+    Flattens processed records into CSV under the institution's headers,
+    yielding encoded chunks of rows.
+    """
+
+    columns = compile_columns(template, headers)
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(headers)
+
+    for record in records:
+        writer.writerow(record_row(record, columns))
+        if buffer.tell() >= CSV_CHUNK_BYTES:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def job_records(s3, bucket_name: str, job_id: str, job_info: dict) -> Iterable[dict]:
+    """
+    The processed records of a job; a single report is exported as one record.
+    Records archived by the record processor are streamed back from S3.
+    """
+
+    if is_archived(job_info):
+        return archived_records(s3, bucket_name, job_info["records_key"])
+
+    if isinstance(job_info.get("records", None), list):
+        return job_info["records"]
+
+    return [{"record_id": job_id, **job_info}]
+
+
+def upload_chunks(
+    s3, bucket_name: str, key: str, chunks: Iterable[bytes], content_type: str
+) -> None:
+    """
+    Streams generated content to S3 as it is produced.
+    """
+
+    s3.upload_fileobj(
+        io.BufferedReader(IterStream(chunks), buffer_size=CSV_CHUNK_BYTES),
+        bucket_name,
+        key,
+        ExtraArgs={"ContentType": content_type},
+        Config=TRANSFER_CONFIG,
+    )
+
+
+def upload_csv(
+    s3, bucket_name: str, key: str, records: Iterable[dict], export: dict
+) -> None:
+    """
+    Streams the CSV export of the records to S3.
+    """
+
+    upload_chunks(
+        s3,
+        bucket_name,
+        key,
+        csv_chunks(records, export["template"], export["csv_headers"]),
+        "text/csv",
+    )
@@ -2,85 +2,205 @@ import boto3
 import os
 import json
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from botocore.config import Config
 from botocore.exceptions import ClientError
 
+from archive import (
+    archive_key,
+    is_archived,
+    is_batch,
+    parquet_chunks,
+    parquet_enabled,
+    serialize_archive,
+)
+from csv_export import job_records, upload_chunks, upload_csv
+
 sys.path.append("/opt/python")  # For lambda layers
 
+from audiology_metrics.instrumentation import (
+    instrument_client,
+    metrics,
+    tag_job,
+    tracer,
+)
+
 job_table = os.getenv("JOB_TABLE", None)
-dynamodb = boto3.client("dynamodb")
 
+# Clients are shared across invocations and across the worker threads that
+# report a job's completion; boto3 clients are thread safe.
+client_config = Config(max_pool_connections=10)
+dynamodb = instrument_client(boto3.client("dynamodb", config=client_config))
+s3 = instrument_client(boto3.client("s3", config=client_config))
 
-def get_connection_details(job_table, job_id):
-    try:
-        # Retrieve connection_id and dnomain_name from DynamoDB
-        response = dynamodb.get_item(
-            TableName=job_table,
-            Key={"job_id": {"S": job_id}},
-            ProjectionExpression="connection_id, domain_name",
-        )
-        item = response.get("Item", {})
+# API Gateway management clients are bound to an endpoint, so they are cached
+# per WebSocket domain and stage.
+apigw_clients = {}
+apigw_clients_lock = threading.Lock()
 
-        # Extract connection_id and domain_name
-        connection_id = item.get("connection_id", {}).get("S", None)
-        domain_name = item.get("domain_name", {}).get("S", None)
 
-        # Validate that both fields are present
-        if not connection_id:
-            raise ValueError(f"No connection ID found for job: {job_id}")
-        if not domain_name:
-            raise ValueError(f"No domain name found for job: {job_id}")
+def connection_details(item: dict) -> tuple[str | None, str | None]:
+    """
+    Extracts the WebSocket connection ID and domain name from a job record,
+    either in the plain form carried through the Step Function payload or in
+    DynamoDB attribute form.
+    """
+
+    connection_id = item.get("connection_id", None)
+    domain_name = item.get("domain_name", None)
 
-        print("Found connection ID:", connection_id, "and domain name:", domain_name)
-        return connection_id, domain_name
-    except Exception as e:
-        raise ValueError(f"Error retrieving connection details: {str(e)}") from e
+    if isinstance(connection_id, dict):
+        connection_id = connection_id.get("S", None)
+    if isinstance(domain_name, dict):
+        domain_name = domain_name.get("S", None)
 
+    return connection_id, domain_name
 
-def place_job_s3(job_id: str, job_info: dict) -> None:
-    """
-    Logs the completed job JSON to S3.
-    """
 
+def output_bucket_name() -> str:
     bucket_name = os.getenv("OUTPUT_BUCKET_NAME", None)
     if not bucket_name:
         raise ValueError("OUTPUT_BUCKET_NAME environment variable is not set.")
 
-    s3 = boto3.client("s3")
+    return bucket_name
+
+
+def place_job_s3(job_id: str, job_info: dict) -> None:
+    """
+    Logs the completed job to S3: compact JSON for single reports, gzipped
+    JSON Lines for multi-patient jobs. Records streamed to S3 by the record
+    processor are already in place.
+    """
+
+    bucket_name = output_bucket_name()
+
+    if is_archived(job_info):
+        print(f"Job {job_id} records already archived at {job_info['records_key']}")
+        return
 
     try:
         s3.put_object(
             Bucket=bucket_name,
-            Key=f"completed_jobs/{job_id}.json",
-            Body=json.dumps(job_info, indent=2),
-            ContentType="application/json",
+            Key=archive_key(job_id, job_info),
+            **serialize_archive(job_info),
         )
         print(f"Successfully logged job {job_id} to S3 bucket {bucket_name}")
     except Exception as e:
         raise ValueError(f"Error logging job to S3: {str(e)}") from e
 
 
-def record_job_dynamo(job_id: str):
+def place_job_parquet(job_id: str, job_info: dict, export: dict) -> None:
+    """
+    Exports the records of a multi-patient job to Parquet under the
+    institution's CSV headers, streamed to S3 a row group at a time.
+    """
+
+    bucket_name = output_bucket_name()
+
+    try:
+        upload_chunks(
+            s3,
+            bucket_name,
+            f"completed_jobs/{job_id}.parquet",
+            parquet_chunks(
+                job_records(s3, bucket_name, job_id, job_info),
+                export["template"],
+                export["csv_headers"],
+            ),
+            "application/vnd.apache.parquet",
+        )
+        print(f"Successfully exported job {job_id} to Parquet in {bucket_name}")
+    except Exception as e:
+        raise ValueError(f"Error exporting job to Parquet: {str(e)}") from e
+
+
+def place_job_csv(job_id: str, job_info: dict, export: dict) -> None:
     """
-    Updates the job status in DynamoDB to 'started'.
+    Exports the job's records to CSV under the institution's CSV headers,
+    alongside the JSON archive.
+    """
+
+    bucket_name = output_bucket_name()
+
+    try:
+        upload_csv(
+            s3,
+            bucket_name,
+            f"completed_jobs/{job_id}.csv",
+            job_records(s3, bucket_name, job_id, job_info),
+            export,
+        )
+        print(f"Successfully exported job {job_id} to CSV in {bucket_name}")
+    except Exception as e:
+        raise ValueError(f"Error exporting job to CSV: {str(e)}") from e
+
+
+def record_job_dynamo(
+    job_id: str,
+    result: dict,
+    execution_arn: str | None = None,
+    timings: dict | None = None,
+    usage: dict | None = None,
+) -> dict:
+    """
+    Records the outcome of the job in a single update: status, execution ARN,
+    result location, timings and model token usage. Returns the updated job
+    record, which includes any WebSocket connection details stored on it.
     """
 
     if job_table is None:
         raise ValueError("DYNAMODB_TABLE environment variable is not set.")
 
+    timings = timings or {}
+    status = "failed" if "error" in result else "completed"
+
+    update_expression = (
+        "SET #status = :status, result_key = :result_key, completed_at = :completed_at"
+    )
+    expression_values = {
+        ":status": {"S": status},
+        ":result_key": {"S": archive_key(job_id, result)},
+        ":completed_at": {"S": datetime.now(timezone.utc).isoformat()},
+    }
+
+    if execution_arn:
+        update_expression += ", execution_arn = :execution_arn"
+        expression_values[":execution_arn"] = {"S": execution_arn}
+    if timings.get("started_at"):
+        update_expression += ", started_at = :started_at"
+        expression_values[":started_at"] = {"S": timings["started_at"]}
+    if timings.get("processing_ms") is not None:
+        update_expression += ", processing_ms = :processing_ms"
+        expression_values[":processing_ms"] = {"N": str(timings["processing_ms"])}
+    if usage:
+        update_expression += (
+            ", input_tokens = :input_tokens, output_tokens = :output_tokens"
+            ", model_calls = :model_calls, token_budget_exceeded = :budget_exceeded"
+        )
+        expression_values[":input_tokens"] = {"N": str(usage["input_tokens"])}
+        expression_values[":output_tokens"] = {"N": str(usage["output_tokens"])}
+        expression_values[":model_calls"] = {"N": str(usage["model_calls"])}
+        expression_values[":budget_exceeded"] = {
+            "BOOL": bool(usage.get("budget_exceeded", False))
+        }
+
     try:
-        dynamodb.update_item(
+        response = dynamodb.update_item(
             TableName=job_table,
             Key={"job_id": {"S": job_id}},
-            UpdateExpression="SET #status = :status",
-            ExpressionAttributeValues={
-                ":status": {"S": "started"},
-            },
+            UpdateExpression=update_expression,
+            ExpressionAttributeValues=expression_values,
             ExpressionAttributeNames={
-                "#status": "completed",
+                "#status": "status",
             },
+            ConditionExpression="attribute_exists(job_id)",
+            ReturnValues="ALL_NEW",
         )
 
-        print(f"Recorded that job {job_id} has started in DynamoDB.")
+        print(f"Recorded that job {job_id} has {status} in DynamoDB.")
+        return response.get("Attributes", {})
 
     except ClientError as e:
         error_code = e.response["Error"]["Code"]
@@ -95,14 +215,84 @@ def record_job_dynamo(job_id: str):
         raise Exception(f"Failed to record job {job_id}: {str(e)}")
 
 
-def report_job_completion(job_id: str, job_info: dict) -> None:
+def report_job_completion(
+    job_id: str,
+    job_info: dict,
+    job: dict | None = None,
+    execution_arn: str | None = None,
+    timings: dict | None = None,
+    export: dict | None = None,
+    usage: dict | None = None,
+) -> None:
     """
-    Obtains a websocket connection for a job if it exists and sends a report. Logs the
-    completed job JSON to S3.
+    Logs the completed job and its tabular exports to S3, then records the
+    job outcome and sends a report over the job's WebSocket connection if one
+    exists. The outcome points at the S3 archive, so it is only recorded once
+    the archive is in place: a job whose archive fails isn't marked as
+    completed. The exports run alongside the archive, and the outcome
+    alongside the report; failures from all of them are collected and raised
+    together. Failed jobs are archived and recorded without exports.
+
+    The connection details come from the job record carried in the Step
+    Function payload. Clients usually connect after the job was loaded, so
+    otherwise the report is sent once the update returns the job record.
     """
 
-    # TODO: error checking
-    connection_id, domain_name = get_connection_details(job_table, job_id)
+    connection_id, domain_name = connection_details(job or {})
+
+    # Failed jobs have no records to export
+    if "error" in job_info:
+        export = None
+
+    def record_and_report() -> None:
+        job_record = record_job_dynamo(
+            job_id=job_id,
+            result=job_info,
+            execution_arn=execution_arn,
+            timings=timings,
+            usage=usage,
+        )
+        if not connection_id or not domain_name:
+            report_to_client(job_id, job_info, *connection_details(job_record))
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        futures = {"S3 archive": executor.submit(place_job_s3, job_id, job_info)}
+        if export and export.get("csv_headers"):
+            futures["CSV export"] = executor.submit(
+                place_job_csv, job_id, job_info, export
+            )
+        if is_batch(job_info) and parquet_enabled() and export:
+            futures["Parquet export"] = executor.submit(
+                place_job_parquet, job_id, job_info, export
+            )
+
+        if futures["S3 archive"].exception() is None:
+            futures["job record"] = executor.submit(record_and_report)
+            if connection_id and domain_name:
+                futures["WebSocket report"] = executor.submit(
+                    report_to_client, job_id, job_info, connection_id, domain_name
+                )
+
+    errors = []
+    for name, future in futures.items():
+        error = future.exception()
+        if error is not None:
+            print(f"Error in {name} for job {job_id}: {str(error)}")
+            errors.append(f"{name}: {str(error)}")
+
+    if errors:
+        raise Exception(f"Failed to complete job {job_id}: " + "; ".join(errors))
+
+
+def report_to_client(
+    job_id: str,
+    job_info: dict,
+    connection_id: str | None,
+    domain_name: str | None,
+) -> None:
+    """
+    Sends the job report over WebSocket if the job has a connection.
+    """
 
     if not connection_id or not domain_name:
         print(
@@ -110,7 +300,7 @@ def report_job_completion(job_id: str, job_info: dict) -> None:
         )
         return
 
-    print("reporting job info:", job_info)
+    print(f"Sending report to connection {connection_id}: {job_info}")
     send_to_client(
         connection_id=connection_id,
         domain_name=domain_name,
@@ -118,20 +308,31 @@ def report_job_completion(job_id: str, job_info: dict) -> None:
         data=job_info,
     )
 
-    record_job_dynamo(job_id=job_id)
-    place_job_s3(job_id, job_info)
 
-    if connection_id is not None:
-        print(f"Sending report to connection {connection_id}: {job_info}")
+def apigw_management_client(domain_name: str, stage: str):
+    """
+    Returns the cached API Gateway management client for the endpoint.
+    """
+
+    endpoint_url = f"https://{domain_name}/{stage}"
+
+    with apigw_clients_lock:
+        if endpoint_url not in apigw_clients:
+            apigw_clients[endpoint_url] = instrument_client(
+                boto3.client(
+                    "apigatewaymanagementapi",
+                    endpoint_url=endpoint_url,
+                    config=client_config,
+                )
+            )
+        return apigw_clients[endpoint_url]
 
 
 def send_to_client(
     connection_id: str, domain_name: str, stage: str, data: dict
 ) -> None:
     try:
-        apigw_management_api = boto3.client(
-            "apigatewaymanagementapi", endpoint_url=f"https://{domain_name}/{stage}"
-        )
+        apigw_management_api = apigw_management_client(domain_name, stage)
         apigw_management_api.post_to_connection(
             ConnectionId=connection_id, Data=json.dumps(data, indent=2)
         )
@@ -140,6 +341,8 @@ def send_to_client(
         raise e
 
 
+@metrics.log_metrics(capture_cold_start_metric=True)
+@tracer.capture_lambda_handler
 def handler(event, context):
     """
     Requires that a jobId and result to stream back over websocket are both passed.
@@ -169,12 +372,25 @@ def handler(event, context):
 
     print("Logging for job:", job_id)
 
+    job = event.get("job", None) or {}
+    tag_job(job.get("institution_id", None), job.get("config_id", None))
+
     # TODO: error checking
-    report_job_completion(job_id, result)
+    report_job_completion(
+        job_id,
+        result,
+        job=event.get("job", None),
+        execution_arn=event.get("executionId", None),
+        timings=event.get("timings", None),
+        export=event.get("export", None),
+        usage=event.get("usage", None),
+    )
 
     print("Completion recorder finished processing for job:", job_id)
 
     return {
         "statusCode": 200,
         "message": "Second state processing complete",
+        "jobId": job_id,
+        "result": result,
     }
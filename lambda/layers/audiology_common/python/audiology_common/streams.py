@@ -0,0 +1,45 @@
+"""
+Streaming uploads of generated content to S3, shared by the handlers that
+write large artifacts to the output bucket.
+"""
+
+import io
+from typing import Iterable
+
+from boto3.s3.transfer import TransferConfig
+
+# Streams larger than one part are uploaded as multipart uploads with
+# concurrent parts; memory is bounded by part size times concurrency
+# regardless of the size of the upload.
+TRANSFER_CONFIG = TransferConfig(
+    multipart_threshold=8 * 1024 * 1024,
+    multipart_chunksize=8 * 1024 * 1024,
+    max_concurrency=4,
+)
+
+
+class IterStream(io.RawIOBase):
+    """
+    Read-only file object over an iterator of byte chunks, so generated
+    content can be uploaded without being held in memory as a whole.
+    """
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self.chunks = iter(chunks)
+        self.pending = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, buffer) -> int:
+        while not self.pending:
+            try:
+                self.pending = next(self.chunks)
+            except StopIteration:
+                return 0
+
+        size = min(len(buffer), len(self.pending))
+        buffer[:size] = self.pending[:size]
+        self.pending = self.pending[size:]
+
+        return size
@@ -0,0 +1,19 @@
+"""
+Helpers for institutions' classification templates, shared by the record
+processor's validation and the completion recorder's exports.
+"""
+
+
+def leaf_paths(template: dict, prefix: tuple = ()) -> list[tuple[str, ...]]:
+    """
+    Lists the paths to every leaf value of a classification template.
+    """
+
+    paths = []
+    for key, value in template.items():
+        if isinstance(value, dict):
+            paths.extend(leaf_paths(value, prefix + (key,)))
+        else:
+            paths.append(prefix + (key,))
+
+    return paths
@@ -28,3 +28,11 @@ class ValidationError(AudiologyAPIError):
     def __init__(self, message: str, field: str = None):
         super().__init__(message, 400)
         self.field = field
+
+
+class NotFoundError(AudiologyAPIError):
+    """For requests naming a resource that doesn't exist--e.g., an unknown job ID."""
+
+    def __init__(self, message: str, field: str = None):
+        super().__init__(message, 404)
+        self.field = field
@@ -0,0 +1,143 @@
+"""
+Structured instrumentation shared by the handlers: CloudWatch metrics in
+embedded metric format (Powertools Metrics) and X-Ray subsegments (Powertools
+Tracer) for each stage of a job.
+
+Handlers flush metrics with @metrics.log_metrics and trace with
+@tracer.capture_lambda_handler. Metrics are named <Stage>Duration
+(milliseconds), <Service><Operation>Duration/Bytes/Errors for AWS calls and
+plain counts otherwise, and carry the institution and config ID dimensions
+once a job is tagged.
+"""
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from aws_lambda_powertools import Metrics, Tracer
+from aws_lambda_powertools.metrics import MetricUnit
+
+METRICS_NAMESPACE = os.environ.get("POWERTOOLS_METRICS_NAMESPACE", "AudiologyApi")
+
+metrics = Metrics(namespace=METRICS_NAMESPACE)
+tracer = Tracer()
+
+# Powertools metrics aren't thread safe, and some handlers call AWS from
+# worker threads.
+metrics_lock = threading.Lock()
+
+# Byte counts are recorded for these S3 operations
+S3_UPLOADS = ("PutObject", "UploadPart")
+S3_DOWNLOADS = ("GetObject",)
+
+
+def put_metric(name: str, unit: MetricUnit, value: float) -> None:
+    with metrics_lock:
+        metrics.add_metric(name=name, unit=unit, value=value)
+
+
+def count(name: str, value: int = 1) -> None:
+    put_metric(name, MetricUnit.Count, value)
+
+
+def tag_job(institution_id: str | None, config_id: str | None) -> None:
+    """
+    Tags the invocation's metrics and trace with the job's institution and
+    configuration.
+    """
+
+    for name, value in (("institution", institution_id), ("config_id", config_id)):
+        if value:
+            with metrics_lock:
+                metrics.add_dimension(name=name, value=value)
+            tracer.put_annotation(key=name, value=value)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """
+    Traces the enclosed block as a "## <name>" subsegment and records its
+    duration as <name>Duration.
+    """
+
+    start = time.perf_counter()
+    try:
+        with tracer.provider.in_subsegment(name=f"## {name}"):
+            yield
+    finally:
+        put_metric(
+            f"{name}Duration",
+            MetricUnit.Milliseconds,
+            (time.perf_counter() - start) * 1000,
+        )
+
+
+def body_size(body) -> int | None:
+    """
+    Size of a request body, which botocore may have wrapped in a stream.
+    """
+
+    if body is None:
+        return 0
+    if isinstance(body, str):
+        return len(body.encode("utf-8"))
+    if hasattr(body, "__len__"):
+        return len(body)
+    if hasattr(body, "seek") and hasattr(body, "tell"):
+        position = body.tell()
+        end = body.seek(0, os.SEEK_END)
+        body.seek(position)
+        return end - position
+
+    return None
+
+
+def metric_prefix(model) -> str:
+    service = str(model.service_model.service_id).replace(" ", "").replace("-", "")
+    return f"{service}{model.name}"
+
+
+def before_call(model, params, context, **kwargs) -> None:
+    context["instrumentation_start"] = time.perf_counter()
+
+    if model.name in S3_UPLOADS and model.service_model.service_name == "s3":
+        size = body_size(params.get("body", None))
+        if size is not None:
+            put_metric(f"{metric_prefix(model)}Bytes", MetricUnit.Bytes, size)
+
+
+def after_call(model, http_response, parsed, context, **kwargs) -> None:
+    start = context.get("instrumentation_start", None)
+    if start is None:
+        return
+
+    prefix = metric_prefix(model)
+    put_metric(
+        f"{prefix}Duration",
+        MetricUnit.Milliseconds,
+        (time.perf_counter() - start) * 1000,
+    )
+
+    if http_response.status_code >= 300:
+        count(f"{prefix}Errors")
+    elif model.name in S3_DOWNLOADS and model.service_model.service_name == "s3":
+        put_metric(f"{prefix}Bytes", MetricUnit.Bytes, parsed.get("ContentLength", 0))
+
+
+def instrument_client(client):
+    """
+    Records the duration of every call made through a boto3 client, the
+    bytes moved by S3 uploads and downloads, and failed calls. GetObject
+    durations cover the response headers, not reading the body. Calls are
+    also traced as subsegments by Tracer's botocore patching.
+
+    Returns the client.
+    """
+
+    service_id = client.meta.service_model.service_id.hyphenize()
+    client.meta.events.register(f"before-call.{service_id}", before_call)
+    client.meta.events.register(f"after-call.{service_id}", after_call)
+
+    return client
@@ -0,0 +1,39 @@
+"""
+Lambda SnapStart hooks shared by the handlers. With SnapStart, a function's
+initialized execution environment is snapshotted once per published version
+and every new environment is restored from it, so state created during init
+(AWS clients and their connections and credentials, random state, caches)
+would be shared by every restored environment. Handlers register hooks with
+@after_restore to rebuild such state; outside SnapStart they never run.
+"""
+
+import logging
+import random
+
+try:
+    # Provided by the Lambda Python runtime
+    from snapshot_restore_py import register_after_restore
+except ImportError:
+
+    def register_after_restore(hook, *args, **kwargs):
+        return hook
+
+
+logger = logging.getLogger()
+
+
+def after_restore(hook):
+    """
+    Registers hook to run when the execution environment is restored from a
+    snapshot, before it handles any event.
+    """
+
+    register_after_restore(hook)
+    return hook
+
+
+@after_restore
+def reseed_random() -> None:
+    # Restored environments would otherwise draw the same jitter and samples
+    random.seed()
+    logger.info("Execution environment restored from snapshot.")
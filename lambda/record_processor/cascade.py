@@ -0,0 +1,34 @@
+import json
+import os
+
+# The last tier, INFERENCE_PROFILE_ARN, which every cascade ends with
+PRIMARY_TIER = {"name": "primary", "model_id": None}
+
+
+def cascade_config_from_env() -> dict:
+    return json.loads(os.environ.get("CASCADE_CONFIG", "{}") or "{}")
+
+
+def cascade_tiers(cascade_config: dict) -> list[dict]:
+    """
+    The models a report is classified with, in order: the configured tiers,
+    usually smaller and faster models, then the primary model. Only the
+    primary model is used when the cascade is disabled.
+    """
+
+    if not cascade_config.get("enabled", False):
+        return [PRIMARY_TIER]
+
+    return [
+        {"name": tier["name"], "model_id": tier["model_id"]}
+        for tier in cascade_config.get("tiers", [])
+    ] + [PRIMARY_TIER]
+
+
+def tier_label(name: str) -> str:
+    """
+    Metric and trace name of a tier, e.g. "CascadeTierFast".
+    """
+
+    words = name.replace("-", " ").replace("_", " ").split()
+    return "CascadeTier" + "".join(word[:1].upper() + word[1:] for word in words)
@@ -0,0 +1,150 @@
+import gzip
+import json
+import logging
+import os
+from typing import Iterator
+
+logger = logging.getLogger()
+
+# Processed records are checkpointed in batches of this many
+CHECKPOINT_EVERY = int(os.environ.get("CHECKPOINT_EVERY", "10"))
+
+
+class JobIncomplete(Exception):
+    """
+    Raised when a multi-patient job stops before all of its records are
+    classified, with its progress checkpointed so that a retried invocation
+    resumes where it stopped.
+    """
+
+
+class TransientError(dict):
+    """
+    The {"error": ...} result of a record whose classification failed in a
+    way that may not recur on retry, such as running out of time, a timeout
+    or throttling. It isn't checkpointed, and stops a resumable job with
+    JobIncomplete so that the record is classified again when it resumes.
+    """
+
+    def __init__(self, message: str):
+        super().__init__(error=message)
+
+
+def checkpoint_prefix(job_id: str) -> str:
+    return f"checkpoints/{job_id}/"
+
+
+class JobCheckpoint:
+    """
+    Persists the processed records of a multi-patient job to S3 as they are
+    classified, in batches of CHECKPOINT_EVERY records, along with the job's
+    token usage so far. A retried invocation loads them and classifies only
+    the remaining records instead of invoking the model for every record
+    again. Records processed since the last batch are lost if the Lambda is
+    killed rather than stopping on its own.
+    """
+
+    def __init__(
+        self, s3, bucket_name: str, job_id: str, every: int = CHECKPOINT_EVERY
+    ):
+        self.s3 = s3
+        self.bucket_name = bucket_name
+        self.prefix = checkpoint_prefix(job_id)
+        self.every = every
+        self.pending = []
+        self.sequence = 0
+
+    def keys(self) -> list[str]:
+        keys = []
+        paginator = self.s3.get_paginator("list_objects_v2")
+        for page in paginator.paginate(Bucket=self.bucket_name, Prefix=self.prefix):
+            keys.extend(item["Key"] for item in page.get("Contents", []))
+
+        return sorted(keys)
+
+    def load(self) -> tuple[dict[str, dict], dict | None]:
+        """
+        Loads the records checkpointed by earlier attempts, by record ID,
+        and the token usage of the latest checkpoint, or None if there is none.
+        """
+
+        records = {}
+        usage = None
+        keys = self.keys()
+        for key in keys:
+            response = self.s3.get_object(Bucket=self.bucket_name, Key=key)
+            checkpoint = json.loads(gzip.decompress(response["Body"].read()))
+            records.update(
+                (record["record_id"], record) for record in checkpoint["records"]
+            )
+            usage = checkpoint.get("usage", None)
+
+        self.sequence = len(keys)
+        return records, usage
+
+    def add(self, record: dict, usage: dict | None = None) -> None:
+        """
+        Adds a processed record, saving a checkpoint once a batch is complete.
+        """
+
+        self.pending.append(record)
+        if len(self.pending) >= self.every:
+            self.save(usage)
+
+    def save(self, usage: dict | None = None) -> None:
+        """
+        Saves the records added since the last checkpoint.
+        """
+
+        if not self.pending:
+            return
+
+        body = json.dumps(
+            {"usage": usage, "records": self.pending}, separators=(",", ":")
+        )
+        self.s3.put_object(
+            Bucket=self.bucket_name,
+            Key=f"{self.prefix}{self.sequence:06d}.json.gz",
+            Body=gzip.compress(body.encode("utf-8")),
+            ContentType="application/json",
+            ContentEncoding="gzip",
+        )
+        self.sequence += 1
+        self.pending = []
+
+    def clear(self) -> None:
+        """
+        Deletes the job's checkpoints once its results are uploaded.
+        """
+
+        keys = self.keys()
+        for start in range(0, len(keys), 1000):
+            self.s3.delete_objects(
+                Bucket=self.bucket_name,
+                Delete={
+                    "Objects": [{"Key": key} for key in keys[start : start + 1000]],
+                    "Quiet": True,
+                },
+            )
+
+
+def write_checkpointed(
+    writer, pending: Iterator[dict], completed: dict[str, dict], until: str | None
+) -> int:
+    """
+    Writes the checkpointed records from pending that come before the record
+    with ID until, or all the rest if None, keeping the output in input
+    order. Returns how many of them had errors.
+    """
+
+    errors = 0
+    for record in pending:
+        if record["record_id"] == until:
+            break
+
+        processed = completed[record["record_id"]]
+        if "error" in processed:
+            errors += 1
+        writer.write(processed)
+
+    return errors
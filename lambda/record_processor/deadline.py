@@ -0,0 +1,200 @@
+import math
+import os
+import threading
+import time
+
+import boto3.session
+from botocore.config import Config
+
+# Time kept back from the Lambda timeout to upload results and return them
+DEADLINE_RESERVE_MS = int(os.environ.get("DEADLINE_RESERVE_MS", "1500"))
+
+# Model calls aren't started with less time than this left
+MIN_MODEL_CALL_SECONDS = float(os.environ.get("MIN_MODEL_CALL_SECONDS", "2"))
+
+# Longest read timeout of AWS calls made with a deadline, botocore's default
+DEFAULT_READ_TIMEOUT = 60
+
+CONNECT_TIMEOUT = 5
+
+# Read timeouts, in seconds, of the clients used for calls with a deadline.
+# A call gets the longest that leaves time for a retry, so a handful of
+# clients serve every deadline.
+TIMEOUT_BUCKETS = (1, 2, 5, 10, 15, 30, 60)
+
+# Most attempts, retries included, of a call made with a deadline
+MAX_ATTEMPTS = int(os.environ.get("DEADLINE_MAX_ATTEMPTS", "3"))
+
+# Single-attempt calls get read timeouts in whole seconds below this, and
+# rounded down to TIMEOUT_BUCKETS above it
+WHOLE_SECOND_TIMEOUTS = 30
+
+
+class DeadlineExceeded(Exception):
+    """
+    Raised instead of starting work that can't finish before the deadline.
+    """
+
+
+class Deadline:
+    """
+    The time by which an invocation must have returned its result, derived
+    from the Lambda context less a reserve for uploading and returning
+    results. Work that can't finish in the time left is skipped with
+    DeadlineExceeded, and AWS calls are made with read timeouts bounded by
+    the time left, so a slow job ends with a reportable result rather than a
+    Lambda timeout.
+    """
+
+    def __init__(self, remaining_ms: float, reserve_ms: float = DEADLINE_RESERVE_MS):
+        self.expires_at = time.monotonic() + (remaining_ms - reserve_ms) / 1000
+        self.exceeded = False
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_context(cls, context) -> "Deadline | None":
+        """
+        The deadline of an invocation, or None without a Lambda context.
+        """
+
+        if context is None or not hasattr(context, "get_remaining_time_in_millis"):
+            return None
+
+        return cls(context.get_remaining_time_in_millis())
+
+    def remaining(self) -> float:
+        """
+        Seconds left before the deadline, never negative.
+        """
+
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def check(self, needed: float = 0.0, action: str = "continue") -> None:
+        """
+        Raises DeadlineExceeded if less than needed seconds are left.
+        """
+
+        if self.remaining() <= needed:
+            with self.lock:
+                self.exceeded = True
+            raise DeadlineExceeded(f"Not enough time left to {action}.")
+
+
+def remaining_time(deadline: Deadline | None) -> float | None:
+    return None if deadline is None else deadline.remaining()
+
+
+def timeout_bucket(timeout: float, max_timeout: int = DEFAULT_READ_TIMEOUT) -> int:
+    """
+    The longest of TIMEOUT_BUCKETS within timeout and max_timeout, or the
+    shortest if none is.
+    """
+
+    limit = min(timeout, max_timeout)
+    fitting = [bucket for bucket in TIMEOUT_BUCKETS if bucket <= limit]
+    return fitting[-1] if fitting else TIMEOUT_BUCKETS[0]
+
+
+def single_attempt_timeout(
+    timeout: float, max_timeout: int = DEFAULT_READ_TIMEOUT
+) -> int:
+    """
+    The read timeout of a single attempt taking up to timeout seconds: the
+    whole seconds of timeout while short, and its bucket once long enough
+    that rounding down loses little.
+    """
+
+    limit = min(timeout, max_timeout)
+    if limit < WHOLE_SECOND_TIMEOUTS:
+        return max(1, math.floor(limit))
+
+    return timeout_bucket(limit, max_timeout)
+
+
+class TimeoutClients:
+    """
+    boto3 clients for a service by read timeout, so that each call can be
+    made with a read timeout bounded by the time left before its deadline.
+    Read timeouts are half the time left rounded down to TIMEOUT_BUCKETS,
+    and calls are retried in botocore's standard mode (throttling and
+    transient errors, with backoff) as many times as their attempts fit in
+    the time left, up to MAX_ATTEMPTS. Clients are created on first use from
+    a single session and reused.
+
+    Calls too slow to leave time for a retry, such as model calls, are made
+    with single_attempt clients instead: one attempt whose read timeout is
+    the time left, so a slow but successful call isn't cut short.
+    """
+
+    def __init__(
+        self,
+        service_name: str,
+        wrap=lambda client: client,
+        max_timeout: int = DEFAULT_READ_TIMEOUT,
+        single_attempt: bool = False,
+        **client_kwargs,
+    ):
+        self.service_name = service_name
+        self.wrap = wrap
+        self.max_timeout = max_timeout
+        self.single_attempt = single_attempt
+        self.client_kwargs = client_kwargs
+        self.session = None
+        self.clients = {}
+        self.lock = threading.Lock()
+
+    def get(self, timeout: float | None = None):
+        """
+        A client whose calls, retries included, time out after at most
+        timeout seconds, or the default client if timeout is None.
+        """
+
+        if timeout is None:
+            key, config = None, None
+        else:
+            if self.single_attempt:
+                read_timeout = single_attempt_timeout(timeout, self.max_timeout)
+                attempts = 1
+            else:
+                read_timeout = timeout_bucket(timeout / 2, self.max_timeout)
+                # Every attempt may take up to the read timeout
+                attempts = max(1, min(MAX_ATTEMPTS, math.floor(timeout / read_timeout)))
+            key = (read_timeout, attempts)
+            config = Config(
+                read_timeout=read_timeout,
+                connect_timeout=min(read_timeout, CONNECT_TIMEOUT),
+                retries={"mode": "standard", "total_max_attempts": attempts},
+            )
+
+        with self.lock:
+            if key not in self.clients:
+                if self.session is None:
+                    self.session = boto3.session.Session()
+                self.clients[key] = self.wrap(
+                    self.session.client(
+                        self.service_name, config=config, **self.client_kwargs
+                    )
+                )
+
+            return self.clients[key]
+
+    def reset(self) -> None:
+        """
+        Drops the session and clients created so far, to be created again on
+        next use.
+        """
+
+        with self.lock:
+            self.session = None
+            self.clients = {}
+
+    def for_deadline(self, deadline: Deadline | None):
+        """
+        A client bounded by the time left before deadline, raising
+        DeadlineExceeded if there is none left.
+        """
+
+        if deadline is not None:
+            deadline.check(action=f"call {self.service_name}")
+
+        return self.get(remaining_time(deadline))
@@ -0,0 +1,414 @@
+import json
+import logging
+import math
+import os
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import Callable, Iterator
+
+from audiology_metrics.instrumentation import count, put_metric
+from aws_lambda_powertools.metrics import MetricUnit
+from botocore.exceptions import ClientError
+from deadline import MIN_MODEL_CALL_SECONDS, Deadline, DeadlineExceeded
+
+logger = logging.getLogger()
+
+# The institution whose job is being processed, set once per invocation
+current_institution: ContextVar[str | None] = ContextVar(
+    "current_institution", default=None
+)
+
+# Key of the scheduler table item holding the model-call leases
+POOL_ID = "model-calls"
+
+
+def fair_share_config_from_env() -> dict:
+    return json.loads(os.environ.get("FAIR_SHARE_CONFIG", "{}") or "{}")
+
+
+class FairShareScheduler:
+    """
+    Shares model-call concurrency across institutions by weight. Every model
+    call holds a lease on one of capacity slots, recorded on a single item of
+    the scheduler table with conditional writes, so the limit holds across
+    every record processor container. An institution may hold at most its
+    share of the slots: capacity split by weight between the institutions
+    holding or waiting for slots, and no more than its cap. An institution
+    alone gets every slot, and as others start waiting its share shrinks, so
+    the slots it frees go to them rather than to its own backlog.
+
+    Leases expire after lease_seconds, so the slots of calls whose Lambda
+    was killed are reclaimed by the next caller that finds no slot free.
+    Institutions count as waiting for waiting_seconds after they last found
+    no slot free.
+
+    Every model call makes two writes to the pool item, taking and freeing
+    its slot. DynamoDB sustains about 1,000 writes per second to a single
+    item, so the scheduler tops out at roughly 500 model calls per second
+    across every container, well above the Bedrock quotas it shares. Callers
+    waiting for a slot poll the item with reads and only attempt the
+    conditional write once it has room for them, so a full pool doesn't
+    turn waiting callers into a stream of failing writes.
+
+    A hedged model request takes a slot of its own alongside its call's, and
+    is only sent if one is free without waiting.
+    """
+
+    def __init__(
+        self,
+        dynamodb,
+        table_name: str,
+        capacity: int,
+        weights: dict[str, float] | None = None,
+        caps: dict[str, int] | None = None,
+        default_weight: float = 1.0,
+        lease_seconds: float = 90,
+        waiting_seconds: float = 10,
+        max_wait_seconds: float = 30,
+        poll_seconds: float = 0.1,
+    ):
+        self.dynamodb = dynamodb
+        self.table_name = table_name
+        self.capacity = capacity
+        self.weights = weights or {}
+        self.caps = caps or {}
+        self.default_weight = default_weight
+        self.lease_seconds = lease_seconds
+        self.waiting_seconds = waiting_seconds
+        self.max_wait_seconds = max_wait_seconds
+        self.poll_seconds = poll_seconds
+        # The pool item as last read, for computing shares
+        self.snapshot = {}
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, dynamodb, table_name: str, config: dict):
+        return cls(
+            dynamodb,
+            table_name,
+            capacity=int(config["capacity"]),
+            weights=config.get("weights", {}),
+            caps=config.get("caps", {}),
+            default_weight=config.get("default_weight", 1.0),
+            lease_seconds=config.get("lease_seconds", 90),
+            waiting_seconds=config.get("waiting_seconds", 10),
+            max_wait_seconds=config.get("max_wait_seconds", 30),
+        )
+
+    def weight(self, institution: str) -> float:
+        return float(self.weights.get(institution, self.default_weight))
+
+    def cap(self, institution: str) -> int:
+        return min(self.capacity, int(self.caps.get(institution, self.capacity)))
+
+    def active(self, item: dict, now: float) -> set[str]:
+        """
+        Institutions holding slots or recently waiting for one.
+        """
+
+        counts = item.get("counts", {}).get("M", {})
+        waiting = item.get("waiting", {}).get("M", {})
+
+        active = {name for name, held in counts.items() if int(held["N"]) > 0}
+        active.update(
+            name
+            for name, since in waiting.items()
+            if now - float(since["N"]) < self.waiting_seconds
+        )
+        return active
+
+    def share(self, institution: str, item: dict | None = None) -> int:
+        """
+        The most slots institution may hold, given the pool item.
+        """
+
+        if item is None:
+            with self.lock:
+                item = self.snapshot
+
+        active = self.active(item, time.time()) | {institution}
+        total_weight = sum(self.weight(name) for name in active)
+        share = math.floor(self.capacity * self.weight(institution) / total_weight)
+        return max(1, min(share, self.cap(institution)))
+
+    def create_pool(self) -> None:
+        try:
+            self.dynamodb.put_item(
+                TableName=self.table_name,
+                Item={
+                    "pool_id": {"S": POOL_ID},
+                    "in_flight": {"N": "0"},
+                    "counts": {"M": {}},
+                    "leases": {"M": {}},
+                    "waiting": {"M": {}},
+                },
+                ConditionExpression="attribute_not_exists(pool_id)",
+            )
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                raise
+
+    def update_snapshot(self, item: dict) -> None:
+        with self.lock:
+            self.snapshot = item
+
+    def refresh(self) -> None:
+        """
+        Reads the pool item into the snapshot.
+        """
+
+        response = self.dynamodb.get_item(
+            TableName=self.table_name,
+            Key={"pool_id": {"S": POOL_ID}},
+            ConsistentRead=True,
+        )
+        self.update_snapshot(response.get("Item", {}))
+
+    def has_room(self, institution: str) -> bool:
+        """
+        Whether the last snapshot has a slot free within institution's share,
+        or there is no pool item yet.
+        """
+
+        with self.lock:
+            item = self.snapshot
+        if not item:
+            return True
+
+        held = item.get("counts", {}).get("M", {}).get(institution, {"N": "0"})
+        return int(item["in_flight"]["N"]) < self.capacity and int(
+            held["N"]
+        ) < self.share(institution, item)
+
+    def try_acquire(self, institution: str, lease_id: str) -> bool:
+        """
+        Takes a slot for institution if one is free within its share.
+        """
+
+        for _ in range(2):
+            try:
+                response = self.dynamodb.update_item(
+                    TableName=self.table_name,
+                    Key={"pool_id": {"S": POOL_ID}},
+                    UpdateExpression=(
+                        "SET leases.#lease = :lease, in_flight = in_flight + :one, "
+                        "counts.#institution = if_not_exists(counts.#institution, :zero) + :one "
+                        "REMOVE waiting.#institution"
+                    ),
+                    ConditionExpression=(
+                        "attribute_exists(pool_id) AND in_flight < :capacity AND "
+                        "(attribute_not_exists(counts.#institution) "
+                        "OR counts.#institution < :share)"
+                    ),
+                    ExpressionAttributeNames={
+                        "#lease": lease_id,
+                        "#institution": institution,
+                    },
+                    ExpressionAttributeValues={
+                        ":lease": {
+                            "M": {
+                                "institution": {"S": institution},
+                                "expires_at": {
+                                    "N": str(int(time.time() + self.lease_seconds))
+                                },
+                            }
+                        },
+                        ":one": {"N": "1"},
+                        ":zero": {"N": "0"},
+                        ":capacity": {"N": str(self.capacity)},
+                        ":share": {"N": str(self.share(institution))},
+                    },
+                    ReturnValues="ALL_NEW",
+                    ReturnValuesOnConditionCheckFailure="ALL_OLD",
+                )
+            except ClientError as e:
+                if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                    raise
+                if "Item" not in e.response:
+                    self.create_pool()
+                    continue
+
+                self.update_snapshot(e.response["Item"])
+                return False
+
+            self.update_snapshot(response["Attributes"])
+            return True
+
+        return False
+
+    def release(self, institution: str, lease_id: str) -> bool:
+        """
+        Frees a slot, returning False if its lease had already expired and
+        been reclaimed.
+        """
+
+        try:
+            self.dynamodb.update_item(
+                TableName=self.table_name,
+                Key={"pool_id": {"S": POOL_ID}},
+                UpdateExpression=(
+                    "REMOVE leases.#lease "
+                    "SET in_flight = in_flight - :one, "
+                    "counts.#institution = counts.#institution - :one"
+                ),
+                ConditionExpression="attribute_exists(leases.#lease)",
+                ExpressionAttributeNames={
+                    "#lease": lease_id,
+                    "#institution": institution,
+                },
+                ExpressionAttributeValues={":one": {"N": "1"}},
+            )
+            return True
+        except ClientError as e:
+            if e.response["Error"]["Code"] != "ConditionalCheckFailedException":
+                logger.error(f"Error releasing model-call slot {lease_id}: {e}")
+            return False
+
+    def reclaim_expired(self) -> None:
+        """
+        Frees the slots of leases that have expired in the last snapshot.
+        """
+
+        with self.lock:
+            leases = self.snapshot.get("leases", {}).get("M", {})
+
+        now = time.time()
+        for lease_id, lease in leases.items():
+            if float(lease["M"]["expires_at"]["N"]) < now and self.release(
+                lease["M"]["institution"]["S"], lease_id
+            ):
+                logger.warning(f"Reclaimed expired model-call slot {lease_id}")
+                count("FairShareLeaseExpired")
+
+    def mark_waiting(self, institution: str) -> None:
+        """
+        Records that institution is waiting for a slot, so that others' shares
+        make room for it.
+        """
+
+        with self.lock:
+            since = self.snapshot.get("waiting", {}).get("M", {}).get(institution)
+        now = time.time()
+        if since is not None and now - float(since["N"]) < self.waiting_seconds / 2:
+            return
+
+        try:
+            self.dynamodb.update_item(
+                TableName=self.table_name,
+                Key={"pool_id": {"S": POOL_ID}},
+                UpdateExpression="SET waiting.#institution = :now",
+                ConditionExpression="attribute_exists(pool_id)",
+                ExpressionAttributeNames={"#institution": institution},
+                ExpressionAttributeValues={":now": {"N": str(now)}},
+            )
+        except ClientError as e:
+            logger.warning(f"Error marking {institution} as waiting: {e}")
+
+    def acquire(self, institution: str, deadline: Deadline | None = None) -> str:
+        """
+        Waits for a slot for institution, returning its lease ID. Raises
+        DeadlineExceeded if none is free in time to make the model call, or
+        within max_wait_seconds.
+        """
+
+        lease_id = uuid.uuid4().hex
+        start = time.perf_counter()
+        pause = self.poll_seconds
+        waited = False
+
+        acquired = self.try_acquire(institution, lease_id)
+        while not acquired:
+            if not waited:
+                count("FairShareThrottled")
+                waited = True
+
+            self.reclaim_expired()
+            self.mark_waiting(institution)
+
+            if deadline is not None:
+                deadline.check(
+                    MIN_MODEL_CALL_SECONDS + pause, "wait for model capacity"
+                )
+            if time.perf_counter() - start + pause > self.max_wait_seconds:
+                raise DeadlineExceeded("Timed out waiting for model capacity.")
+
+            # Jittered so waiting callers don't poll in lockstep
+            time.sleep(pause * random.uniform(0.5, 1.0))
+            pause = min(pause * 2, 1.0)
+
+            self.refresh()
+            acquired = self.has_room(institution) and self.try_acquire(
+                institution, lease_id
+            )
+
+        if waited:
+            put_metric(
+                "FairShareWaitDuration",
+                MetricUnit.Milliseconds,
+                (time.perf_counter() - start) * 1000,
+            )
+
+        return lease_id
+
+    @contextmanager
+    def slot(
+        self, institution: str, deadline: Deadline | None = None
+    ) -> Iterator[None]:
+        lease_id = self.acquire(institution, deadline)
+        try:
+            yield
+        finally:
+            self.release(institution, lease_id)
+
+
+def scheduler_from_env(dynamodb) -> FairShareScheduler | None:
+    """
+    The scheduler configured by FAIR_SHARE_CONFIG, or None if it isn't
+    enabled or SCHEDULER_TABLE isn't set.
+    """
+
+    config = fair_share_config_from_env()
+    table_name = os.environ.get("SCHEDULER_TABLE", None)
+    if not config.get("enabled", False) or not table_name:
+        return None
+
+    return FairShareScheduler.from_config(dynamodb, table_name, config)
+
+
+def model_slot(scheduler: FairShareScheduler | None, deadline: Deadline | None = None):
+    """
+    A model-call slot for the current institution, or nothing to wait for
+    without a scheduler or an institution.
+    """
+
+    institution = current_institution.get()
+    if scheduler is None or institution is None:
+        return nullcontext()
+
+    return scheduler.slot(institution, deadline)
+
+
+def spare_model_slot(
+    scheduler: FairShareScheduler | None,
+) -> Callable[[], object] | None:
+    """
+    Takes another model-call slot for the current institution without
+    waiting, for a request sent alongside a call already holding one, such as
+    a hedge. Returns the function freeing it, or None if no slot is free.
+    Without a scheduler or an institution there is no slot to take, and the
+    function does nothing.
+    """
+
+    institution = current_institution.get()
+    if scheduler is None or institution is None:
+        return lambda: None
+
+    lease_id = uuid.uuid4().hex
+    if not scheduler.try_acquire(institution, lease_id):
+        return None
+
+    return lambda: scheduler.release(institution, lease_id)
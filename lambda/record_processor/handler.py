@@ -3,30 +3,120 @@ import os
 import traceback
 import botocore
 import boto3
+from botocore.exceptions import (
+    ClientError,
+    ConnectTimeoutError,
+    EndpointConnectionError,
+    ReadTimeoutError,
+)
 import json
 import logging
 import sys
+from datetime import datetime, timezone
 
 sys.path.append("/opt/python")  # For lambda layers
 
+from audiology_metrics.instrumentation import (
+    count,
+    instrument_client,
+    metrics,
+    put_metric,
+    stage,
+    tag_job,
+    tracer,
+)
+from audiology_metrics.snapstart import after_restore
+from aws_lambda_powertools.metrics import MetricUnit
+from cascade import cascade_config_from_env, cascade_tiers, tier_label
+from checkpoints import (
+    JobCheckpoint,
+    JobIncomplete,
+    TransientError,
+    write_checkpointed,
+)
+from deadline import (
+    MIN_MODEL_CALL_SECONDS,
+    Deadline,
+    DeadlineExceeded,
+    TimeoutClients,
+    remaining_time,
+)
+from fair_share import current_institution, model_slot, scheduler_from_env
+from model_backends import backend_from_env
+from packing import (
+    pack_records,
+    pack_size,
+    packing_config_from_env,
+    parse_packed_output,
+)
+from prompts import build_packed_prompt, build_prompt, model_request, record_report
+from result_writer import RecordStreamWriter
+from token_usage import TokenBudgetExceeded, TokenUsage, token_budget
+from validation import validation_problems
+
 logger = logging.getLogger()
 logger.setLevel(logging.INFO)
 
-s3_client = boto3.client("s3")
-bedrock_runtime = boto3.client("bedrock-runtime", region_name="us-west-2")
-dynamodb = boto3.client("dynamodb")
-s3 = boto3.client("s3")
+# Calls made for a job use clients with read timeouts bounded by its deadline
+dynamodb_clients = TimeoutClients("dynamodb", wrap=instrument_client)
+s3_clients = TimeoutClients("s3", wrap=instrument_client)
+
+
+@after_restore
+def create_clients() -> None:
+    """
+    Creates the AWS clients and the model backend, at init and again after a
+    SnapStart restore so that restored environments don't share connections
+    or the backend's latency history.
+    """
+    global dynamodb, s3, model_backend, model_scheduler
+
+    dynamodb_clients.reset()
+    s3_clients.reset()
+    dynamodb = dynamodb_clients.get()
+    s3 = s3_clients.get()
+
+    # Shares model-call concurrency across institutions if FAIR_SHARE_CONFIG
+    # enables it
+    model_scheduler = scheduler_from_env(dynamodb)
+
+    # Bedrock unless MODEL_BACKEND selects the fake backend for testing
+    model_backend = backend_from_env(model_scheduler)
+
+
+create_clients()
 
 BUCKET_NAME = os.environ["BUCKET_NAME"]
+OUTPUT_BUCKET_NAME = os.environ.get("OUTPUT_BUCKET_NAME", None)
 JOB_TABLE = os.environ.get("JOB_TABLE", None)
 CONFIG_TABLE = os.environ.get("CONFIG_TABLE", None)
 
+# How many times the Step Function retries an incomplete job, see
+# cdk/record_processing.py
+JOB_RETRIES = int(os.environ.get("JOB_RETRIES", "0"))
+
+# Processing lane this record processor serves, see cdk/record_processing.py
+LANE = os.environ.get("LANE", "interactive")
+
+
+JOB_PROJECTION = (
+    "job_id, input_bucket, input_key, config_id, institution_id, "
+    "connection_id, domain_name, queued_at"
+)
+
+
+def retrieve_job_info(job_id: str, deadline: Deadline | None = None) -> dict:
+    """
+    Loads the job record once, projected down to the fields needed to process
+    the job and report on it. The returned dict is carried through the Step
+    Function payload so later stages don't read the job record again.
+    """
 
-def retrieve_job_info(job_id: str) -> tuple[str, str, str, str]:
     try:
-        job_response = dynamodb.get_item(
+        job_response = dynamodb_clients.for_deadline(deadline).get_item(
             TableName=JOB_TABLE,
             Key={"job_id": {"S": job_id}},
+            ProjectionExpression=JOB_PROJECTION,
         )
     except Exception as e:
         logger.error(
@@ -34,42 +124,45 @@ def retrieve_job_info(job_id: str) -> tuple[str, str, str, str]:
         )
         raise Exception(f"Error retrieving job info for job: {job_id}") from e
 
-    job_item = job_response["Item"]
+    job_item = job_response.get("Item", None)
     if not job_item:
         raise ValueError(f"No job found with ID: {job_id}")
 
-    input_bucket = job_item.get("input_bucket", {}).get("S", None)
-    input_key = job_item.get("input_key", {}).get("S", None)
-    config_id = job_item.get("config_id", {}).get("S", None)
-    institution_id = job_item.get("institution_id", {}).get("S", None)
+    job = {
+        field: job_item.get(field, {}).get("S", None)
+        for field in (
+            "input_bucket",
+            "input_key",
+            "config_id",
+            "institution_id",
+            "connection_id",
+            "domain_name",
+            "queued_at",
+        )
+    }
 
     if (
-        input_bucket is None
-        or input_key is None
-        or config_id is None
-        or institution_id is None
+        job["input_bucket"] is None
+        or job["input_key"] is None
+        or job["config_id"] is None
+        or job["institution_id"] is None
     ):
         logger.error(
             f"Missing required fields in job item for job: {job_id}. "
-            f"input_bucket: {input_bucket}, input_key: {input_key}, "
-            f"config_id: {config_id}, institution_id: {institution_id}"
+            f"input_bucket: {job['input_bucket']}, input_key: {job['input_key']}, "
+            f"config_id: {job['config_id']}, institution_id: {job['institution_id']}"
         )
         raise ValueError("Missing internal information for job")
 
-    return (
-        config_id,
-        input_bucket,
-        input_key,
-        institution_id,
-    )
+    return job
 
 
-def retrieve_config(config_id: str) -> dict:
+def retrieve_config(config_id: str, deadline: Deadline | None = None) -> dict:
     config = None
     config_response = None
 
     try:
-        config_response = dynamodb.get_item(
+        config_response = dynamodb_clients.for_deadline(deadline).get_item(
             TableName=CONFIG_TABLE,
             Key={"config_id": {"S": config_id}},
         )
@@ -98,10 +191,17 @@ def retrieve_config(config_id: str) -> dict:
     return config
 
 
-def correct_json(json_str: str, error_message: str) -> dict:
+def correct_json(
+    json_str: str,
+    error_message: str,
+    usage: TokenUsage | None = None,
+    deadline: Deadline | None = None,
+) -> dict:
     """
     Prompts LLM to correct the JSON string if it's not valid, using the context
-    provided in the error message.
+    provided in the error message. Corrections stop once the job's token
+    budget is used up or there isn't time left for another before the
+    deadline.
     """
 
     # Build the prompt for the LLM
@@ -126,12 +226,14 @@ If the JSON can't be fixed using simple corrections (e.g., the error is not a JS
         )
 
         try:
-            corrected_json = invoke_bedrock_model(prompt)
+            corrected_json = invoke_bedrock_model(prompt, usage, deadline=deadline)
             if corrected_json == "--":
                 logger.error("LLM output could not be corrected, returning error.")
+                count("ModelOutputUnrepairable")
                 return {"error": "LLM output could not be corrected."}
             else:
                 results_json = json.loads(corrected_json)
+                count("ModelOutputRepaired")
                 return {"output": results_json}
 
         except json.JSONDecodeError as next_error:
@@ -139,71 +241,34 @@ If the JSON can't be fixed using simple corrections (e.g., the error is not a JS
                 f"Error correcting JSON from LLM output: {traceback.format_exc()}. Attempt {i + 1}/3 failed."
             )
             e = next_error
+        except (TokenBudgetExceeded, DeadlineExceeded) as stop_error:
+            logger.warning(f"Stopping JSON correction: {stop_error}")
+            count("ModelOutputUnrepairable")
+            return error_result(str(stop_error), stop_error)
 
+    count("ModelOutputUnrepairable")
     return {"error": f"Did not recover from JSON parsing error."}
 
 
-def build_prompt(
-    report: str,
-    institution_template: dict,
-    valid_values: dict,
-    guidelines: list[dict] | None,
+def invoke_bedrock_model(
+    prompt: str,
+    usage: TokenUsage | None = None,
+    model_id: str | None = None,
+    deadline: Deadline | None = None,
 ) -> str:
     """
-    Builds the complete prompt for the LLM without using LangChain templates.
-    """
-
-    # Format the JSON template by escaping braces
-    json_template_fixed = (
-        json.dumps(institution_template, indent=4).replace("{", "{{").replace("}", "}}")
-    )
-
-    # Build the system message
-    system_message = "You are an expert **pediatric** audiologist that extracts explicit hearing test data and classifies hearing loss accurately."
-
-    # Build the human message
-    human_message = f"""{report}
-
-**Use the classification template and guidelines** to determine:
-{json_template_fixed}
-
-**Valid Values:**
-```json
-{json.dumps(valid_values, indent=4)}
-```
-
-**Guidelines for Classification:**
-```json
-{json.dumps(guidelines, indent=4)}
-```
-
-**Processing Rules (MUST Follow):**
-- **Use only explicitly provided threshold values**; do not infer missing values.
-- **If multiple severities are listed, assign the most severe classification.**
-**Output Requirements:**
-- Return classification in **EXACT JSON format** as per the template, with no modifications.
-- Provide **precise reasoning** for each classification.
-- Make sure there is thorough, chain of thought reasoning for each attribute's output.
-- **Cite guideline numbers** when making classification decisions.
-- **DO NOT include any additional explanations, assumptions, or commentary.**
-- Do NOT include code block formatting (e.g., ```json or ```) in the output; output RAW JSON only.
-- Be certain the JSON output is valid; braces should be balanced, etc.
-"""
-
-    # TODO: parse to regex-retrieve JSON.
-
-    # Combine system and human messages in the format expected by Bedrock
-    full_prompt = f"System: {system_message}\n\nHuman: {human_message}\n\nAssistant:"
-
-    return full_prompt
-
-
-def invoke_bedrock_model(prompt: str) -> str:
-    """
-    Invokes the Bedrock model directly without LangChain.
+    Invokes the model through the configured backend without LangChain. The
+    tokens used are added to usage, which raises TokenBudgetExceeded instead
+    of invoking the model once its budget is used up. model_id defaults to
+    INFERENCE_PROFILE_ARN.
+
+    With a deadline, the call times out when it passes, and raises
+    DeadlineExceeded instead if less than MIN_MODEL_CALL_SECONDS are left.
+    With fair-share scheduling, the call waits for a slot in the current
+    institution's share of model capacity.
     """
 
-    inference_profile_arn = os.environ.get("INFERENCE_PROFILE_ARN", None)
+    inference_profile_arn = model_id or os.environ.get("INFERENCE_PROFILE_ARN", None)
     if not inference_profile_arn:
         raise ValueError("INFERENCE_PROFILE_ARN environment variable is not set.")
 
@@ -215,22 +280,29 @@ def invoke_bedrock_model(prompt: str) -> str:
         )
 
     # Prepare the request body
-    request_body = {
-        "messages": [{"role": "user", "content": [{"type": "text", "text": prompt}]}],
-        **inference_config,
-    }
+    request_body = model_request(prompt, inference_config)
+
+    if usage is not None:
+        usage.check()
+    if deadline is not None:
+        deadline.check(MIN_MODEL_CALL_SECONDS, "invoke the model")
 
     try:
         # Invoke the model using the inference profile
-        response = bedrock_runtime.invoke_model(
-            modelId=inference_profile_arn,
-            body=json.dumps(request_body),
-            contentType="application/json",
-            accept="application/json",
-        )
+        with model_slot(model_scheduler, deadline), stage("ModelInvoke"):
+            response_body = model_backend.invoke(
+                inference_profile_arn, request_body, remaining_time(deadline)
+            )
 
-        # Parse the response
-        response_body = json.loads(response["body"].read())
+        call_usage = response_body.get("usage", None) or {}
+        if usage is not None:
+            usage.add(call_usage)
+        put_metric(
+            "ModelInputTokens", MetricUnit.Count, call_usage.get("input_tokens", 0)
+        )
+        put_metric(
+            "ModelOutputTokens", MetricUnit.Count, call_usage.get("output_tokens", 0)
+        )
 
         # Extract the generated text from the response format
         if "content" in response_body and isinstance(response_body["content"], list):
@@ -243,10 +315,55 @@ def invoke_bedrock_model(prompt: str) -> str:
         return str(response_body)
 
     except Exception as e:
+        if isinstance(e, ClientError):
+            # e.g. ModelThrottlingException
+            count(f"Model{e.response.get('Error', {}).get('Code', 'Error')}")
         logger.error(f"Error while invoking model: {str(e)}")
         raise
 
 
+# Model and AWS error codes of failures that may not recur on retry
+TRANSIENT_ERROR_CODES = {
+    "InternalServerException",
+    "ModelNotReadyException",
+    "ModelTimeoutException",
+    "ServiceUnavailableException",
+    "ThrottlingException",
+}
+
+
+def is_transient(e: Exception) -> bool:
+    """
+    Whether e may not recur on retry: running out of time, a timeout,
+    a connection failure or throttling.
+    """
+
+    if isinstance(
+        e,
+        (
+            DeadlineExceeded,
+            ReadTimeoutError,
+            ConnectTimeoutError,
+            EndpointConnectionError,
+        ),
+    ):
+        return True
+
+    if isinstance(e, ClientError):
+        return e.response.get("Error", {}).get("Code", None) in TRANSIENT_ERROR_CODES
+
+    return False
+
+
+def error_result(message: str, e: Exception) -> dict:
+    """
+    The {"error": message} result of a classification that failed with e,
+    as a TransientError if e may not recur on retry.
+    """
+
+    return TransientError(message) if is_transient(e) else {"error": message}
+
+
 def job_exists(job_id: str) -> bool:
     """
     Checks if a job with the given name already exists in DynamoDB.
@@ -264,69 +381,116 @@ def job_exists(job_id: str) -> bool:
         ) from e
 
 
-def log_execution_arn(execution_arn: str, job_id: str) -> None:
-    """
-    Records the execution ARN for the job in DynamoDB.
-    """
-
-    try:
-        print("Updating DynamoDB with execution ARN")
-        dynamodb.update_item(
-            TableName=JOB_TABLE,
-            Key={"job_id": {"S": job_id}},
-            UpdateExpression="SET execution_arn = :execution_arn",
-            ExpressionAttributeValues={":execution_arn": {"S": execution_arn}},
-            ConditionExpression="attribute_exists(job_id)",
-            ReturnValues="UPDATED_NEW",
-        )
-        print("Updated dynamodb with execution ARN for job:", job_id)
-    except dynamodb.exceptions.ConditionalCheckFailedException:
-        raise ValueError(f"Job with ID {job_id} does not exist.")
-    except Exception as e:
-        logger.error(
-            f"Error updating DynamoDB with execution ARN: {traceback.format_exc()}"
-        )
-        raise Exception("Error logging execution details for job.") from e
-
-
 def categorize_diagnosis_with_lm(
     report: str,
     institution_template: dict,
     valid_values: dict,
     guidelines: list[dict] | None,
+    usage: TokenUsage | None = None,
+    deadline: Deadline | None = None,
 ) -> dict:
     """
     Uses LLM to extract explicit facts and classify hearing loss. Either produces
     the output data JSON or None. This version doesn't use LangChain.
+
+    With the model cascade enabled, the report is classified by each tier in
+    turn until one produces output that passes validation against the
+    institution's template and valid values, ending with the primary model.
     """
 
     # Build the prompt
-    prompt = build_prompt(report, institution_template, valid_values, guidelines)
+    with stage("PromptBuild"):
+        prompt = build_prompt(report, institution_template, valid_values, guidelines)
+
+    cascade_config = cascade_config_from_env()
+    tiers = cascade_tiers(cascade_config)
+    if len(tiers) == 1:
+        return classify_prompt(prompt, usage, deadline=deadline)
+
+    for tier in tiers[:-1]:
+        label = tier_label(tier["name"])
+        with stage(label):
+            result = classify_prompt(
+                prompt, usage, tier["model_id"], correct=False, deadline=deadline
+            )
+
+        if "output" in result:
+            problems = validation_problems(
+                result["output"],
+                institution_template,
+                valid_values,
+                cascade_config.get("escalate_values", []),
+            )
+            if not problems:
+                count(f"{label}Accepted")
+                return result
+
+            logger.info(f"Escalating from cascade tier {tier['name']}: {problems}")
+
+        count(f"{label}Escalated")
+
+    label = tier_label(tiers[-1]["name"])
+    with stage(label):
+        result = classify_prompt(prompt, usage, deadline=deadline)
+    if "output" in result:
+        count(f"{label}Accepted")
+
+    return result
+
+
+def classify_prompt(
+    prompt: str,
+    usage: TokenUsage | None = None,
+    model_id: str | None = None,
+    correct: bool = True,
+    deadline: Deadline | None = None,
+) -> dict:
+    """
+    Invokes the model with a classification prompt and parses its output,
+    asking the model to correct invalid JSON if correct is set.
+
+    Returns a dictionary with either "output" or "error" key.
+    """
 
     # Invoke the model
     try:
-        results = invoke_bedrock_model(prompt)
+        results = invoke_bedrock_model(prompt, usage, model_id, deadline)
+    except (TokenBudgetExceeded, DeadlineExceeded) as e:
+        logger.warning(f"Skipping LLM invocation: {e}")
+        return error_result(str(e), e)
     except Exception as e:
         logger.error(f"Error during LLM invocation: {traceback.format_exc()}")
-        return {"error": f"LLM processor invocation failed."}
+        return error_result("LLM processor invocation failed.", e)
 
     # Parse the JSON response
     try:
         results_json = json.loads(results)
         if not isinstance(results_json, dict):
             logger.error(f"LLM output was not a valid JSON object: {results_json}")
+            count("ModelOutputNotObject")
             return {"error": "LLM output was not a valid JSON object."}
         else:
+            count("ModelOutputValid")
             return {"output": results_json}
     except json.JSONDecodeError as first_error:
-        return correct_json(results, str(first_error))
-
-
-def process_audiology_data(input_report: str, institution: str, config: dict) -> dict:
+        count("ModelOutputInvalid")
+        if not correct:
+            return {"error": "LLM output was not valid JSON."}
+        return correct_json(results, str(first_error), usage, deadline)
+
+
+def process_audiology_data(
+    input_report: str,
+    institution: str,
+    config: dict,
+    usage: TokenUsage | None = None,
+    deadline: Deadline | None = None,
+) -> dict:
     """
     Processes the audiology data for a specific institution using the provided
     configuration. Produces either the output data JSON or the error JSON to
-    be streamed over WebSocket to the client.
+    be streamed over WebSocket to the client. Model tokens are counted
+    against usage, and model calls are bounded by deadline.
 
     Returns a dictionary with either "output" or "error" key.
     """
@@ -354,17 +518,94 @@ def process_audiology_data(input_report: str, institution: str, config: dict) ->
         institution_template=institution_template,
         valid_values=valid_values,
         guidelines=processing_guidelines,
+        usage=usage,
+        deadline=deadline,
     )  # Produces dict with either "output" or "error" key
 
     return diagnosis_results  # Returns either {"output": {...}} or {"error": "..."}
 
 
-def retrieve_job_str(input_bucket: str, input_key: str) -> str:
+def classify_packed(
+    records: list[dict],
+    institution: str,
+    config: dict,
+    usage: TokenUsage | None = None,
+    deadline: Deadline | None = None,
+) -> list[dict]:
+    """
+    Classifies several short records in a single model call, returning their
+    results in order. Records missing from the response, or whose output
+    fails validation against the institution's template and valid values,
+    are classified on their own instead.
+    """
+
+    institution_data = config["templates"].get(institution, {})
+    institution_template = institution_data.get("template", {})
+    valid_values = institution_data.get("valid_values", {})
+
+    outputs = {}
+    if institution_template:
+        with stage("PromptBuild"):
+            prompt = build_packed_prompt(
+                {record["record_id"]: record_report(record) for record in records},
+                institution_template,
+                valid_values,
+                institution_data.get("processing_rules", {}).get("rules", []),
+            )
+
+        try:
+            outputs = parse_packed_output(
+                invoke_bedrock_model(prompt, usage, deadline=deadline)
+            )
+        except (TokenBudgetExceeded, DeadlineExceeded) as e:
+            logger.warning(f"Skipping packed LLM invocation: {e}")
+            return [error_result(str(e), e) for _ in records]
+        except Exception:
+            logger.error(
+                f"Error during packed LLM invocation: {traceback.format_exc()}"
+            )
+
+    put_metric("PackedReports", MetricUnit.Count, len(records))
+
+    results = []
+    for record in records:
+        output = outputs.get(record["record_id"], None)
+        problems = (
+            validation_problems(output, institution_template, valid_values)
+            if isinstance(output, dict)
+            else ["output is missing"]
+        )
+        if not problems:
+            count("PackedReportValid")
+            results.append({"output": output})
+        else:
+            logger.warning(
+                f"Packed output for record {record['record_id']} was invalid, classifying it alone: {problems}"
+            )
+            count("PackedReportFallback")
+            results.append(
+                process_audiology_data(
+                    input_report=record_report(record),
+                    institution=institution,
+                    config=config,
+                    usage=usage,
+                    deadline=deadline,
+                )
+            )
+
+    return results
+
+
+def retrieve_job_str(
+    input_bucket: str, input_key: str, deadline: Deadline | None = None
+) -> str:
     """
     Retrieves the job file from S3 and returns its content as a string.
     """
     try:
-        response = s3.get_object(Bucket=input_bucket, Key=input_key)
+        response = s3_clients.for_deadline(deadline).get_object(
+            Bucket=input_bucket, Key=input_key
+        )
     except Exception as e:
         logger.error(f"Error retrieving job file from S3: {e}")
         raise Exception("Error retrieving job file from S3.") from e
@@ -377,15 +618,216 @@ def retrieve_job_str(input_bucket: str, input_key: str) -> str:
         raise Exception("Error reading job file contents.") from e
 
 
-def process_job(job_id: str) -> dict:
+def parse_records(body: str) -> list[dict] | None:
+    """
+    Splits a multi-patient input (a JSON array of patient objects with a
+    report and/or audiometric results) into records. Returns None when the
+    input is a single report, which is classified as a whole.
+    """
+
+    try:
+        patients = json.loads(body)
+    except json.JSONDecodeError:
+        return None
+
+    if not (
+        isinstance(patients, list)
+        and patients
+        and all(isinstance(patient, dict) for patient in patients)
+    ):
+        return None
+
+    records = []
+    for idx, patient in enumerate(patients, start=1):
+        report = (patient.get("report") or patient.get("Report") or "").strip()
+        results = patient.get("results") or patient.get("Results") or []
+        records.append(
+            {"record_id": f"PAT{idx:08d}", "report": report, "results": results}
+        )
+
+    return records
+
+
+def records_key(job_id: str) -> str:
+    return f"completed_jobs/{job_id}.jsonl.gz"
+
+
+def process_records(
+    job_id: str,
+    records: list[dict],
+    institution: str,
+    config: dict,
+    usage: TokenUsage | None = None,
+    deadline: Deadline | None = None,
+    resumable: bool = False,
+) -> dict:
+    """
+    Classifies each patient record of a multi-patient job, streaming each
+    processed record (its input alongside either an "output" or "error" key)
+    to the output bucket as soon as it is classified. Once the job's token
+    budget is used up, or there isn't time left before the deadline, the
+    remaining records are recorded with an error without invoking the model.
+
+    Processed records are checkpointed as they are classified, and records
+    checkpointed by an earlier attempt at the job aren't classified again.
+    Only results that a retry would reproduce are checkpointed: outputs and
+    deterministic errors such as a missing report. If resumable, a job that
+    runs out of time, or whose record fails with a TransientError (e.g. a
+    timeout or throttling), stops with JobIncomplete instead of recording
+    the error, to be resumed by the Step Function's retry.
+
+    With packing enabled (PACKING_CONFIG), consecutive short records are
+    classified several at a time, as many as fit in the response's
+    max_tokens.
+
+    Returns a summary pointing at the uploaded records, since multi-patient
+    results can be far larger than a Step Function payload.
+    """
+
+    key = records_key(job_id)
+    checkpoint = JobCheckpoint(s3, OUTPUT_BUCKET_NAME, job_id)
+    completed, checkpoint_usage = checkpoint.load()
+    if completed:
+        logger.info(
+            f"Resuming job {job_id}: {len(completed)} of {len(records)} records were already classified"
+        )
+        put_metric("CheckpointedRecords", MetricUnit.Count, len(completed))
+    if usage is not None and checkpoint_usage:
+        usage.resume(checkpoint_usage)
+
+    writer = RecordStreamWriter(
+        s3_clients.for_deadline(deadline), OUTPUT_BUCKET_NAME, key
+    )
+    error_count = 0
+    pending = iter(records)
+    remaining = [record for record in records if record["record_id"] not in completed]
+
+    packing_config = packing_config_from_env()
+    size = pack_size(
+        json.loads(os.environ.get("INFERENCE_CONFIG", "{}")), packing_config
+    )
+
+    try:
+        for pack in pack_records(remaining, size, packing_config):
+            if (
+                resumable
+                and deadline is not None
+                and deadline.remaining() <= MIN_MODEL_CALL_SECONDS
+            ):
+                raise JobIncomplete(
+                    f"Job {job_id} ran out of time with records left to classify."
+                )
+
+            if len(pack) > 1:
+                results = classify_packed(pack, institution, config, usage, deadline)
+            elif not pack[0]["report"] and not pack[0]["results"]:
+                logger.warning(
+                    f"Skipping record {pack[0]['record_id']}: No report or audiometric results."
+                )
+                results = [{"error": "No report or audiometric results."}]
+            else:
+                results = [
+                    process_audiology_data(
+                        input_report=record_report(pack[0]),
+                        institution=institution,
+                        config=config,
+                        usage=usage,
+                        deadline=deadline,
+                    )
+                ]
+
+            for record, result in zip(pack, results):
+                transient = isinstance(result, TransientError)
+                if resumable and transient:
+                    raise JobIncomplete(
+                        f"Job {job_id} stopped at record {record['record_id']}: {result['error']}"
+                    )
+
+                error_count += write_checkpointed(
+                    writer, pending, completed, record["record_id"]
+                )
+                if "error" in result:
+                    error_count += 1
+                writer.write({**record, **result})
+                if not transient:
+                    checkpoint.add({**record, **result}, usage_dict(usage))
+
+        error_count += write_checkpointed(writer, pending, completed, None)
+    except Exception as e:
+        try:
+            checkpoint.save(usage_dict(usage))
+        except Exception:
+            logger.error(f"Error saving checkpoint: {traceback.format_exc()}")
+        writer.abort(e)
+        raise
+
+    writer.close()
+    try:
+        checkpoint.clear()
+    except Exception:
+        logger.error(f"Error deleting checkpoints: {traceback.format_exc()}")
+
+    return {
+        "records_key": key,
+        "record_count": len(records),
+        "error_count": error_count,
+    }
+
+
+def usage_dict(usage: TokenUsage | None) -> dict | None:
+    return None if usage is None else usage.to_dict()
+
+
+def inline_job_info(job_input: dict) -> dict:
+    """
+    Job details for a report submitted inline through the API, which starts
+    processing directly with the report and job details in its input.
+    """
+
+    job = job_input.get("job", None) or {}
+    if not job.get("config_id") or not job.get("institution_id"):
+        raise ValueError("Missing internal information for inline job")
+
+    return {
+        "config_id": job["config_id"],
+        "institution_id": job["institution_id"],
+        "connection_id": None,
+        "domain_name": None,
+    }
+
+
+def process_job(
+    job_id: str,
+    job: dict,
+    config: dict,
+    report: str | None = None,
+    usage: TokenUsage | None = None,
+    deadline: Deadline | None = None,
+    resumable: bool = False,
+) -> dict:
     """
     Processes the job file data based on the input configuration, returning a
-    processed record.
+    processed record, or processed records for multi-patient inputs. A report
+    passed inline is classified directly instead of reading the job file.
+    Model tokens are counted against usage, and work that can't finish before
+    deadline is skipped with an error, or if resumable, multi-patient jobs
+    are checkpointed and stopped with JobIncomplete.
     """
 
-    config_id, input_bucket, input_key, institution = retrieve_job_info(job_id)
+    if report is not None:
+        logger.info(f"Record processor got inline report for job ID: {job_id}")
+        return process_audiology_data(
+            input_report=report,
+            institution=job["institution_id"],
+            config=config,
+            usage=usage,
+            deadline=deadline,
+        )
 
-    config = retrieve_config(config_id)
+    config_id = job["config_id"]
+    input_bucket = job["input_bucket"]
+    input_key = job["input_key"]
+    institution = job["institution_id"]
 
     logger.info(
         f"Record processor got job ID: {job_id} with config ID: {config_id} and input bucket: {input_bucket}, input key: {input_key}"
@@ -395,16 +837,32 @@ def process_job(job_id: str) -> dict:
         body = retrieve_job_str(
             input_bucket=input_bucket,
             input_key=input_key,
+            deadline=deadline,
         )
     except Exception as e:
         return {"error": f"Error retrieving job file: {str(e)}"}
 
     logger.info(f"Retrieved job file content: {body[:100]}...")  # Log first 100 chars
 
+    records = parse_records(body)
+    if records is not None:
+        logger.info(f"Processing {len(records)} records for job {job_id}")
+        return process_records(
+            job_id,
+            records,
+            institution=institution,
+            config=config,
+            usage=usage,
+            deadline=deadline,
+            resumable=resumable,
+        )
+
     processing_result = process_audiology_data(
         input_report=body,
         institution=institution,
         config=config,
+        usage=usage,
+        deadline=deadline,
     )
 
     # TODO: on error, return error JSON out of step stage instead of passing
@@ -412,12 +870,150 @@ def process_job(job_id: str) -> dict:
     return processing_result
 
 
-def handler(event, context):
+def export_details(config: dict, institution: str) -> dict:
+    """
+    The institution's template and CSV headers, used by the completion
+    recorder to export results in tabular form.
+    """
+
+    institution_data = config.get("templates", {}).get(institution, {})
+
+    return {
+        "template": institution_data.get("template", {}),
+        "csv_headers": institution_data.get("csv_headers", []),
+    }
+
+
+def job_usage(usage: TokenUsage | None) -> dict | None:
+    """
+    Token usage recorded on the job record by the completion recorder, also
+    emitted as metrics.
+    """
+
+    if usage is None:
+        return None
+
+    put_metric("JobInputTokens", MetricUnit.Count, usage.input_tokens)
+    put_metric("JobOutputTokens", MetricUnit.Count, usage.output_tokens)
+    put_metric("JobModelCalls", MetricUnit.Count, usage.model_calls)
+    if usage.budget_exceeded:
+        count("TokenBudgetExceeded")
+
+    return usage.to_dict()
+
+
+def report_deadline(deadline: Deadline | None) -> None:
     """
-    Maps a single patient audiology record to a classificatio JSON or error JSON.
+    Counts invocations that skipped work to finish before their deadline.
+    """
+
+    if deadline is not None and deadline.exceeded:
+        logger.warning("Work was skipped to finish before the Lambda timeout.")
+        count("DeadlineExceeded")
+
+
+def report_lane_wait(job: dict | None) -> None:
+    """
+    Emits how long a job waited in its lane between being queued by the
+    bucket response and its first processing attempt.
+    """
+
+    queued_at = (job or {}).get("queued_at", None)
+    if not queued_at:
+        return
+
+    waited = datetime.now(timezone.utc) - datetime.fromisoformat(queued_at)
+    put_metric(
+        f"Lane{LANE.capitalize()}WaitTime",
+        MetricUnit.Milliseconds,
+        max(0, int(waited.total_seconds() * 1000)),
+    )
+
+
+def job_timings(started_at: str, start_time: float) -> dict:
+    """
+    Timing details recorded on the job record by the completion recorder.
+    """
+
+    return {
+        "started_at": started_at,
+        "processing_ms": int((time.perf_counter() - start_time) * 1000),
+    }
+
+
+def classify_inline(event: dict, deadline: Deadline | None = None) -> dict:
+    """
+    Classifies a report sent by the API when it invokes the record processor
+    directly, returning the result to the caller instead of passing it along
+    the Step Function.
+    """
+
+    job_id = event.get("jobId", None)
+    logger.info(f"Record processor invoked synchronously for job ID: {job_id}")
+    usage = None
+
+    try:
+        job = inline_job_info(event)
+        tag_job(job["institution_id"], job["config_id"])
+        current_institution.set(job["institution_id"])
+        config = retrieve_config(job["config_id"], deadline)
+        usage = TokenUsage(token_budget(config))
+        processing_result = process_job(
+            job_id=job_id,
+            job=job,
+            config=config,
+            report=event.get("report", ""),
+            usage=usage,
+            deadline=deadline,
+        )
+    except Exception as e:
+        logger.error(f"Error processing job {job_id}: {traceback.format_exc()}")
+        report_deadline(deadline)
+        return {
+            "statusCode": 500,
+            "result": {"error": f"Error processing job: {str(e)}"},
+            "jobId": job_id,
+            "usage": job_usage(usage),
+        }
 
-    Returns { "statusCode": 200, "result": {...} }. "result" contains either
-    {"output": {...}} or {"error": "..."}.
+    report_deadline(deadline)
+    return {
+        "statusCode": 200,
+        "result": processing_result,
+        "jobId": job_id,
+        "usage": job_usage(usage),
+    }
+
+
+@metrics.log_metrics(capture_cold_start_metric=True)
+@tracer.capture_lambda_handler
+def handler(event, context):
+    """
+    Maps a single patient audiology record, or each record of a multi-patient
+    input, to a classificatio JSON or error JSON.
+
+    Returns { "statusCode": 200, "result": {...}, ... }. "result" contains either
+    {"output": {...}} or {"error": "..."}. The loaded job record ("job"), the
+    execution ARN ("executionId"), timings and token usage ("usage") are
+    passed along so that the completion recorder can report and record the job
+    without reading it again, and the institution's template and CSV headers
+    ("export") are passed along for tabular exports.
+
+    Events from the API's synchronous classify route ("source": "api") are
+    classified and the result returned directly.
+
+    Stage latencies, model token usage and JSON parse outcomes are emitted as
+    metrics tagged with the job's institution and config ID, along with the
+    time the job waited in its processing lane.
+
+    Work is bounded by a deadline derived from the Lambda context, so a job
+    that runs out of time returns errors for the work it skipped instead of
+    timing out. Multi-patient jobs are checkpointed instead, raising
+    JobIncomplete for the Step Function to retry until its last attempt
+    ("attempt" of JOB_RETRIES, counting only these retries). The lane wait
+    is reported on the first attempt, whose invocation is the job's first to
+    reach the record processor: throttled invocations are retried without
+    counting an attempt.
     """
 
     if JOB_TABLE is None:
@@ -436,6 +1032,14 @@ def handler(event, context):
             "jobId": None,
         }
 
+    if OUTPUT_BUCKET_NAME is None:
+        logger.error("OUTPUT_BUCKET_NAME environment variable is not set.")
+        return {
+            "statusCode": 500,
+            "result": {"error": "Internal server error."},
+            "jobId": None,
+        }
+
     if CONFIG_TABLE is None:
         logger.error("CONFIG_TABLE environment variable is not set.")
         return {
@@ -444,8 +1048,17 @@ def handler(event, context):
             "jobId": None,
         }
 
+    deadline = Deadline.from_context(context)
+
+    if event.get("source", None) == "api":
+        return classify_inline(event, deadline)
+
     job_id = event.get("jobId", None)
     execution_arn = event.get("executionId", None)
+    job_input = event.get("input", None) or {}
+    report = job_input.get("report", None)
+    attempt = event.get("attempt", 0)
+    resumable = attempt < JOB_RETRIES
 
     if not (job_id and execution_arn):
         logger.error("Bucket responses lanbda did not pass jobId and executionId.")
@@ -455,28 +1068,59 @@ def handler(event, context):
             "jobId": job_id,
         }
 
-    try:
-        log_execution_arn(execution_arn=execution_arn, job_id=job_id)
-    except Exception as e:
-        logger.error(f"Error logging execution ARN: {traceback.format_exc()}")
-        return {
-            "statusCode": 500,
-            "result": {"error": f"Error logging execution details: {str(e)}"},
-            "jobId": job_id,
-        }
+    started_at = datetime.now(timezone.utc).isoformat()
+    start_time = time.perf_counter()
+    job = None
+    export = None
+    usage = None
 
     try:
-        processing_result = process_job(job_id=job_id)
+        if report is not None:
+            job = inline_job_info(job_input)
+        else:
+            job = retrieve_job_info(job_id, deadline)
+        tag_job(job["institution_id"], job["config_id"])
+        current_institution.set(job["institution_id"])
+        if attempt == 0:
+            report_lane_wait(job)
+        config = retrieve_config(job["config_id"], deadline)
+        export = export_details(config, job["institution_id"])
+        usage = TokenUsage(token_budget(config))
+        processing_result = process_job(
+            job_id=job_id,
+            job=job,
+            config=config,
+            report=report,
+            usage=usage,
+            deadline=deadline,
+            resumable=resumable,
+        )
+    except JobIncomplete:
+        logger.warning(f"Job {job_id} is incomplete, to be resumed on retry.")
+        count("JobIncomplete")
+        raise
     except Exception as e:
         logger.error(f"Error processing job {job_id}: {traceback.format_exc()}")
+        report_deadline(deadline)
         return {
             "statusCode": 500,
             "result": {"error": f"Error processing job: {str(e)}"},
             "jobId": job_id,
+            "executionId": execution_arn,
+            "job": job,
+            "export": export,
+            "timings": job_timings(started_at, start_time),
+            "usage": job_usage(usage),
         }
 
+    report_deadline(deadline)
     return {
         "statusCode": 200,
         "result": processing_result,
         "jobId": job_id,
+        "executionId": execution_arn,
+        "job": job,
+        "export": export,
+        "timings": job_timings(started_at, start_time),
+        "usage": job_usage(usage),
     }
@@ -0,0 +1,438 @@
+import hashlib
+import json
+import logging
+import math
+import os
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from concurrent.futures import wait
+
+import boto3
+from audiology_metrics.instrumentation import count
+from botocore.exceptions import ClientError, ReadTimeoutError
+from deadline import TimeoutClients
+from fair_share import FairShareScheduler, spare_model_slot
+
+logger = logging.getLogger()
+
+
+class ModelBackend:
+    """
+    Sends Anthropic messages requests to a model, returning the response body
+    ({"content": [...], "usage": {...}, ...}) as a dict. A request given a
+    timeout fails if it isn't answered within timeout seconds.
+    """
+
+    def invoke(
+        self, model_id: str, request_body: dict, timeout: float | None = None
+    ) -> dict:
+        raise NotImplementedError
+
+
+class BedrockBackend(ModelBackend):
+    """
+    Invokes models through the Bedrock runtime, with the read timeout of
+    each call bounded by its timeout.
+    """
+
+    def __init__(self, region_name: str = "us-west-2", client=None):
+        self.client = client
+        # Model calls take too long to retry within their deadline
+        self.clients = TimeoutClients(
+            "bedrock-runtime", single_attempt=True, region_name=region_name
+        )
+
+    def invoke(
+        self, model_id: str, request_body: dict, timeout: float | None = None
+    ) -> dict:
+        client = self.client or self.clients.get(timeout)
+        response = client.invoke_model(
+            modelId=model_id,
+            body=json.dumps(request_body),
+            contentType="application/json",
+            accept="application/json",
+        )
+
+        return json.loads(response["body"].read())
+
+
+def parse_latency(spec: str):
+    """
+    Parses a latency distribution, returning a function drawing delays in
+    seconds from a random.Random:
+    - "fixed:<ms>"
+    - "uniform:<min ms>:<max ms>"
+    - "lognormal:<median ms>:<sigma>", a long-tailed distribution closer to
+      real model latency
+    """
+
+    kind, *params = spec.split(":")
+    try:
+        values = [float(param) for param in params]
+    except ValueError as e:
+        raise ValueError(f"Invalid latency distribution: {spec}") from e
+
+    if kind == "fixed" and len(values) == 1:
+        return lambda rng: values[0] / 1000
+    if kind == "uniform" and len(values) == 2:
+        return lambda rng: rng.uniform(values[0], values[1]) / 1000
+    if kind == "lognormal" and len(values) == 2:
+        mu = math.log(max(values[0], 1e-3))
+        return lambda rng: rng.lognormvariate(mu, values[1]) / 1000
+
+    raise ValueError(f"Invalid latency distribution: {spec}")
+
+
+def prompt_key(request_body: dict) -> str:
+    """
+    Key identifying a request's prompt in recorded responses.
+    """
+
+    prompt = json.dumps(request_body.get("messages", []), sort_keys=True)
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+
+class FakeBackend(ModelBackend):
+    """
+    Local stand-in for Bedrock with configurable failures, for deterministic
+    performance and correctness testing without model access.
+
+    Responses are replayed from recordings: a JSON Lines file with one
+    {"prompt_sha256": ..., "response": {...}} or {"text": "..."} per line.
+    Recordings with a prompt hash answer that prompt; the rest are used in
+    turn for any other prompt. Without recordings, every request is answered
+    with default_text.
+
+    A seeded fraction of requests can be throttled (raising the same
+    ThrottlingException as Bedrock) or answered with truncated, malformed
+    JSON, and every request is delayed by a draw from the latency
+    distribution. Requests delayed past their timeout raise botocore's
+    ReadTimeoutError once it has passed.
+    """
+
+    def __init__(
+        self,
+        recordings: list[dict] | None = None,
+        default_text: str = "{}",
+        latency: str = "fixed:0",
+        malformed_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        seed: int = 0,
+    ):
+        self.by_prompt = {}
+        self.sequence = []
+        for recording in recordings or []:
+            response = recording.get("response", None) or text_response(
+                recording["text"]
+            )
+            if recording.get("prompt_sha256", None):
+                self.by_prompt[recording["prompt_sha256"]] = response
+            else:
+                self.sequence.append(response)
+
+        self.default_text = default_text
+        self.latency = parse_latency(latency)
+        self.malformed_rate = malformed_rate
+        self.throttle_rate = throttle_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.calls = 0
+        self.throttled = 0
+        self.malformed = 0
+
+    @classmethod
+    def from_env(cls) -> "FakeBackend":
+        recordings = []
+        path = os.environ.get("FAKE_MODEL_RECORDINGS", None)
+        if path:
+            with open(path, "r", encoding="utf-8") as file:
+                recordings = [json.loads(line) for line in file if line.strip()]
+
+        return cls(
+            recordings=recordings,
+            default_text=os.environ.get("FAKE_MODEL_DEFAULT_TEXT", "{}"),
+            latency=os.environ.get("FAKE_MODEL_LATENCY", "fixed:0"),
+            malformed_rate=float(os.environ.get("FAKE_MODEL_MALFORMED_RATE", "0")),
+            throttle_rate=float(os.environ.get("FAKE_MODEL_THROTTLE_RATE", "0")),
+            seed=int(os.environ.get("FAKE_MODEL_SEED", "0")),
+        )
+
+    def invoke(
+        self, model_id: str, request_body: dict, timeout: float | None = None
+    ) -> dict:
+        with self.lock:
+            index = self.calls
+            self.calls += 1
+            delay = self.latency(self.random)
+            throttled = self.random.random() < self.throttle_rate
+            malformed = not throttled and self.random.random() < self.malformed_rate
+            self.throttled += throttled
+            self.malformed += malformed
+
+        if timeout is not None and delay > timeout:
+            time.sleep(timeout)
+            raise ReadTimeoutError(endpoint_url="fake://bedrock-runtime")
+
+        time.sleep(delay)
+
+        if throttled:
+            raise ClientError(
+                {
+                    "Error": {
+                        "Code": "ThrottlingException",
+                        "Message": "Too many requests, please wait before trying again.",
+                    },
+                    "ResponseMetadata": {"HTTPStatusCode": 429},
+                },
+                "InvokeModel",
+            )
+
+        response = self.by_prompt.get(prompt_key(request_body), None)
+        if response is None and self.sequence:
+            response = self.sequence[index % len(self.sequence)]
+        if response is None:
+            response = text_response(self.default_text)
+
+        response = with_usage(response, request_body)
+
+        if malformed:
+            text = response["content"][0]["text"]
+            response = {
+                **response,
+                "content": [{"type": "text", "text": text[: max(1, len(text) // 2)]}],
+            }
+
+        return response
+
+
+def text_response(text: str) -> dict:
+    return {
+        "id": "msg_fake",
+        "type": "message",
+        "role": "assistant",
+        "content": [{"type": "text", "text": text}],
+        "stop_reason": "end_turn",
+    }
+
+
+def with_usage(response: dict, request_body: dict) -> dict:
+    """
+    Fills in token usage when a recording lacks it, estimated at four
+    characters per token.
+    """
+
+    if "usage" in response:
+        return response
+
+    prompt = json.dumps(request_body.get("messages", []))
+    text = "".join(item.get("text", "") for item in response.get("content", []))
+
+    return {
+        **response,
+        "usage": {"input_tokens": len(prompt) // 4, "output_tokens": len(text) // 4},
+    }
+
+
+def regional_model_id(model_id: str, region: str | None) -> str:
+    """
+    The model or inference profile ARN for another region, e.g. the same
+    cross-region inference profile invoked from us-east-1 instead of
+    us-west-2. Plain model IDs are returned unchanged.
+    """
+
+    parts = model_id.split(":")
+    if region is None or len(parts) < 6 or parts[0] != "arn":
+        return model_id
+
+    return ":".join(parts[:3] + [region] + parts[4:])
+
+
+class HedgedBackend(ModelBackend):
+    """
+    Cuts tail latency by hedging slow requests: if a request hasn't been
+    answered after the hedge delay, the same request is sent to the next
+    hedge target, usually Bedrock in another region, and whichever answers
+    first is used. The other is cancelled if it hasn't started, otherwise
+    left to finish in the background and its response discarded.
+
+    The hedge delay is the given percentile of recent latencies (initial_delay_ms
+    until min_samples calls have been timed), and at most max_hedge_rate of
+    the last window calls are hedged, bounding the extra model cost. With a
+    fair-share scheduler, a hedge holds a slot of its own until it finishes,
+    and is skipped if no slot is free.
+    """
+
+    def __init__(
+        self,
+        backend: ModelBackend,
+        targets: list[tuple[ModelBackend, str | None]],
+        percentile: float = 0.95,
+        initial_delay_ms: float = 5000,
+        min_delay_ms: float = 500,
+        max_hedge_rate: float = 0.05,
+        window: int = 200,
+        min_samples: int = 20,
+        scheduler: FairShareScheduler | None = None,
+    ):
+        self.backend = backend
+        self.targets = targets
+        self.scheduler = scheduler
+        self.percentile = percentile
+        self.initial_delay = initial_delay_ms / 1000
+        self.min_delay = min_delay_ms / 1000
+        self.max_hedge_rate = max_hedge_rate
+        self.min_samples = min_samples
+        self.latencies = deque(maxlen=window)
+        self.hedged_calls = deque(maxlen=window)
+        self.lock = threading.Lock()
+        self.executor = ThreadPoolExecutor(max_workers=16)
+        self.calls = 0
+        self.hedges = 0
+        self.hedge_wins = 0
+
+    def hedge_delay(self) -> float:
+        with self.lock:
+            if len(self.latencies) < self.min_samples:
+                return max(self.min_delay, self.initial_delay)
+            latencies = sorted(self.latencies)
+
+        index = min(len(latencies) - 1, int(self.percentile * len(latencies)))
+        return max(self.min_delay, latencies[index])
+
+    def take_hedge(self) -> bool:
+        """
+        Whether a slow call may be hedged without exceeding max_hedge_rate,
+        counting it as hedged if so.
+        """
+
+        with self.lock:
+            allowed = (
+                sum(self.hedged_calls) + 1
+                <= self.max_hedge_rate * self.hedged_calls.maxlen
+            )
+            if allowed:
+                self.hedged_calls.append(True)
+                self.hedges += 1
+            return allowed
+
+    def invoke(
+        self, model_id: str, request_body: dict, timeout: float | None = None
+    ) -> dict:
+        with self.lock:
+            target = self.targets[self.calls % len(self.targets)]
+            self.calls += 1
+
+        start = time.perf_counter()
+        primary = self.executor.submit(
+            self.backend.invoke, model_id, request_body, timeout
+        )
+
+        delay = self.hedge_delay()
+        try:
+            response = primary.result(timeout=delay)
+        except FutureTimeoutError:
+            pass
+        else:
+            self.record(time.perf_counter() - start, hedged=False)
+            return response
+
+        # Hedges are only sent with at least the hedge delay left to answer
+        hedge_timeout = None if timeout is None else timeout - delay
+        too_late = hedge_timeout is not None and hedge_timeout < delay
+        release = None if too_late else spare_model_slot(self.scheduler)
+        if release is not None and not self.take_hedge():
+            release()
+            release = None
+        if release is None:
+            response = primary.result()
+            self.record(time.perf_counter() - start, hedged=False)
+            return response
+
+        backend, region = target
+        count("ModelHedged")
+        hedge = self.executor.submit(
+            backend.invoke,
+            regional_model_id(model_id, region),
+            request_body,
+            hedge_timeout,
+        )
+        # The hedge's slot is held until it finishes, even if it loses
+        hedge.add_done_callback(lambda _: release())
+
+        pending = {primary, hedge}
+        error = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    error = error or future.exception()
+                    continue
+
+                for loser in pending:
+                    loser.cancel()
+                if future is hedge:
+                    count("ModelHedgeWon")
+                    with self.lock:
+                        self.hedge_wins += 1
+                self.record(time.perf_counter() - start, hedged=True)
+                return future.result()
+
+        raise error
+
+    def record(self, latency: float, hedged: bool) -> None:
+        with self.lock:
+            self.latencies.append(latency)
+            if not hedged:
+                self.hedged_calls.append(False)
+
+
+def hedged_bedrock_backend(
+    backend: ModelBackend,
+    hedging: dict,
+    scheduler: FairShareScheduler | None = None,
+) -> HedgedBackend:
+    """
+    Hedges Bedrock requests to each of the hedging regions in turn, or to
+    the same region if none are given, within scheduler's slots if given.
+    """
+
+    targets = [
+        (BedrockBackend(region_name=region), region)
+        for region in hedging.get("regions", [])
+    ] or [(backend, None)]
+
+    return HedgedBackend(
+        backend,
+        targets,
+        percentile=hedging.get("percentile", 95) / 100,
+        initial_delay_ms=hedging.get("initial_delay_ms", 5000),
+        min_delay_ms=hedging.get("min_delay_ms", 500),
+        max_hedge_rate=hedging.get("max_hedge_rate", 0.05),
+        window=hedging.get("window", 200),
+        scheduler=scheduler,
+    )
+
+
+def backend_from_env(scheduler: FairShareScheduler | None = None) -> ModelBackend:
+    """
+    The backend named by MODEL_BACKEND: "bedrock" (the default) or "fake".
+    Bedrock requests are hedged if HEDGING_CONFIG enables it, with each hedge
+    taking its own slot of scheduler.
+    """
+
+    name = os.environ.get("MODEL_BACKEND", "bedrock").lower()
+
+    if name == "bedrock":
+        hedging = json.loads(os.environ.get("HEDGING_CONFIG", "{}") or "{}")
+        if hedging.get("enabled", False):
+            return hedged_bedrock_backend(BedrockBackend(), hedging, scheduler)
+        return BedrockBackend()
+    if name == "fake":
+        logger.warning("Using the fake model backend; no model is invoked.")
+        return FakeBackend.from_env()
+
+    raise ValueError(f"Unknown MODEL_BACKEND: {name}")
@@ -0,0 +1,82 @@
+import json
+import os
+from typing import Iterator
+
+from prompts import estimate_tokens, record_report
+
+# Share of max_tokens a packed response is sized to, leaving room for
+# reports whose classification runs longer than estimated
+OUTPUT_HEADROOM = 0.8
+
+
+def pack_size(inference_config: dict, packing_config: dict) -> int:
+    """
+    How many reports are classified per model call: as many as fit in the
+    response's max_tokens at output_tokens_per_report each, up to max_reports.
+    Returns 1, classifying reports one at a time, when packing is disabled.
+    """
+
+    if not packing_config.get("enabled", False):
+        return 1
+
+    output_budget = int(inference_config.get("max_tokens", 0) * OUTPUT_HEADROOM)
+    fitting = output_budget // max(1, int(packing_config["output_tokens_per_report"]))
+
+    return max(1, min(int(packing_config["max_reports"]), fitting))
+
+
+def packing_config_from_env() -> dict:
+    return json.loads(os.environ.get("PACKING_CONFIG", "{}") or "{}")
+
+
+def is_packable(record: dict, packing_config: dict) -> bool:
+    """
+    Whether a record is short enough to share a model call with others.
+    """
+
+    if not record["report"] and not record["results"]:
+        return False
+
+    report_tokens = estimate_tokens(record_report(record))
+    return report_tokens <= int(packing_config.get("max_report_tokens", 1000))
+
+
+def pack_records(
+    records: list[dict], size: int, packing_config: dict
+) -> Iterator[list[dict]]:
+    """
+    Groups consecutive packable records into packs of up to size records,
+    keeping the records in order. Other records are yielded on their own.
+    """
+
+    pack = []
+    for record in records:
+        if size > 1 and is_packable(record, packing_config):
+            pack.append(record)
+            if len(pack) == size:
+                yield pack
+                pack = []
+            continue
+
+        if pack:
+            yield pack
+            pack = []
+        yield [record]
+
+    if pack:
+        yield pack
+
+
+def parse_packed_output(text: str) -> dict:
+    """
+    Parses the model's answer to a packed prompt into outputs by record ID.
+    Returns an empty dict if it isn't a JSON object, so every record falls
+    back to being classified on its own.
+    """
+
+    try:
+        outputs = json.loads(text)
+    except json.JSONDecodeError:
+        return {}
+
+    return outputs if isinstance(outputs, dict) else {}
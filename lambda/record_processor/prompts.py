@@ -0,0 +1,134 @@
+import json
+
+SYSTEM_MESSAGE = "You are an expert **pediatric** audiologist that extracts explicit hearing test data and classifies hearing loss accurately."
+
+OUTPUT_RULES = """- Provide **precise reasoning** for each classification.
+- Make sure there is thorough, chain of thought reasoning for each attribute's output.
+- **Cite guideline numbers** when making classification decisions.
+- **DO NOT include any additional explanations, assumptions, or commentary.**
+- Do NOT include code block formatting (e.g., ```json or ```) in the output; output RAW JSON only.
+- Be certain the JSON output is valid; braces should be balanced, etc.
+"""
+
+
+def classification_guidance(
+    institution_template: dict,
+    valid_values: dict,
+    guidelines: list[dict] | None,
+) -> str:
+    """
+    The template, valid values, guidelines and processing rules shared by
+    every prompt for an institution.
+    """
+
+    # Format the JSON template by escaping braces
+    json_template_fixed = (
+        json.dumps(institution_template, indent=4).replace("{", "{{").replace("}", "}}")
+    )
+
+    return f"""**Use the classification template and guidelines** to determine:
+{json_template_fixed}
+
+**Valid Values:**
+```json
+{json.dumps(valid_values, indent=4)}
+```
+
+**Guidelines for Classification:**
+```json
+{json.dumps(guidelines, indent=4)}
+```
+
+**Processing Rules (MUST Follow):**
+- **Use only explicitly provided threshold values**; do not infer missing values.
+- **If multiple severities are listed, assign the most severe classification.**
+"""
+
+
+def build_prompt(
+    report: str,
+    institution_template: dict,
+    valid_values: dict,
+    guidelines: list[dict] | None,
+) -> str:
+    """
+    Builds the complete prompt for the LLM without using LangChain templates.
+    """
+
+    # Build the human message
+    human_message = f"""{report}
+
+{classification_guidance(institution_template, valid_values, guidelines)}**Output Requirements:**
+- Return classification in **EXACT JSON format** as per the template, with no modifications.
+{OUTPUT_RULES}"""
+
+    # TODO: parse to regex-retrieve JSON.
+
+    # Combine system and human messages in the format expected by Bedrock
+    full_prompt = f"System: {SYSTEM_MESSAGE}\n\nHuman: {human_message}\n\nAssistant:"
+
+    return full_prompt
+
+
+def build_packed_prompt(
+    reports: dict[str, str],
+    institution_template: dict,
+    valid_values: dict,
+    guidelines: list[dict] | None,
+) -> str:
+    """
+    Builds a prompt classifying several reports, keyed by record ID, in one
+    request, so the template and guidelines are sent once for all of them.
+    The model answers with a JSON object mapping each record ID to its
+    classification.
+    """
+
+    report_sections = "\n\n".join(
+        f"### Report {record_id}\n{report}" for record_id, report in reports.items()
+    )
+
+    human_message = f"""The following {len(reports)} reports are each for a different patient, headed by their report ID.
+
+{report_sections}
+
+{classification_guidance(institution_template, valid_values, guidelines)}**Output Requirements:**
+- Return a single JSON object with exactly one entry per report, keyed by its report ID (e.g. "{next(iter(reports))}").
+- Each entry is that report's classification in **EXACT JSON format** as per the template, with no modifications.
+- Classify each report **independently**; never use one patient's results for another.
+{OUTPUT_RULES}"""
+
+    return f"System: {SYSTEM_MESSAGE}\n\nHuman: {human_message}\n\nAssistant:"
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token count of text, at four characters per token.
+    """
+
+    return len(text) // 4 + 1
+
+
+def record_report(record: dict) -> str:
+    """
+    Builds the report text classified for a single patient record.
+    """
+
+    if not record["results"]:
+        return record["report"]
+
+    return (
+        f"{record['report']}\n\n"
+        "**Audiometric Test Results:**\n\n"
+        f"{json.dumps(record['results'], indent=4)}"
+    )
+
+
+def model_request(prompt: str, inference_config: dict) -> dict:
+    """
+    Builds the Bedrock request body for a prompt under the inference config.
+    """
+
+    return {
+        "messages": [{"role": "user", "content": [{"type": "text", "text": prompt}]}],
+        **inference_config,
+    }
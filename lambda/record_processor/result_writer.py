@@ -0,0 +1,115 @@
+import gzip
+import io
+import json
+import queue
+import threading
+
+from audiology_common.streams import TRANSFER_CONFIG, IterStream
+
+# Compressed output is handed to the upload in chunks of about this size
+CHUNK_BYTES = 1024 * 1024
+
+# Chunks waiting to be uploaded; when full, classification waits for the upload
+MAX_PENDING_CHUNKS = 8
+
+_DONE = object()
+
+
+class RecordStreamWriter:
+    """
+    Serializes processed records as gzip-compressed JSON Lines and uploads
+    them to S3 from a background thread as they are written, using a
+    multipart upload with concurrent parts once the output outgrows a single
+    part. Buffered output is bounded, so memory stays flat however many
+    records a job has, and uploading overlaps with classification.
+    """
+
+    def __init__(self, s3, bucket_name: str, key: str):
+        self.bucket_name = bucket_name
+        self.key = key
+        self.chunks = queue.Queue(maxsize=MAX_PENDING_CHUNKS)
+        self.buffer = io.BytesIO()
+        self.compressed = gzip.GzipFile(fileobj=self.buffer, mode="wb")
+        self.error = None
+        self.thread = threading.Thread(target=self._upload, args=(s3,), daemon=True)
+        self.thread.start()
+
+    def _chunks(self):
+        while True:
+            chunk = self.chunks.get()
+            if chunk is _DONE:
+                return
+            if isinstance(chunk, Exception):
+                # Raising here makes the transfer abort the multipart upload
+                raise chunk
+            yield chunk
+
+    def _upload(self, s3) -> None:
+        try:
+            s3.upload_fileobj(
+                io.BufferedReader(IterStream(self._chunks()), buffer_size=CHUNK_BYTES),
+                self.bucket_name,
+                self.key,
+                ExtraArgs={
+                    "ContentType": "application/x-ndjson",
+                    "ContentEncoding": "gzip",
+                },
+                Config=TRANSFER_CONFIG,
+            )
+        except Exception as e:
+            self.error = e
+            # Unblock a writer waiting on a full queue
+            while True:
+                try:
+                    self.chunks.get_nowait()
+                except queue.Empty:
+                    break
+
+    def _put(self, chunk) -> None:
+        while self.thread.is_alive():
+            try:
+                self.chunks.put(chunk, timeout=1)
+                return
+            except queue.Full:
+                continue
+
+        raise Exception(f"Error uploading results to S3: {str(self.error)}")
+
+    def _flush(self) -> None:
+        chunk = self.buffer.getvalue()
+        if chunk:
+            self._put(chunk)
+            self.buffer.seek(0)
+            self.buffer.truncate()
+
+    def write(self, record: dict) -> None:
+        self.compressed.write(
+            json.dumps(record, separators=(",", ":")).encode("utf-8") + b"\n"
+        )
+        if self.buffer.tell() >= CHUNK_BYTES:
+            self._flush()
+
+    def close(self) -> None:
+        """
+        Finishes the upload, raising if it failed.
+        """
+
+        self.compressed.close()
+        self._flush()
+        self._put(_DONE)
+        self.thread.join()
+
+        if self.error is not None:
+            raise Exception(f"Error uploading results to S3: {str(self.error)}")
+
+    def abort(self, error: Exception) -> None:
+        """
+        Abandons the upload, e.g. when processing fails partway.
+        """
+
+        self.compressed.close()
+        try:
+            self._put(error)
+        except Exception:
+            pass
+        self.thread.join()
@@ -0,0 +1,94 @@
+import os
+import threading
+
+
+class TokenBudgetExceeded(Exception):
+    """
+    Raised instead of invoking the model once a job has used its token budget.
+    """
+
+
+class TokenUsage:
+    """
+    Accumulates the model tokens used by a job across every model call,
+    including JSON corrections, and enforces the job's token budget if it has
+    one. Calls already in flight when the budget runs out still count, so a
+    job can overshoot its budget by at most one call per worker.
+    """
+
+    def __init__(self, budget: int | None = None):
+        self.budget = budget
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.model_calls = 0
+        self.budget_exceeded = False
+        self.lock = threading.Lock()
+
+    @property
+    def total_tokens(self) -> int:
+        return self.input_tokens + self.output_tokens
+
+    def exhausted(self) -> bool:
+        return self.budget is not None and self.total_tokens >= self.budget
+
+    def check(self) -> None:
+        """
+        Raises TokenBudgetExceeded if the budget is used up.
+        """
+
+        with self.lock:
+            if self.exhausted():
+                self.budget_exceeded = True
+                raise TokenBudgetExceeded(
+                    f"Token budget of {self.budget} tokens exceeded."
+                )
+
+    def add(self, usage: dict | None) -> None:
+        """
+        Adds the "usage" block of a model response.
+        """
+
+        usage = usage or {}
+        with self.lock:
+            self.input_tokens += int(usage.get("input_tokens", 0))
+            self.output_tokens += int(usage.get("output_tokens", 0))
+            self.model_calls += 1
+
+    def resume(self, usage: dict) -> None:
+        """
+        Continues from the usage recorded by an earlier attempt at the job.
+        """
+
+        with self.lock:
+            self.input_tokens += int(usage.get("input_tokens", 0))
+            self.output_tokens += int(usage.get("output_tokens", 0))
+            self.model_calls += int(usage.get("model_calls", 0))
+
+    def to_dict(self) -> dict:
+        return {
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "model_calls": self.model_calls,
+            "token_budget": self.budget,
+            "budget_exceeded": self.budget_exceeded,
+        }
+
+
+def token_budget(config: dict) -> int | None:
+    """
+    The token budget for a job: the smaller of TOKEN_BUDGET_PER_JOB and the
+    configuration's "token_budget", or None if neither is set. Zero or
+    negative budgets count as unset.
+    """
+
+    budgets = [
+        int(budget)
+        for budget in (
+            os.environ.get("TOKEN_BUDGET_PER_JOB", None),
+            config.get("token_budget", None),
+        )
+        if budget not in (None, "")
+    ]
+    budgets = [budget for budget in budgets if budget > 0]
+
+    return min(budgets) if budgets else None
@@ -0,0 +1,105 @@
+from audiology_common.templates import leaf_paths
+
+# Answers for fields that don't apply, e.g. the Degree of Loss of an ear
+# with normal hearing, which processing rules ask to leave blank
+NOT_APPLICABLE_VALUES = {"", "n/a", "na", "not applicable", "none"}
+
+
+def is_not_applicable(value) -> bool:
+    if value is None:
+        return True
+    if isinstance(value, list):
+        return all(is_not_applicable(item) for item in value)
+
+    return str(value).strip().lower() in NOT_APPLICABLE_VALUES
+
+
+def allowed_values(path: tuple[str, ...], valid_values: dict) -> list | None:
+    """
+    The valid values for a template leaf, or None if it is unconstrained.
+
+    Valid values are grouped by template section, e.g. "Hearing Type", and
+    named after the leaf they constrain, possibly without the prefix or
+    suffix the template adds: "Overall Result" constrains "Left Ear Overall
+    Result" and "Degree of Loss" constrains "Left Ear Degree".
+    """
+
+    for section in reversed(path[:-1]):
+        fields = valid_values.get(section, None)
+        if not isinstance(fields, dict):
+            continue
+
+        leaf = path[-1].lower()
+        constraints = {
+            name.lower(): values
+            for name, values in fields.items()
+            if isinstance(values, list)
+        }
+
+        for name, values in constraints.items():
+            if leaf == name or leaf.endswith(" " + name):
+                return values
+
+        # "Left Ear Degree" and "Degree of Loss"
+        for name, values in constraints.items():
+            if name.startswith(leaf.split(" ")[-1] + " "):
+                return values
+
+    return None
+
+
+def get_path(output: dict, path: tuple[str, ...]):
+    value = output
+    for key in path:
+        if not isinstance(value, dict) or key not in value:
+            raise KeyError(key)
+        value = value[key]
+
+    return value
+
+
+def validation_problems(
+    output: dict,
+    template: dict,
+    valid_values: dict,
+    uncertain_values: list[str] | None = None,
+) -> list[str]:
+    """
+    Checks a classification against the institution's template and valid
+    values, returning a description of each problem found: missing fields,
+    values outside the valid values and, if given, uncertain answers such
+    as "Unknown" that a stronger model may be able to resolve. Blank or
+    not-applicable answers are accepted, since processing rules leave the
+    fields that don't apply to a patient blank.
+    """
+
+    uncertain = {value.lower() for value in uncertain_values or []}
+    problems = []
+
+    for path in leaf_paths(template):
+        name = " / ".join(path)
+
+        try:
+            value = get_path(output, path)
+        except KeyError:
+            problems.append(f"{name} is missing")
+            continue
+
+        allowed = allowed_values(path, valid_values)
+        if allowed is None or is_not_applicable(value):
+            continue
+
+        allowed_lower = {str(option).strip().lower() for option in allowed}
+        for item in value if isinstance(value, list) else [value]:
+            if is_not_applicable(item):
+                continue
+
+            normalized = str(item).strip().lower()
+            if normalized in uncertain:
+                problems.append(f"{name} is uncertain: {item}")
+            elif normalized not in allowed_lower and not isinstance(value, list):
+                problems.append(f"{name} is not a valid value: {item}")
+            elif normalized not in allowed_lower:
+                problems.append(f"{name} contains an invalid value: {item}")
+
+    return problems
@@ -5,7 +5,9 @@ import sys
 
 sys.path.append("/opt/python")  # For lambda layers
 
-dynamodb = boto3.client("dynamodb")
+from audiology_metrics.instrumentation import instrument_client, metrics, tracer
+
+dynamodb = instrument_client(boto3.client("dynamodb"))
 job_table = os.getenv("JOB_TABLE", None)
 
 
@@ -152,8 +154,10 @@ def send_to_client(
     connection_id: str, domain_name: str, stage: str, data: dict
 ) -> None:
     try:
-        apigw_management_api = boto3.client(
-            "apigatewaymanagementapi", endpoint_url=f"https://{domain_name}/{stage}"
+        apigw_management_api = instrument_client(
+            boto3.client(
+                "apigatewaymanagementapi", endpoint_url=f"https://{domain_name}/{stage}"
+            )
         )
         apigw_management_api.post_to_connection(
             ConnectionId=connection_id,
@@ -164,6 +168,8 @@ def send_to_client(
         raise e
 
 
+@metrics.log_metrics(capture_cold_start_metric=True)
+@tracer.capture_lambda_handler
 def handler(event, context):
     route_key = event.get("requestContext", {}).get("routeKey")
     connection_id = event.get("requestContext", {}).get("connectionId")
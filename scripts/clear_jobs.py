@@ -1,37 +1,222 @@
-import boto3
+import argparse
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+import boto3
+
+# DynamoDB batch_write_item accepts at most 25 requests per call
+BATCH_WRITE_SIZE = 25
+BATCH_WRITE_ATTEMPTS = 8
+
+
+def key_attributes(dynamodb_client, table_name: str) -> list[str]:
+    """
+    Names of the table's key attributes, read once up front.
+    """
+
+    key_schema = dynamodb_client.describe_table(TableName=table_name)["Table"][
+        "KeySchema"
+    ]
+    return [key["AttributeName"] for key in key_schema]
+
+
+def scan_filter(
+    key_names: list[str], statuses: list[str] | None, created_before: str | None
+) -> dict:
+    """
+    Scan arguments projecting only the key attributes, filtered by status
+    and/or creation time. Jobs without a created_at are never matched by an
+    age filter.
+    """
+
+    names = {f"#k{i}": name for i, name in enumerate(key_names)}
+    values = {}
+    conditions = []
+
+    if statuses:
+        names["#status"] = "status"
+        placeholders = []
+        for i, status in enumerate(statuses):
+            values[f":status{i}"] = {"S": status}
+            placeholders.append(f":status{i}")
+        conditions.append(f"#status IN ({', '.join(placeholders)})")
+
+    if created_before:
+        names["#created_at"] = "created_at"
+        values[":created_before"] = {"S": created_before}
+        conditions.append("#created_at < :created_before")
+
+    arguments = {
+        "ProjectionExpression": ", ".join(f"#k{i}" for i in range(len(key_names))),
+        "ExpressionAttributeNames": names,
+    }
+    if conditions:
+        arguments["FilterExpression"] = " AND ".join(conditions)
+        arguments["ExpressionAttributeValues"] = values
+
+    return arguments
+
+
+def scan_keys(dynamodb_client, table_name: str, segment: int, segments: int, filters):
+    """
+    Yields pages of matching item keys from one segment of a parallel scan,
+    following LastEvaluatedKey until the segment is exhausted.
+    """
+
+    arguments = {
+        "TableName": table_name,
+        "Segment": segment,
+        "TotalSegments": segments,
+        **filters,
+    }
+
+    while True:
+        response = dynamodb_client.scan(**arguments)
+        yield response.get("Items", [])
 
+        last_key = response.get("LastEvaluatedKey", None)
+        if not last_key:
+            return
+        arguments["ExclusiveStartKey"] = last_key
+
+
+def delete_keys(dynamodb_client, table_name: str, keys: list[dict]) -> None:
+    """
+    Deletes items in batches of 25, retrying unprocessed deletes with
+    exponential backoff.
+    """
+
+    for start in range(0, len(keys), BATCH_WRITE_SIZE):
+        requests = [
+            {"DeleteRequest": {"Key": key}}
+            for key in keys[start : start + BATCH_WRITE_SIZE]
+        ]
+
+        for attempt in range(BATCH_WRITE_ATTEMPTS):
+            response = dynamodb_client.batch_write_item(
+                RequestItems={table_name: requests}
+            )
+            requests = response.get("UnprocessedItems", {}).get(table_name, [])
+            if not requests:
+                break
+            time.sleep(min(0.05 * 2**attempt, 2))
+
+        if requests:
+            raise Exception(f"Could not delete {len(requests)} items from {table_name}")
+
+
+def clear_segment(
+    dynamodb_client,
+    table_name: str,
+    segment: int,
+    segments: int,
+    filters: dict,
+    dry_run: bool,
+) -> int:
+    count = 0
+    for keys in scan_keys(dynamodb_client, table_name, segment, segments, filters):
+        if keys and not dry_run:
+            delete_keys(dynamodb_client, table_name, keys)
+        count += len(keys)
+
+    return count
+
+
+def clear_dynamodb_table(
+    table_name,
+    region_name="us-west-2",
+    statuses=None,
+    older_than_days=None,
+    segments=4,
+    dry_run=False,
+):
+    """
+    Deletes the table's items, or only those matching the status and age
+    filters, scanning the table in parallel segments. Returns the number of
+    matching items.
+    """
 
-def clear_dynamodb_table(table_name, region_name="us-west-2"):
-    # Initialize the DynamoDB client
     dynamodb_client = boto3.client("dynamodb", region_name=region_name)
 
-    # Scan the table to get all items
-    response = dynamodb_client.scan(TableName=table_name)
-    items = response.get("Items", [])
+    created_before = None
+    if older_than_days is not None:
+        created_before = (
+            datetime.now(timezone.utc) - timedelta(days=older_than_days)
+        ).isoformat()
 
-    # Delete each item
-    for item in items:
-        key = {
-            k: v
-            for k, v in item.items()
-            if k
-            in [
-                key["AttributeName"]
-                for key in dynamodb_client.describe_table(TableName=table_name)[
-                    "Table"
-                ]["KeySchema"]
-            ]
-        }
-        dynamodb_client.delete_item(TableName=table_name, Key=key)
+    filters = scan_filter(
+        key_attributes(dynamodb_client, table_name), statuses, created_before
+    )
 
-    print(f"Cleared all items from table: {table_name}")
+    with ThreadPoolExecutor(max_workers=segments) as executor:
+        counts = executor.map(
+            lambda segment: clear_segment(
+                dynamodb_client, table_name, segment, segments, filters, dry_run
+            ),
+            range(segments),
+        )
+        total = sum(counts)
 
+    if dry_run:
+        print(f"Would delete {total} items from table: {table_name}")
+    elif statuses is None and older_than_days is None:
+        print(f"Cleared all {total} items from table: {table_name}")
+    else:
+        print(f"Deleted {total} matching items from table: {table_name}")
 
-if __name__ == "__main__":
-    if len(sys.argv) != 2:
-        print("Usage: python clear_jobs.py <table_name>")
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Delete jobs from the Audiology job table. Job items also "
+        "expire on their own through the table's expires_at TTL attribute."
+    )
+    parser.add_argument("table_name", help="Name of the DynamoDB job table")
+    parser.add_argument(
+        "--status",
+        action="append",
+        dest="statuses",
+        help="Only delete jobs with this status (may be repeated)",
+    )
+    parser.add_argument(
+        "--older-than-days",
+        type=float,
+        help="Only delete jobs created more than this many days ago",
+    )
+    parser.add_argument(
+        "--segments",
+        type=int,
+        default=4,
+        help="Number of parallel scan segments (default: 4)",
+    )
+    parser.add_argument("--region", default="us-west-2", help="AWS region")
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Count matching jobs without deleting them",
+    )
+
+    args = parser.parse_args()
+
+    if args.segments < 1:
+        parser.error("--segments must be at least 1")
+
+    try:
+        clear_dynamodb_table(
+            args.table_name,
+            region_name=args.region,
+            statuses=args.statuses,
+            older_than_days=args.older_than_days,
+            segments=args.segments,
+            dry_run=args.dry_run,
+        )
+    except Exception as e:
+        print(f"Error clearing table {args.table_name}: {e}")
         sys.exit(1)
 
-    table_name = sys.argv[1]
-    clear_dynamodb_table(table_name)
+
+if __name__ == "__main__":
+    main()
@@ -1,142 +1,217 @@
+import argparse
+import io
 import json
-import boto3
 import os
+import sys
+from concurrent.futures import ThreadPoolExecutor, as_completed
 
-# From https://github.com/cal-poly-dxhub/audiology-classification/blob/main/individual%20scripts/generate_input_claude3-5.py
-
-s3 = boto3.client("s3")
-input_bucket = "dxhub-phii-project-notes"
-input_prefix = "meei-deidentidfied-data-raw/"
-output_prefix = "mee-batch-inference/input/"
-local_output_dir = "batch_inputs"
-
-os.makedirs(local_output_dir, exist_ok=True)
-
-# Load config with templates and processing guidelines
-config_file = "config.json"
-with open(config_file, "r", encoding="utf-8") as file:
-    config = json.load(file)
-
-institution = "Redcap"  # Options: "MassEyeAndEar", "CDC", "Redcap", "Dawn"
-institution_data = config["templates"].get(institution, {})
+import boto3
 
-# Validate template existence
-institution_template = institution_data.get("template", {})
-valid_values = institution_data.get("valid_values", {})
-processing_guidelines = institution_data.get("processing_rules", {}).get("rules", [])
+# From https://github.com/cal-poly-dxhub/audiology-classification/blob/main/individual%20scripts/generate_input_claude3-5.py
+#
+# Builds Bedrock batch inference inputs from multi-patient report files, using
+# the record processor's prompt so batch and online results are comparable.
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+sys.path.append(os.path.join(ROOT, "lambda", "record_processor"))
+sys.path.append(os.path.join(ROOT, "lambda", "layers", "audiology_common", "python"))
+
+from audiology_common.streams import TRANSFER_CONFIG, IterStream
+from cdk.config_utils import read_model_config
+from prompts import build_prompt, model_request, record_report
+
+# Encoded JSONL is handed to the upload in chunks of about this size
+CHUNK_BYTES = 1024 * 1024
+
+
+def list_input_files(s3, bucket: str, prefix: str):
+    """
+    Yields the keys of every JSON file under the prefix, across all pages.
+    """
+
+    paginator = s3.get_paginator("list_objects_v2")
+    for page in paginator.paginate(Bucket=bucket, Prefix=prefix):
+        for obj in page.get("Contents", []):
+            if obj["Key"].endswith(".json"):
+                yield obj["Key"]
+
+
+def batch_lines(
+    patients: list[dict],
+    file_key: str,
+    institution_data: dict,
+    inference_config: dict,
+    counts: dict,
+):
+    """
+    Yields encoded JSONL chunks of batch inference records, one per patient
+    with a report or audiometric results.
+    """
+
+    template = institution_data.get("template", {})
+    valid_values = institution_data.get("valid_values", {})
+    guidelines = institution_data.get("processing_rules", {}).get("rules", [])
+
+    buffer = io.BytesIO()
+    for idx, patient in enumerate(patients, start=1):
+        record = {
+            "record_id": f"PAT{idx:08d}",
+            "report": (patient.get("report") or patient.get("Report") or "").strip(),
+            "results": patient.get("results") or patient.get("Results") or [],
+        }
 
-if not institution_template:
-    raise ValueError(
-        f"Error: No template found for institution '{institution}' in {config_file}"
-    )
+        if not record["report"] and not record["results"]:
+            print(
+                f"Skipping patient {idx} in {file_key}: No report or audiometric results."
+            )
+            continue
 
-if not processing_guidelines:
-    print(
-        f"Warning: No processing guidelines found for '{institution}', proceeding without them."
+        prompt = build_prompt(record_report(record), template, valid_values, guidelines)
+        entry = {
+            "recordId": record["record_id"],
+            "modelInput": model_request(prompt, inference_config),
+        }
+        buffer.write(json.dumps(entry).encode("utf-8") + b"\n")
+        counts["records"] += 1
+
+        if buffer.tell() >= CHUNK_BYTES:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+
+    if buffer.tell():
+        yield buffer.getvalue()
+
+
+def process_file(
+    s3,
+    bucket: str,
+    file_key: str,
+    output_prefix: str,
+    institution: str,
+    institution_data: dict,
+    inference_config: dict,
+) -> tuple[str | None, int]:
+    """
+    Downloads one input file and streams its batch inference records to S3
+    as JSONL, returning the output key and the number of records written.
+    """
+
+    body = s3.get_object(Bucket=bucket, Key=file_key)["Body"].read()
+    patients = json.loads(body.decode("utf-8"))
+
+    output_key = output_prefix + file_key.split("/")[-1].replace(
+        ".json", f"_{institution.lower()}_batch.jsonl"
     )
 
-response = s3.list_objects_v2(Bucket=input_bucket, Prefix=input_prefix)
-input_files = [
-    obj["Key"] for obj in response.get("Contents", []) if obj["Key"].endswith(".json")
-]
+    counts = {"records": 0}
+    chunks = batch_lines(patients, file_key, institution_data, inference_config, counts)
 
-if not input_files:
-    raise ValueError("Error: No JSON files found in input bucket.")
+    # Peek so files without valid patients produce no output object
+    first_chunk = next(chunks, None)
+    if first_chunk is None:
+        return None, 0
 
-print(f"Found {len(input_files)} input files in S3 bucket '{input_bucket}'.")
+    def all_chunks():
+        yield first_chunk
+        yield from chunks
 
-# Process each JSON file
-for file_key in input_files:
-    print(f"Downloading and processing file: {file_key}")
+    s3.upload_fileobj(
+        io.BufferedReader(IterStream(all_chunks()), buffer_size=CHUNK_BYTES),
+        bucket,
+        output_key,
+        ExtraArgs={"ContentType": "application/json"},
+        Config=TRANSFER_CONFIG,
+    )
 
-    file_obj = s3.get_object(Bucket=input_bucket, Key=file_key)
-    input_json = json.loads(file_obj["Body"].read().decode("utf-8"))
+    return output_key, counts["records"]
 
-    batch_inputs = []
-    for idx, patient in enumerate(input_json, start=1):
-        report = patient.get("report") or patient.get("Report", "").strip()
-        results = patient.get("results") or patient.get("Results", [])
 
-        if not report and not results:
-            print(
-                f"Skipping patient {idx} in {file_key}: No report or audiometric results."
-            )
-            continue
+def main():
+    parser = argparse.ArgumentParser(
+        description="Generate Bedrock batch inference inputs from patient report files in S3."
+    )
+    parser.add_argument("--bucket", default="dxhub-phii-project-notes")
+    parser.add_argument("--input-prefix", default="meei-deidentidfied-data-raw/")
+    parser.add_argument("--output-prefix", default="mee-batch-inference/input/")
+    parser.add_argument(
+        "--config",
+        default=os.path.join(ROOT, "config", "config.json"),
+        help="Config with institution templates and processing guidelines",
+    )
+    parser.add_argument(
+        "--institution",
+        default="Redcap",
+        help='Options: "MassEyeAndEar", "CDC", "Redcap", "Dawn"',
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=8,
+        help="Number of files processed concurrently (default: 8)",
+    )
 
-        record_id = f"PAT{idx:08d}"
-
-        # Generate model input dynamically based on institution template
-        model_input = {
-            "anthropic_version": "bedrock-2023-05-31",
-            "max_tokens": 1024,
-            "messages": [
-                {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "text",
-                            "text": (
-                                "You are an expert **pediatric** audiologist assistant responsible for extracting explicit hearing test data and classifying hearing loss with precision."
-                                " Your classification must strictly follow given templates and clinical guidelines.\n\n"
-                                "**Hearing Report:**\n\n"
-                                f"{report}\n\n"
-                                "**Audiometric Test Results:**\n\n"
-                                f"{json.dumps(results, indent=4)}\n\n"
-                                "**Classification Template:**\n\n"
-                                f"{json.dumps(institution_template, indent=4)}\n\n"
-                                "**Valid Values:**\n"
-                                f"```json\n{json.dumps(valid_values, indent=4)}\n```\n\n"
-                                "**Classification Guidelines (MUST FOLLOW):**\n"
-                                f"```json\n{json.dumps(processing_guidelines, indent=4)}\n```\n\n"
-                                "**Processing Rules (MUST Follow):**\n"
-                                "- **Use only explicitly provided threshold values**; do not infer missing values.\n"
-                                "- **If multiple severities are listed, assign the most severe classification.**\n"
-                                "**Output Requirements:**\n"
-                                "- Fill in missing values using classification rules.\n"
-                                "- Assign the correct 'Better Ear' based on hearing loss severity.\n"
-                                "- Use only valid options listed above (strict validation).\n"
-                                "- Provide **reasoning** for each classification decision.\n"
-                                "- Cite **guidelines** used in decisions.\n"
-                                "- Return classification in **EXACT JSON format** as per the template, with no modifications.\n"
-                                "- Provide **precise reasoning** for each classification.\n"
-                                "- Make sure there is a **detailed, thorough, chain of thought reasoning for each attribute's output** and how it came to that conclusion."
-                                "- Reasoning must include reasoning for the left ear, right ear, and risk factors"
-                                "- **Cite guideline numbers** when making classification decisions.\n"
-                                "- **DO NOT include any additional explanations, assumptions, or commentary.**\n"
-                            ),
-                        }
-                    ],
-                }
-            ],
+    args = parser.parse_args()
+
+    with open(args.config, "r", encoding="utf-8") as file:
+        config = json.load(file)
+
+    institution_data = config["templates"].get(args.institution, {})
+
+    # Validate template existence
+    if not institution_data.get("template", {}):
+        raise ValueError(
+            f"Error: No template found for institution '{args.institution}' in {args.config}"
+        )
+
+    if not institution_data.get("processing_rules", {}).get("rules", []):
+        print(
+            f"Warning: No processing guidelines found for '{args.institution}', proceeding without them."
+        )
+
+    inference_config = read_model_config()["inference_config"]
+
+    s3 = boto3.client("s3")
+    file_count = 0
+    record_count = 0
+
+    with ThreadPoolExecutor(max_workers=args.workers) as executor:
+        futures = {
+            executor.submit(
+                process_file,
+                s3,
+                args.bucket,
+                file_key,
+                args.output_prefix,
+                args.institution,
+                institution_data,
+                inference_config,
+            ): file_key
+            for file_key in list_input_files(s3, args.bucket, args.input_prefix)
         }
 
-        batch_inputs.append({"recordId": record_id, "modelInput": model_input})
+        if not futures:
+            raise ValueError("Error: No JSON files found in input bucket.")
 
-    if not batch_inputs:
-        print(f"No valid patient data found in {file_key}, skipping output generation.")
-        continue
+        print(f"Processing {len(futures)} input files from S3 bucket '{args.bucket}'.")
 
-    input_filename = file_key.split("/")[-1].replace(
-        ".json", f"_{institution.lower()}_batch.jsonl"
-    )
-    local_jsonl_path = os.path.join(local_output_dir, input_filename)
+        for future in as_completed(futures):
+            file_key = futures[future]
+            output_key, records = future.result()
 
-    with open(local_jsonl_path, "w", encoding="utf-8") as jsonl_file:
-        for entry in batch_inputs:
-            jsonl_file.write(json.dumps(entry) + "\n")
+            if output_key is None:
+                print(f"No valid patient data found in {file_key}, skipping output.")
+                continue
 
-    print(
-        f"Saved JSONL file locally: {local_jsonl_path} with {len(batch_inputs)} records."
-    )
+            file_count += 1
+            record_count += records
+            print(
+                f"Uploaded {records} records from {file_key} to s3://{args.bucket}/{output_key}"
+            )
 
-    output_s3_key = f"{output_prefix}{input_filename}"
-    s3.upload_file(
-        local_jsonl_path,
-        input_bucket,
-        output_s3_key,
-        ExtraArgs={"ContentType": "application/json"},
-    )
+    print(f"All input files processed: {record_count} records in {file_count} files.")
 
-    print(f"Uploaded {local_jsonl_path} to s3://{input_bucket}/{output_s3_key}")
 
-print("All input files processed, saved locally, and uploaded successfully!")
+if __name__ == "__main__":
+    main()
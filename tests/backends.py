@@ -0,0 +1,166 @@
+"""
+Model backends standing in for Bedrock in the record processor, answering
+according to what a test exercises.
+"""
+
+import copy
+import json
+import re
+import threading
+from collections import Counter
+
+from botocore.exceptions import ReadTimeoutError
+
+FAST_MODEL = "arn:aws:bedrock:us-west-2:123456789012:inference-profile/fast"
+
+CASCADE_CONFIG = {
+    "enabled": True,
+    "escalate_values": ["Unknown"],
+    "tiers": [{"name": "fast", "model_id": FAST_MODEL}],
+}
+
+PACKING_CONFIG = {
+    "enabled": True,
+    "max_reports": 8,
+    "max_report_tokens": 1000,
+    "output_tokens_per_report": 400,
+}
+
+
+def classification(template: dict, value: str) -> dict:
+    """
+    The template filled in with value for every hearing type field.
+    """
+
+    output = copy.deepcopy(template)
+    output["Attributes"]["Hearing Type"] = {
+        field: value for field in output["Attributes"]["Hearing Type"]
+    }
+    output["Attributes"]["Reasoning"] = "Thresholds within normal limits."
+    return output
+
+
+def normal_ears(template: dict) -> dict:
+    """
+    A MassEyeAndEar-style template filled in for normal hearing in each ear,
+    leaving the fields that don't apply blank as its processing rules ask.
+    """
+
+    output = copy.deepcopy(template)
+    for ear in output["Attributes"]["Hearing Type"].values():
+        ear.update(
+            {
+                "Type of Loss": "Normal hearing (-10 - 15 dB)",
+                "Degree of Loss": "",
+                "Neuro Type": "",
+                "Reasoning": "Thresholds within normal limits.",
+            }
+        )
+    output["Attributes"]["Reasoning"] = "Normal hearing in both ears."
+    return output
+
+
+class CascadeBackend:
+    """
+    Answers with a valid classification, except that the fast model answers
+    every uncertain_every-th call with fast_value instead.
+    """
+
+    def __init__(self, template: dict, fast_value: str, uncertain_every: int):
+        self.valid = json.dumps(classification(template, "No hearing loss"))
+        self.uncertain = json.dumps(classification(template, fast_value))
+        self.uncertain_every = uncertain_every
+        self.lock = threading.Lock()
+        self.calls = Counter()
+
+    def invoke(
+        self, model_id: str, request_body: dict, timeout: float | None = None
+    ) -> dict:
+        with self.lock:
+            self.calls[model_id] += 1
+            fast_calls = self.calls[FAST_MODEL]
+
+        text = self.valid
+        if model_id == FAST_MODEL and fast_calls % self.uncertain_every == 0:
+            text = self.uncertain
+
+        return {
+            "content": [{"type": "text", "text": text}],
+            "usage": {"input_tokens": 1000, "output_tokens": 100},
+        }
+
+
+class TimeoutBackend:
+    """
+    Answers with a valid classification, except that the call numbered
+    timeout_call times out as a Bedrock call does once its read timeout
+    passes.
+    """
+
+    def __init__(self, template: dict, timeout_call: int):
+        self.valid = json.dumps(classification(template, "No hearing loss"))
+        self.timeout_call = timeout_call
+        self.lock = threading.Lock()
+        self.calls = 0
+
+    def invoke(
+        self, model_id: str, request_body: dict, timeout: float | None = None
+    ) -> dict:
+        with self.lock:
+            self.calls += 1
+            timed_out = self.calls == self.timeout_call
+
+        if timed_out:
+            raise ReadTimeoutError(endpoint_url="fake://bedrock-runtime")
+
+        return {
+            "content": [{"type": "text", "text": self.valid}],
+            "usage": {"input_tokens": 1000, "output_tokens": 100},
+        }
+
+
+class PackingBackend:
+    """
+    Answers packed prompts with a valid classification (or valid, if given)
+    for every report ID in the prompt, leaving out any in skip and answering
+    any in invalid with a value outside the valid values, and single-report
+    prompts with a valid classification alone.
+    """
+
+    def __init__(
+        self,
+        template: dict,
+        skip: tuple[str, ...] = (),
+        invalid: tuple[str, ...] = (),
+        valid: dict | None = None,
+    ):
+        self.valid = valid or classification(template, "No hearing loss")
+        self.invalid_output = classification(template, "Mostly fine")
+        self.skip = skip
+        self.invalid = invalid
+        self.lock = threading.Lock()
+        self.calls = 0
+
+    def invoke(
+        self, model_id: str, request_body: dict, timeout: float | None = None
+    ) -> dict:
+        with self.lock:
+            self.calls += 1
+
+        prompt = request_body["messages"][0]["content"][0]["text"]
+        record_ids = re.findall(r"^### Report (\S+)$", prompt, re.MULTILINE)
+        if record_ids:
+            output = {
+                record_id: (
+                    self.invalid_output if record_id in self.invalid else self.valid
+                )
+                for record_id in record_ids
+                if record_id not in self.skip
+            }
+        else:
+            output = self.valid
+
+        return {
+            "content": [{"type": "text", "text": json.dumps(output)}],
+            "usage": {"input_tokens": len(prompt) // 4, "output_tokens": 100},
+        }
@@ -0,0 +1,47 @@
+import json
+import os
+
+import pytest
+
+from tests.benchmark.harness import BenchmarkReport, compare_reports
+
+_report = None
+
+
+@pytest.fixture(scope="session")
+def benchmark_report(settings) -> BenchmarkReport:
+    global _report
+    _report = BenchmarkReport(settings)
+    return _report
+
+
+def pytest_sessionfinish(session, exitstatus):
+    """
+    Writes the report and, when a baseline report is given, fails the run on
+    regressions beyond BENCHMARK_TOLERANCE.
+    """
+
+    if _report is None or not _report.results:
+        return
+
+    path = os.environ.get("BENCHMARK_REPORT", "benchmark-report.json")
+    _report.write(path)
+    print(f"\nBenchmark report written to {path}")
+
+    baseline_path = os.environ.get("BENCHMARK_BASELINE", None)
+    if not baseline_path:
+        return
+
+    with open(baseline_path, "r", encoding="utf-8") as file:
+        baseline = json.load(file)
+
+    regressions = compare_reports(
+        baseline,
+        _report.to_dict(),
+        float(os.environ.get("BENCHMARK_TOLERANCE", "0.25")),
+    )
+    for regression in regressions:
+        print(f"Regression: {regression}")
+
+    if regressions:
+        session.exitstatus = 1
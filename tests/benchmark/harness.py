@@ -0,0 +1,178 @@
+import argparse
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from typing import Any, Callable, Iterable
+
+from tests.support import ROOT
+
+# Metrics where a larger value in the current report is a regression
+LOWER_IS_BETTER = ("p50_ms", "p95_ms", "peak_kb_per_job")
+HIGHER_IS_BETTER = ("throughput_per_s",)
+
+
+def percentile(values: list[float], fraction: float) -> float:
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(fraction * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def measure(
+    call: Callable[[Any], Any], inputs: Iterable[Any], concurrency: int = 1
+) -> dict:
+    """
+    Runs call once per input with the given concurrency, returning latency
+    percentiles and throughput.
+    """
+
+    latencies = []
+
+    def timed(item):
+        start = time.perf_counter()
+        call(item)
+        latencies.append((time.perf_counter() - start) * 1000)
+
+    inputs = list(inputs)
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(timed, inputs))
+    wall = time.perf_counter() - start
+
+    return {
+        "count": len(inputs),
+        "concurrency": concurrency,
+        "p50_ms": round(percentile(latencies, 0.5), 3),
+        "p95_ms": round(percentile(latencies, 0.95), 3),
+        "mean_ms": round(statistics.fmean(latencies), 3),
+        "throughput_per_s": round(len(inputs) / wall, 3),
+    }
+
+
+def measure_memory(call: Callable[[Any], Any], inputs: Iterable[Any]) -> dict:
+    """
+    Runs call sequentially once per input, returning the peak Python heap
+    allocated while handling a single input.
+    """
+
+    peaks = []
+    for item in inputs:
+        tracemalloc.start()
+        try:
+            call(item)
+            peaks.append(tracemalloc.get_traced_memory()[1])
+        finally:
+            tracemalloc.stop()
+
+    return {
+        "peak_kb_per_job": round(max(peaks) / 1024, 1),
+        "mean_peak_kb_per_job": round(statistics.fmean(peaks) / 1024, 1),
+    }
+
+
+def git_revision() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class BenchmarkReport:
+    """
+    Collects benchmark results by name and writes them as JSON, alongside the
+    settings they were measured under, so runs can be compared.
+    """
+
+    def __init__(self, settings: dict):
+        self.results = {}
+        self.metadata = {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "settings": settings,
+        }
+
+    def add(self, name: str, result: dict) -> None:
+        self.results[name] = {**self.results.get(name, {}), **result}
+
+    def to_dict(self) -> dict:
+        return {"metadata": self.metadata, "results": self.results}
+
+    def write(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as file:
+            json.dump(self.to_dict(), file, indent=2, sort_keys=True)
+
+
+def compare_reports(baseline: dict, current: dict, tolerance: float) -> list[str]:
+    """
+    Lists the metrics of the current report that are worse than the baseline
+    by more than the tolerance, e.g. 0.25 for 25%.
+    """
+
+    regressions = []
+    for name, result in current["results"].items():
+        previous = baseline["results"].get(name, None)
+        if previous is None:
+            continue
+
+        for metric in LOWER_IS_BETTER:
+            if metric in result and previous.get(metric):
+                if result[metric] > previous[metric] * (1 + tolerance):
+                    regressions.append(
+                        f"{name} {metric}: {previous[metric]} -> {result[metric]}"
+                    )
+
+        for metric in HIGHER_IS_BETTER:
+            if metric in result and previous.get(metric):
+                if result[metric] < previous[metric] / (1 + tolerance):
+                    regressions.append(
+                        f"{name} {metric}: {previous[metric]} -> {result[metric]}"
+                    )
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Compare two benchmark reports and list regressions."
+    )
+    parser.add_argument("baseline", help="Report from the earlier run")
+    parser.add_argument("current", help="Report from the later run")
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.25,
+        help="Allowed slowdown before a metric counts as a regression (default: 0.25)",
+    )
+
+    args = parser.parse_args()
+
+    with open(args.baseline, "r", encoding="utf-8") as file:
+        baseline = json.load(file)
+    with open(args.current, "r", encoding="utf-8") as file:
+        current = json.load(file)
+
+    regressions = compare_reports(baseline, current, args.tolerance)
+    for regression in regressions:
+        print(f"Regression: {regression}")
+
+    if regressions:
+        sys.exit(1)
+
+    print("No regressions found.")
+
+
+if __name__ == "__main__":
+    main()
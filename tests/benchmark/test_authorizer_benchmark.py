@@ -0,0 +1,99 @@
+import json
+import time
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+from tests.benchmark.harness import measure
+from tests.support import API_KEY, FakeContext
+
+METHOD_ARN = "arn:aws:execute-api:us-west-2:123456789012:abcdef/prod/POST/upload"
+KEY_ID = "benchmark-key"
+
+
+@pytest.fixture(scope="module")
+def access_token(handlers):
+    """
+    A Cognito-style access token, with the authorizers' key caches seeded in
+    place of fetching the user pool's JWKS.
+    """
+
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    for authorizer in (handlers.api_authorizer, handlers.websocket_authorizer):
+        authorizer._cognito_keys_cache = {KEY_ID: private_key.public_key()}
+
+    now = int(time.time())
+    return jwt.encode(
+        {
+            "sub": "benchmark-user",
+            "client_id": "benchmark-client",
+            "token_use": "access",
+            "iss": "https://cognito-idp.us-west-2.amazonaws.com/us-west-2_benchmark",
+            "iat": now,
+            "exp": now + 3600,
+        },
+        private_key,
+        algorithm="RS256",
+        headers={"kid": KEY_ID},
+    )
+
+
+def api_request(headers: dict) -> dict:
+    return {"type": "REQUEST", "methodArn": METHOD_ARN, "headers": headers}
+
+
+def websocket_request(query: dict) -> dict:
+    return {
+        "type": "REQUEST",
+        "methodArn": METHOD_ARN,
+        "headers": {},
+        "queryStringParameters": query,
+    }
+
+
+def effect(response: dict) -> str:
+    return response["policyDocument"]["Statement"][0]["Effect"]
+
+
+@pytest.mark.parametrize("method", ["api_key", "jwt"])
+def test_api_authorizer(method, handlers, access_token, settings, benchmark_report):
+    headers = (
+        {"X-API-Key": API_KEY}
+        if method == "api_key"
+        else {"Authorization": f"Bearer {access_token}"}
+    )
+
+    def authorize(_):
+        response = handlers.api_authorizer.handler(
+            api_request(headers), FakeContext("api_authorizer")
+        )
+        assert effect(response) == "Allow", response
+
+    for concurrency in settings["concurrency"]:
+        benchmark_report.add(
+            f"api_authorizer.{method}@c{concurrency}",
+            measure(authorize, range(settings["jobs"] * 4), concurrency=concurrency),
+        )
+
+
+@pytest.mark.parametrize("method", ["api_key", "jwt"])
+def test_websocket_authorizer(
+    method, handlers, access_token, settings, benchmark_report
+):
+    query = (
+        {"ApiKey": API_KEY}
+        if method == "api_key"
+        else {"token": f"Bearer {access_token}"}
+    )
+
+    def authorize(_):
+        response = handlers.websocket_authorizer.handler(
+            websocket_request(query), FakeContext("websocket_authorizer")
+        )
+        assert effect(response) == "Allow", json.dumps(response)
+
+    benchmark_report.add(
+        f"websocket_authorizer.{method}",
+        measure(authorize, range(settings["jobs"] * 4)),
+    )
@@ -0,0 +1,55 @@
+import os
+
+import pytest
+
+from tests.backends import CASCADE_CONFIG, FAST_MODEL, CascadeBackend
+from tests.benchmark.harness import measure
+from tests.support import INSTITUTION, REPORT_TEXT
+
+
+@pytest.mark.parametrize(
+    "name, cascade", [("disabled", None), ("enabled", CASCADE_CONFIG)]
+)
+def test_cascade(
+    name, cascade, install_backend, handlers, config, settings, benchmark_report
+):
+    """Calls per tier and the fast tier's hit rate with and without the cascade."""
+
+    backend = install_backend(
+        CascadeBackend(
+            config["templates"][INSTITUTION]["template"],
+            fast_value="Unknown",
+            uncertain_every=4,
+        ),
+        CASCADE_CONFIG=cascade,
+    )
+    primary_model = os.environ["INFERENCE_PROFILE_ARN"]
+    results = []
+
+    def classify(_):
+        results.append(
+            handlers.record_processor.process_audiology_data(
+                REPORT_TEXT, INSTITUTION, config
+            )
+        )
+
+    result = measure(classify, range(settings["jobs"]))
+    escalated = settings["jobs"] // 4 if cascade else settings["jobs"]
+
+    benchmark_report.add(
+        f"cascade.{name}",
+        {
+            **result,
+            "fast_calls_per_report": round(
+                backend.calls[FAST_MODEL] / settings["jobs"], 3
+            ),
+            "primary_calls_per_report": round(
+                backend.calls[primary_model] / settings["jobs"], 3
+            ),
+            "fast_hit_rate": round(1 - escalated / settings["jobs"], 3),
+        },
+    )
+
+    assert all("output" in r for r in results)
+    assert backend.calls[FAST_MODEL] == (settings["jobs"] if cascade else 0)
+    assert backend.calls[primary_model] == escalated
@@ -0,0 +1,122 @@
+import gzip
+import importlib
+import json
+import os
+
+import pytest
+
+from tests.backends import TimeoutBackend
+from tests.support import INSTITUTION, batch_body
+
+
+@pytest.fixture
+def slow_backend(fake_backend):
+    """
+    A FakeBackend answering with the institution's template after 100ms.
+    """
+
+    return fake_backend(latency="fixed:100")
+
+
+def test_resume_from_checkpoint(slow_backend, handlers, config, aws, benchmark_report):
+    """A job that runs out of time resumes from its checkpointed records on retry,
+    without classifying any record twice."""
+
+    record_processor = handlers.record_processor
+    deadline_module = importlib.import_module("deadline")
+    records = record_processor.parse_records(batch_body(25))
+    job_id = "checkpoint-resume"
+
+    # Time for a handful of records before JobIncomplete
+    deadline = deadline_module.Deadline(
+        remaining_ms=(deadline_module.MIN_MODEL_CALL_SECONDS + 0.5) * 1000,
+        reserve_ms=0,
+    )
+    with pytest.raises(record_processor.JobIncomplete):
+        record_processor.process_records(
+            job_id,
+            records,
+            INSTITUTION,
+            config,
+            usage=record_processor.TokenUsage(),
+            deadline=deadline,
+            resumable=True,
+        )
+    first_attempt_calls = slow_backend.calls
+    assert 0 < first_attempt_calls < len(records)
+
+    usage = record_processor.TokenUsage()
+    summary = record_processor.process_records(
+        job_id, records, INSTITUTION, config, usage=usage
+    )
+
+    benchmark_report.add(
+        "checkpoint.resume",
+        {
+            "records": len(records),
+            "first_attempt_records": first_attempt_calls,
+            "model_calls": slow_backend.calls,
+        },
+    )
+
+    assert summary["error_count"] == 0
+    assert slow_backend.calls == len(records)
+    # Usage carries over from the first attempt's checkpoints
+    assert usage.model_calls == len(records)
+
+    output = aws.s3.get_object(
+        Bucket=os.environ["OUTPUT_BUCKET_NAME"], Key=summary["records_key"]
+    )
+    lines = gzip.decompress(output["Body"].read()).decode("utf-8").splitlines()
+    assert [json.loads(line)["record_id"] for line in lines] == [
+        record["record_id"] for record in records
+    ]
+
+    remaining = aws.s3.list_objects_v2(
+        Bucket=os.environ["OUTPUT_BUCKET_NAME"], Prefix=f"checkpoints/{job_id}/"
+    )
+    assert remaining.get("KeyCount", 0) == 0
+
+
+def test_resume_after_timeout(install_backend, handlers, config, aws, benchmark_report):
+    """A model call timing out mid-job stops the job for a retry rather than
+    recording the error, and the retry classifies the rest of its records."""
+
+    record_processor = handlers.record_processor
+    records = record_processor.parse_records(batch_body(25))
+    job_id = "checkpoint-timeout"
+    backend = install_backend(
+        TimeoutBackend(config["templates"][INSTITUTION]["template"], timeout_call=13)
+    )
+
+    with pytest.raises(record_processor.JobIncomplete):
+        record_processor.process_records(
+            job_id, records, INSTITUTION, config, resumable=True
+        )
+    assert backend.calls == 13
+
+    summary = record_processor.process_records(
+        job_id, records, INSTITUTION, config, resumable=True
+    )
+
+    benchmark_report.add(
+        "checkpoint.timeout_resume",
+        {
+            "records": len(records),
+            "first_attempt_records": backend.timeout_call - 1,
+            "model_calls": backend.calls,
+        },
+    )
+
+    assert summary["error_count"] == 0
+    # Only the record whose call timed out was classified again
+    assert backend.calls == len(records) + 1
+
+    output = aws.s3.get_object(
+        Bucket=os.environ["OUTPUT_BUCKET_NAME"], Key=summary["records_key"]
+    )
+    lines = gzip.decompress(output["Body"].read()).decode("utf-8").splitlines()
+    for line in lines:
+        hearing_type = json.loads(line)["output"]["Attributes"]["Hearing Type"]
+        assert set(hearing_type.values()) == {"No hearing loss"}
+    assert len(lines) == len(records)
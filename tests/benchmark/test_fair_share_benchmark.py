@@ -0,0 +1,79 @@
+import importlib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from tests.benchmark.harness import percentile
+from tests.support import SerializedClient
+
+
+def scheduler(aws, table_name: str, **kwargs):
+    fair_share = importlib.import_module("fair_share")
+    return fair_share.FairShareScheduler(
+        SerializedClient(aws.dynamodb), table_name, poll_seconds=0.01, **kwargs
+    )
+
+
+class Calls:
+    """
+    Model calls made under a scheduler's slots, tracking how many each
+    institution has in flight and how long each waited for its slot.
+    """
+
+    def __init__(self, scheduler, call_ms: float):
+        self.scheduler = scheduler
+        self.call_ms = call_ms
+        self.lock = threading.Lock()
+        self.in_flight = {}
+        self.peak = {}
+        self.peak_total = 0
+        self.waits = {}
+
+    def call(self, institution: str) -> None:
+        start = time.perf_counter()
+        with self.scheduler.slot(institution):
+            waited = (time.perf_counter() - start) * 1000
+            with self.lock:
+                self.waits.setdefault(institution, []).append(waited)
+                self.in_flight[institution] = self.in_flight.get(institution, 0) + 1
+                self.peak[institution] = max(
+                    self.peak.get(institution, 0), self.in_flight[institution]
+                )
+                self.peak_total = max(self.peak_total, sum(self.in_flight.values()))
+
+            time.sleep(self.call_ms / 1000)
+
+            with self.lock:
+                self.in_flight[institution] -= 1
+
+
+def test_fair_share(scheduler_table, aws, benchmark_report):
+    """An institution with a small job isn't queued behind another's large
+    one, and no more calls run at once than the scheduler's capacity."""
+
+    calls = Calls(scheduler(aws, scheduler_table, capacity=4), call_ms=50)
+
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        large = [executor.submit(calls.call, "large") for _ in range(40)]
+        time.sleep(0.1)
+        small = [executor.submit(calls.call, "small") for _ in range(4)]
+        for future in large + small:
+            future.result()
+
+    benchmark_report.add(
+        "fair_share",
+        {
+            "small_p95_wait_ms": round(percentile(calls.waits["small"], 95), 3),
+            "large_p95_wait_ms": round(percentile(calls.waits["large"], 95), 3),
+            "peak_in_flight": calls.peak_total,
+        },
+    )
+
+    assert calls.peak_total <= 4
+    assert max(calls.waits["small"]) < max(calls.waits["large"])
+
+    item = aws.dynamodb.get_item(
+        TableName=scheduler_table, Key={"pool_id": {"S": "model-calls"}}
+    )["Item"]
+    assert item["in_flight"]["N"] == "0"
+    assert item["leases"]["M"] == {}
@@ -0,0 +1,102 @@
+import json
+
+import pytest
+
+from tests.benchmark.harness import measure
+from tests.support import INSTITUTION, REPORT_TEXT
+
+
+@pytest.mark.parametrize(
+    "name, options",
+    [
+        ("clean", {}),
+        ("malformed_20pct", {"malformed_rate": 0.2}),
+        ("throttled_10pct", {"throttle_rate": 0.1}),
+        ("lognormal_latency", {"latency": "lognormal:20:0.5"}),
+    ],
+)
+def test_failure_rates(
+    name, options, fake_backend, handlers, config, settings, benchmark_report
+):
+    """Latency, model calls and errors per report under injected failures."""
+
+    backend = fake_backend(**options)
+    results = []
+
+    def classify(_):
+        results.append(
+            handlers.record_processor.process_audiology_data(
+                REPORT_TEXT, INSTITUTION, config
+            )
+        )
+
+    result = measure(classify, range(settings["jobs"]), concurrency=4)
+    errors = sum("error" in r for r in results)
+
+    benchmark_report.add(
+        f"model_backend.{name}",
+        {
+            **result,
+            "model_calls_per_report": round(backend.calls / len(results), 3),
+            "error_rate": round(errors / len(results), 3),
+        },
+    )
+
+    if not options.get("throttle_rate"):
+        assert errors == 0
+    if options.get("malformed_rate"):
+        assert backend.malformed > 0 and backend.calls > len(results)
+
+
+@pytest.mark.parametrize("name, max_hedge_rate", [("unhedged", 0), ("hedged", 0.1)])
+def test_hedging(
+    name,
+    max_hedge_rate,
+    model_backends,
+    handlers,
+    config,
+    settings,
+    monkeypatch,
+    benchmark_report,
+):
+    """Tail latency of long-tailed model calls with and without hedging."""
+
+    options = {
+        "default_text": json.dumps(config["templates"][INSTITUTION]["template"]),
+        "latency": "lognormal:20:1.0",
+    }
+    primary = model_backends.FakeBackend(**options, seed=1)
+    alternate = model_backends.FakeBackend(**options, seed=2)
+    backend = model_backends.HedgedBackend(
+        primary,
+        [(alternate, "us-east-1")],
+        initial_delay_ms=50,
+        min_delay_ms=10,
+        max_hedge_rate=max_hedge_rate,
+        window=100,
+        min_samples=10,
+    )
+    monkeypatch.setattr(handlers.record_processor, "model_backend", backend)
+    results = []
+
+    def classify(_):
+        results.append(
+            handlers.record_processor.process_audiology_data(
+                REPORT_TEXT, INSTITUTION, config
+            )
+        )
+
+    result = measure(classify, range(settings["jobs"] * 2), concurrency=4)
+
+    benchmark_report.add(
+        f"model_backend.hedging.{name}",
+        {
+            **result,
+            "hedge_rate": round(backend.hedges / backend.calls, 3),
+            "hedge_win_rate": round(backend.hedge_wins / max(1, backend.hedges), 3),
+        },
+    )
+
+    assert all("output" in r for r in results)
+    assert backend.hedges <= max_hedge_rate * 100
+    assert alternate.calls == backend.hedges
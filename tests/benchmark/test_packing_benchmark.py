@@ -0,0 +1,47 @@
+import uuid
+
+import pytest
+
+from tests.backends import PACKING_CONFIG, PackingBackend
+from tests.benchmark.harness import measure
+from tests.support import INSTITUTION, batch_body
+
+
+@pytest.mark.parametrize(
+    "name, packing", [("unpacked", None), ("packed", PACKING_CONFIG)]
+)
+def test_packing(
+    name, packing, install_backend, handlers, config, settings, benchmark_report
+):
+    """Model calls and input tokens per report with and without packing."""
+
+    backend = install_backend(
+        PackingBackend(config["templates"][INSTITUTION]["template"]),
+        PACKING_CONFIG=packing,
+    )
+    records = handlers.record_processor.parse_records(batch_body(settings["patients"]))
+    usage = handlers.record_processor.TokenUsage()
+
+    def process(_):
+        summary = handlers.record_processor.process_records(
+            str(uuid.uuid4()), records, INSTITUTION, config, usage=usage
+        )
+        assert summary["error_count"] == 0, summary
+
+    result = measure(process, range(3))
+    report_count = 3 * len(records)
+
+    benchmark_report.add(
+        f"packing.{name}",
+        {
+            **result,
+            "patients": settings["patients"],
+            "model_calls_per_report": round(backend.calls / report_count, 3),
+            "input_tokens_per_report": round(usage.input_tokens / report_count, 1),
+        },
+    )
+
+    if packing:
+        assert backend.calls < report_count
+    else:
+        assert backend.calls == report_count
@@ -0,0 +1,74 @@
+import os
+
+import pytest
+
+from tests.benchmark.harness import measure, measure_memory, percentile
+from tests.support import REPORT_TEXT, batch_body
+
+
+def stage_summary(pipeline) -> dict:
+    return {
+        f"{stage}_p50_ms": round(percentile(values, 0.5), 3)
+        for stage, values in pipeline.stage_ms.items()
+    }
+
+
+def test_single_report_stages(pipeline, settings, benchmark_report):
+    """Per-stage latency of single-report jobs, one job at a time."""
+
+    for _ in range(settings["jobs"]):
+        pipeline.run(REPORT_TEXT)
+
+    for stage, values in pipeline.stage_ms.items():
+        benchmark_report.add(
+            f"single.{stage}",
+            {
+                "count": len(values),
+                "p50_ms": round(percentile(values, 0.5), 3),
+                "p95_ms": round(percentile(values, 0.95), 3),
+            },
+        )
+
+
+@pytest.mark.parametrize("level", [0, 1, 2])
+def test_single_report_throughput(level, pipeline, settings, benchmark_report):
+    """End-to-end throughput of single-report jobs at each concurrency level."""
+
+    if level >= len(settings["concurrency"]):
+        pytest.skip("Concurrency level not configured")
+    concurrency = settings["concurrency"][level]
+
+    result = measure(
+        lambda _: pipeline.run(REPORT_TEXT),
+        range(settings["jobs"]),
+        concurrency=concurrency,
+    )
+    benchmark_report.add(
+        f"single.end_to_end@c{concurrency}", {**result, **stage_summary(pipeline)}
+    )
+
+
+def test_multi_patient_job(pipeline, handlers, aws, settings, benchmark_report):
+    """Latency and peak memory of multi-patient jobs, including the archive
+    and CSV export of every record."""
+
+    body = batch_body(settings["patients"])
+    job_ids = []
+
+    memory = measure_memory(lambda _: job_ids.append(pipeline.run(body)), range(3))
+
+    for stage, values in pipeline.stage_ms.items():
+        benchmark_report.add(
+            f"batch.{stage}",
+            {
+                "patients": settings["patients"],
+                "p50_ms": round(percentile(values, 0.5), 3),
+            },
+        )
+    benchmark_report.add("batch.end_to_end", memory)
+
+    csv = aws.s3.get_object(
+        Bucket=os.environ["OUTPUT_BUCKET_NAME"],
+        Key=f"completed_jobs/{job_ids[-1]}.csv",
+    )["Body"].read()
+    assert len(csv.decode("utf-8").splitlines()) == settings["patients"] + 1
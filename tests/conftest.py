@@ -0,0 +1,226 @@
+import importlib
+import json
+import os
+from types import SimpleNamespace
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from tests.stub_bedrock import StubBedrockServer
+from tests.support import (
+    API_KEY,
+    CONFIG_ID,
+    INSTITUTION,
+    ROOT,
+    Pipeline,
+    load_lambda,
+)
+
+# Offline stand-ins for the deployed resources; handlers read these at import
+os.environ.update(
+    {
+        "AWS_DEFAULT_REGION": "us-west-2",
+        "AWS_ACCESS_KEY_ID": "benchmark",
+        "AWS_SECRET_ACCESS_KEY": "benchmark",
+        "BUCKET_NAME": "benchmark-input",
+        "OUTPUT_BUCKET_NAME": "benchmark-output",
+        "JOB_TABLE": "benchmark-jobs",
+        "TABLE_NAME": "benchmark-jobs",
+        "CONFIG_TABLE": "benchmark-configs",
+        "CONFIG_TABLE_NAME": "benchmark-configs",
+        "RECORD_PROCESSOR_FUNCTION": "benchmark-record-processor",
+        "INFERENCE_PROFILE_ARN": "arn:aws:bedrock:us-west-2:123456789012:inference-profile/benchmark",
+        "INFERENCE_CONFIG": json.dumps(
+            {"anthropic_version": "bedrock-2023-05-31", "max_tokens": 4096}
+        ),
+        "USER_POOL_ID": "us-west-2_benchmark",
+        "USER_POOL_CLIENT_ID": "benchmark-client",
+        "API_KEYS_SECRET_NAME": "benchmark-api-keys",
+        "POWERTOOLS_TRACE_DISABLED": "true",
+        "POWERTOOLS_LOG_LEVEL": "WARNING",
+    }
+)
+
+
+def env_list(name: str, default: str) -> list[int]:
+    return [int(value) for value in os.environ.get(name, default).split(",")]
+
+
+@pytest.fixture(scope="session")
+def settings() -> dict:
+    """
+    Benchmark sizes and stub model behaviour, overridable through the
+    environment so runs on different machines can be made comparable.
+    """
+
+    return {
+        "jobs": int(os.environ.get("BENCHMARK_JOBS", "32")),
+        "concurrency": env_list("BENCHMARK_CONCURRENCY", "1,4,16"),
+        "patients": int(os.environ.get("BENCHMARK_PATIENTS", "50")),
+        "model_latency_ms": float(os.environ.get("BENCHMARK_MODEL_LATENCY_MS", "20")),
+        "model_jitter_ms": float(os.environ.get("BENCHMARK_MODEL_JITTER_MS", "10")),
+        "throttle_rate": float(os.environ.get("BENCHMARK_THROTTLE_RATE", "0")),
+    }
+
+
+@pytest.fixture(scope="session")
+def config() -> dict:
+    with open(os.path.join(ROOT, "config", "config.json"), "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+@pytest.fixture(scope="session")
+def bedrock_stub(settings, config):
+    stub = StubBedrockServer(
+        response_text=json.dumps(config["templates"][INSTITUTION]["template"]),
+        latency_ms=settings["model_latency_ms"],
+        jitter_ms=settings["model_jitter_ms"],
+        throttle_rate=settings["throttle_rate"],
+    ).start()
+    os.environ["AWS_ENDPOINT_URL_BEDROCK_RUNTIME"] = stub.endpoint
+
+    yield stub
+
+    stub.stop()
+
+
+@pytest.fixture(scope="session")
+def aws(config):
+    """
+    Moto-backed tables, buckets, state machine and API key secret.
+    """
+
+    with mock_aws():
+        dynamodb = boto3.client("dynamodb")
+        dynamodb.create_table(
+            TableName=os.environ["JOB_TABLE"],
+            KeySchema=[{"AttributeName": "job_id", "KeyType": "HASH"}],
+            AttributeDefinitions=[
+                {"AttributeName": name, "AttributeType": "S"}
+                for name in ("job_id", "status", "created_at")
+            ],
+            BillingMode="PAY_PER_REQUEST",
+            GlobalSecondaryIndexes=[
+                {
+                    "IndexName": "status-created_at-index",
+                    "KeySchema": [
+                        {"AttributeName": "status", "KeyType": "HASH"},
+                        {"AttributeName": "created_at", "KeyType": "RANGE"},
+                    ],
+                    "Projection": {
+                        "ProjectionType": "INCLUDE",
+                        "NonKeyAttributes": ["job_name", "completed_at"],
+                    },
+                }
+            ],
+        )
+        dynamodb.create_table(
+            TableName=os.environ["CONFIG_TABLE"],
+            KeySchema=[{"AttributeName": "config_id", "KeyType": "HASH"}],
+            AttributeDefinitions=[{"AttributeName": "config_id", "AttributeType": "S"}],
+            BillingMode="PAY_PER_REQUEST",
+        )
+        dynamodb.put_item(
+            TableName=os.environ["CONFIG_TABLE"],
+            Item={
+                "config_id": {"S": CONFIG_ID},
+                "config_data": {"S": json.dumps(config)},
+            },
+        )
+
+        s3 = boto3.client("s3")
+        for bucket in (os.environ["BUCKET_NAME"], os.environ["OUTPUT_BUCKET_NAME"]):
+            s3.create_bucket(
+                Bucket=bucket,
+                CreateBucketConfiguration={"LocationConstraint": "us-west-2"},
+            )
+
+        state_machine = boto3.client("stepfunctions").create_state_machine(
+            name="benchmark-record-processing",
+            definition=json.dumps(
+                {"StartAt": "Done", "States": {"Done": {"Type": "Pass", "End": True}}}
+            ),
+            roleArn="arn:aws:iam::123456789012:role/benchmark",
+        )
+        os.environ["STEP_FUNCTION_ARN"] = state_machine["stateMachineArn"]
+
+        boto3.client("secretsmanager").create_secret(
+            Name=os.environ["API_KEYS_SECRET_NAME"],
+            SecretString=json.dumps({"api_keys": [API_KEY]}),
+        )
+
+        yield SimpleNamespace(dynamodb=dynamodb, s3=s3)
+
+
+@pytest.fixture(scope="session")
+def handlers(aws, bedrock_stub):
+    return SimpleNamespace(
+        api=load_lambda("api"),
+        bucket_response=load_lambda("bucket_response"),
+        record_processor=load_lambda("record_processor"),
+        completion_recorder=load_lambda("completion_recorder"),
+        api_authorizer=load_lambda("api_authorizer"),
+        websocket_authorizer=load_lambda("websocket_authorizer"),
+    )
+
+
+@pytest.fixture
+def pipeline(handlers, aws):
+    return Pipeline(handlers, aws)
+
+
+@pytest.fixture
+def model_backends(handlers):
+    # Importable once the record processor is loaded, as in its asset
+    return importlib.import_module("model_backends")
+
+
+@pytest.fixture
+def install_backend(handlers, monkeypatch):
+    """
+    Swaps the record processor's model backend, setting the JSON config
+    environment variables given as keywords, e.g. PACKING_CONFIG.
+    """
+
+    def install(backend, **configs):
+        for name, value in configs.items():
+            monkeypatch.setenv(name, json.dumps(value or {}))
+        monkeypatch.setattr(handlers.record_processor, "model_backend", backend)
+        return backend
+
+    return install
+
+
+@pytest.fixture
+def fake_backend(model_backends, install_backend, config):
+    """
+    Installs a FakeBackend built with the given options, answering with the
+    institution's template by default.
+    """
+
+    def install(**options):
+        options.setdefault(
+            "default_text", json.dumps(config["templates"][INSTITUTION]["template"])
+        )
+        return install_backend(model_backends.FakeBackend(**options))
+
+    return install
+
+
+@pytest.fixture
+def scheduler_table(aws, handlers, monkeypatch):
+    """
+    An empty fair-share scheduler table, recreated for each test.
+    """
+
+    table_name = "benchmark-scheduler"
+    aws.dynamodb.create_table(
+        TableName=table_name,
+        KeySchema=[{"AttributeName": "pool_id", "KeyType": "HASH"}],
+        AttributeDefinitions=[{"AttributeName": "pool_id", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+    monkeypatch.setenv("SCHEDULER_TABLE", table_name)
+    yield table_name
+    aws.dynamodb.delete_table(TableName=table_name)
@@ -0,0 +1,115 @@
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class StubBedrockServer:
+    """
+    Local stand-in for the Bedrock runtime InvokeModel endpoint. Answers every
+    request with a canned Anthropic-format response after an injected
+    latency, and can throttle a fraction of requests or the first
+    throttle_first requests.
+
+    Point the record processor at it by setting AWS_ENDPOINT_URL_BEDROCK_RUNTIME
+    to the server's endpoint before its module is imported.
+    """
+
+    def __init__(
+        self,
+        response_text: str = "{}",
+        latency_ms: float = 0,
+        jitter_ms: float = 0,
+        throttle_rate: float = 0,
+        throttle_first: int = 0,
+        seed: int = 0,
+    ):
+        self.response_text = response_text
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.throttle_rate = throttle_rate
+        self.throttle_first = throttle_first
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.request_count = 0
+        self.throttle_count = 0
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), self._handler_class())
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+
+    @property
+    def endpoint(self) -> str:
+        return f"http://127.0.0.1:{self.server.server_port}"
+
+    def start(self) -> "StubBedrockServer":
+        self.thread.start()
+        return self
+
+    def stop(self) -> None:
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _next_response(self) -> tuple[float, bool]:
+        with self.lock:
+            self.request_count += 1
+            delay = max(0, self.latency_ms + self.random.uniform(0, self.jitter_ms))
+            throttled = (
+                self.request_count <= self.throttle_first
+                or self.random.random() < self.throttle_rate
+            )
+            if throttled:
+                self.throttle_count += 1
+
+        return delay / 1000, throttled
+
+    def _handler_class(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length", 0))
+                request = json.loads(self.rfile.read(length) or b"{}")
+
+                delay, throttled = stub._next_response()
+                time.sleep(delay)
+
+                if throttled:
+                    self._send(
+                        429,
+                        {"message": "Too many requests, please wait."},
+                        {"x-amzn-ErrorType": "ThrottlingException"},
+                    )
+                    return
+
+                prompt = request["messages"][0]["content"][0]["text"]
+                self._send(
+                    200,
+                    {
+                        "id": "msg_stub",
+                        "type": "message",
+                        "role": "assistant",
+                        "content": [{"type": "text", "text": stub.response_text}],
+                        "stop_reason": "end_turn",
+                        "usage": {
+                            "input_tokens": len(prompt) // 4,
+                            "output_tokens": len(stub.response_text) // 4,
+                        },
+                    },
+                )
+
+            def _send(self, status: int, body: dict, headers: dict | None = None):
+                payload = json.dumps(body).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
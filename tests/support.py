@@ -0,0 +1,224 @@
+"""
+Offline stand-ins shared by the unit and benchmark tests: loading handlers as
+they are deployed, Lambda contexts, API Gateway and S3 events, and a driver
+running a job through every stage of the pipeline.
+"""
+
+import glob
+import importlib.util
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CONFIG_ID = "benchmark-config"
+INSTITUTION = "CDC"
+API_KEY = "benchmark-api-key"
+
+REPORT_TEXT = (
+    "Audiological evaluation. Pure tone audiometry shows normal hearing "
+    "sensitivity from 250 to 8000 Hz in the right ear and a mild sensorineural "
+    "hearing loss from 2000 to 8000 Hz in the left ear. Tympanometry type A "
+    "bilaterally. Word recognition excellent bilaterally."
+)
+
+
+class FakeContext:
+    """
+    Minimal Lambda context object passed to handlers.
+    """
+
+    def __init__(self, function_name: str = "benchmark", timeout_ms: int = 900000):
+        self.function_name = function_name
+        self.aws_request_id = str(uuid.uuid4())
+        self.invoked_function_arn = (
+            f"arn:aws:lambda:us-west-2:123456789012:function:{function_name}"
+        )
+        self.memory_limit_in_mb = 512
+        self.deadline = time.monotonic() + timeout_ms / 1000
+
+    def get_remaining_time_in_millis(self) -> int:
+        return max(0, int((self.deadline - time.monotonic()) * 1000))
+
+
+def load_lambda(name: str):
+    """
+    Imports lambda/<name>/handler.py under a unique module name, with the
+    lambda's directory importable for its sibling modules as in the deployed
+    asset and the layers importable as under /opt/python. Environment
+    variables must be set beforehand, since handlers read them at import.
+    """
+
+    for layer in glob.glob(os.path.join(ROOT, "lambda", "layers", "*", "python")):
+        if layer not in sys.path:
+            sys.path.append(layer)
+
+    directory = os.path.join(ROOT, "lambda", name)
+    if directory not in sys.path:
+        sys.path.insert(0, directory)
+
+    spec = importlib.util.spec_from_file_location(
+        f"{name}_handler", os.path.join(directory, "handler.py")
+    )
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    return module
+
+
+def api_event(
+    path: str,
+    body: dict | None = None,
+    method: str = "POST",
+    query: dict | None = None,
+    headers: dict | None = None,
+) -> dict:
+    return {
+        "resource": path,
+        "path": path,
+        "httpMethod": method,
+        "headers": {"Content-Type": "application/json", **(headers or {})},
+        "body": json.dumps(body) if body is not None else None,
+        "requestContext": {"resourcePath": path, "httpMethod": method, "stage": "prod"},
+        "isBase64Encoded": False,
+        "queryStringParameters": query,
+        "pathParameters": None,
+    }
+
+
+def s3_event(bucket: str, key: str, etag: str | None = None) -> dict:
+    s3_object = {"key": key}
+    if etag is not None:
+        s3_object["eTag"] = etag
+
+    return {
+        "Records": [
+            {
+                "eventName": "ObjectCreated:Put",
+                "s3": {"bucket": {"name": bucket}, "object": s3_object},
+            }
+        ]
+    }
+
+
+def batch_body(patients: int) -> str:
+    return json.dumps(
+        [
+            {
+                "report": f"Patient {i}. {REPORT_TEXT}",
+                "results": [{"frequency": 1000, "left": 30, "right": 10}],
+            }
+            for i in range(patients)
+        ]
+    )
+
+
+class SerializedClient:
+    """
+    Makes a client's calls one at a time. DynamoDB applies writes to an item
+    atomically, but moto doesn't when they come from several threads.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.lock = threading.Lock()
+
+    def __getattr__(self, name):
+        method = getattr(self.client, name)
+
+        def call(*args, **kwargs):
+            with self.lock:
+                return method(*args, **kwargs)
+
+        return call
+
+
+class Pipeline:
+    """
+    Drives a job through every stage the deployed stack would run, with the
+    state machine's steps called in order since moto does not run them.
+    """
+
+    def __init__(self, handlers, aws):
+        self.handlers = handlers
+        self.aws = aws
+        self.stage_ms = {}
+
+    def _timed(self, stage: str, call, *args):
+        start = time.perf_counter()
+        result = call(*args)
+        self.stage_ms.setdefault(stage, []).append((time.perf_counter() - start) * 1000)
+        return result
+
+    def upload(self, body: str, priority: str | None = None) -> tuple[str, str]:
+        request = {
+            "job_name": "benchmark",
+            "config_id": CONFIG_ID,
+            "institution_id": INSTITUTION,
+            "mime_type": "application/json",
+        }
+        if priority is not None:
+            request["priority"] = priority
+
+        response = self._timed(
+            "api.upload",
+            self.handlers.api.handler,
+            api_event("/upload", request),
+            FakeContext("api"),
+        )
+        assert response["statusCode"] == 200, response
+        upload = json.loads(response["body"])["body"]
+
+        self.aws.s3.put_object(
+            Bucket=os.environ["BUCKET_NAME"], Key=upload["key"], Body=body
+        )
+
+        return upload["job_id"], upload["key"]
+
+    def start(self, key: str) -> None:
+        response = self._timed(
+            "bucket_response",
+            self.handlers.bucket_response.handler,
+            s3_event(os.environ["BUCKET_NAME"], key),
+            FakeContext("bucket_response"),
+        )
+        assert response["statusCode"] == 200, response
+
+    def process(self, job_id: str) -> dict:
+        execution_arn = (
+            os.environ["STEP_FUNCTION_ARN"].replace(":stateMachine:", ":execution:")
+            + f":{uuid.uuid4()}"
+        )
+        payload = self._timed(
+            "record_processor",
+            self.handlers.record_processor.handler,
+            {
+                "jobId": job_id,
+                "executionId": execution_arn,
+                "input": {"jobId": job_id},
+            },
+            FakeContext("record_processor"),
+        )
+        assert payload["statusCode"] == 200, payload
+        assert "error" not in payload["result"], payload["result"]
+
+        return payload
+
+    def complete(self, payload: dict) -> None:
+        response = self._timed(
+            "completion_recorder",
+            self.handlers.completion_recorder.handler,
+            payload,
+            FakeContext("completion_recorder"),
+        )
+        assert response["statusCode"] == 200, response
+
+    def run(self, body: str) -> str:
+        job_id, key = self.upload(body)
+        self.start(key)
+        self.complete(self.process(job_id))
+        return job_id
@@ -0,0 +1,579 @@
+import base64
+import io
+import json
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import boto3
+import pytest
+
+from tests.support import CONFIG_ID, INSTITUTION, REPORT_TEXT, FakeContext, api_event
+
+
+def call(handlers, path: str, body: dict | None = None, **event) -> dict:
+    return handlers.api.handler(api_event(path, body, **event), FakeContext("api"))
+
+
+def response_body(response: dict) -> dict:
+    """
+    The body the route returned, unwrapped from the resolver's response.
+    """
+
+    body = response["body"]
+    if isinstance(body, str):
+        body = json.loads(body)
+    return body.get("body", body)
+
+
+def etag(response: dict) -> str:
+    return response["multiValueHeaders"]["ETag"][0]
+
+
+def upload_request(**fields) -> dict:
+    return {
+        "job_name": "unit",
+        "config_id": CONFIG_ID,
+        "institution_id": INSTITUTION,
+        "mime_type": "application/json",
+        **fields,
+    }
+
+
+def test_unknown_priority_rejected(handlers):
+    response = call(handlers, "/upload", upload_request(priority="urgent"))
+
+    assert response["statusCode"] == 400, response
+
+
+def test_job_etag(pipeline, handlers, aws):
+    """GET /jobs/{job_id} answers 304 while the job is unchanged since the
+    ETag a poller sent, and the new job once it changes."""
+
+    job_id, _ = pipeline.upload("{}")
+
+    response = call(handlers, f"/jobs/{job_id}", method="GET")
+    assert response["statusCode"] == 200, response
+    assert response_body(response)["status"] == "created"
+
+    unchanged = call(
+        handlers,
+        f"/jobs/{job_id}",
+        method="GET",
+        headers={"if-none-match": etag(response)},
+    )
+    assert unchanged["statusCode"] == 304
+    assert etag(unchanged) == etag(response)
+
+    aws.dynamodb.update_item(
+        TableName=os.environ["JOB_TABLE"],
+        Key={"job_id": {"S": job_id}},
+        UpdateExpression="SET #status = :status",
+        ExpressionAttributeNames={"#status": "status"},
+        ExpressionAttributeValues={":status": {"S": "started"}},
+    )
+
+    changed = call(
+        handlers,
+        f"/jobs/{job_id}",
+        method="GET",
+        headers={"If-None-Match": etag(response)},
+    )
+    assert changed["statusCode"] == 200
+    assert response_body(changed)["status"] == "started"
+
+
+def test_unknown_job(handlers):
+    response = call(handlers, "/jobs/no-such-job", method="GET")
+
+    assert response["statusCode"] == 404, response
+
+
+def test_list_jobs_pages(pipeline, handlers):
+    """GET /jobs pages through every job of a status, newest first."""
+
+    job_ids = {pipeline.upload("{}")[0] for _ in range(5)}
+
+    listed = []
+    query = {"status": "created", "limit": "2"}
+    while True:
+        response = call(handlers, "/jobs", method="GET", query=query)
+        assert response["statusCode"] == 200, response
+        page = response_body(response)
+
+        assert len(page["jobs"]) <= 2
+        listed.extend(page["jobs"])
+        if not page["next_token"]:
+            break
+        query = {**query, "next_token": page["next_token"]}
+
+    listed_ids = [job["job_id"] for job in listed]
+    assert job_ids <= set(listed_ids)
+    assert len(listed_ids) == len(set(listed_ids))
+    created_at = [job["created_at"] for job in listed]
+    assert created_at == sorted(created_at, reverse=True)
+    assert all(job["status"] == "created" for job in listed)
+
+
+def page_token(value) -> str:
+    return base64.urlsafe_b64encode(json.dumps(value).encode("utf-8")).decode("ascii")
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        {},
+        {"status": "unknown"},
+        {"status": "created", "limit": "0"},
+        {"status": "created", "limit": "101"},
+        {"status": "created", "limit": "ten"},
+        {"status": "created", "next_token": "not base64!"},
+        # Valid JSON, but not a key of the job table's index
+        {"status": "created", "next_token": "WzFd"},
+        {"status": "created", "next_token": page_token({"job_id": {"S": "a"}})},
+        {
+            "status": "created",
+            "next_token": page_token(
+                {
+                    "job_id": {"S": "a"},
+                    "status": {"S": "created"},
+                    "created_at": {"N": "1"},
+                }
+            ),
+        },
+        # The key of a page of another status
+        {
+            "status": "created",
+            "next_token": page_token(
+                {
+                    "job_id": {"S": "a"},
+                    "status": {"S": "failed"},
+                    "created_at": {"S": "2026-01-01T00:00:00+00:00"},
+                }
+            ),
+        },
+    ],
+)
+def test_list_jobs_validation(handlers, query):
+    response = call(handlers, "/jobs", method="GET", query=query or None)
+
+    assert response["statusCode"] == 400, response
+
+
+@pytest.mark.parametrize("upload_method", ["put", "post"])
+def test_upload_batch(handlers, aws, upload_method):
+    """Every job of a batch upload is created with its own presigned upload,
+    in the bulk lane unless it asks for another."""
+
+    jobs = [upload_request(job_name=f"batch-{i}") for i in range(30)]
+    jobs[0]["priority"] = "interactive"
+
+    response = call(
+        handlers, "/upload_batch", {"jobs": jobs, "upload_method": upload_method}
+    )
+    assert response["statusCode"] == 200, response
+    uploads = response_body(response)["jobs"]
+
+    assert [upload["job_name"] for upload in uploads] == [
+        job["job_name"] for job in jobs
+    ]
+    assert all(upload["url"] for upload in uploads)
+    assert all(("fields" in upload) == (upload_method == "post") for upload in uploads)
+
+    priorities = [
+        aws.dynamodb.get_item(
+            TableName=os.environ["JOB_TABLE"],
+            Key={"job_id": {"S": upload["job_id"]}},
+        )["Item"]["priority"]["S"]
+        for upload in uploads
+    ]
+    assert priorities == ["interactive"] + ["bulk"] * 29
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        {},
+        {"jobs": []},
+        {"jobs": "not a list"},
+        {"jobs": [upload_request()], "upload_method": "ftp"},
+        {"jobs": ["not an object"]},
+        {"jobs": [upload_request(), upload_request(mime_type="text/plain")]},
+        {"jobs": [upload_request(priority="urgent")]},
+        {"jobs": [{"job_name": "missing fields"}]},
+        {"jobs": [upload_request()] * 501},
+    ],
+)
+def test_upload_batch_validation(handlers, body):
+    response = call(handlers, "/upload_batch", body)
+
+    assert response["statusCode"] == 400, response
+
+
+def test_upload_batch_limit(handlers):
+    jobs = [upload_request(job_name=f"limit-{i}") for i in range(500)]
+
+    response = call(handlers, "/upload_batch", {"jobs": jobs})
+
+    assert response["statusCode"] == 200, response
+    assert len(response_body(response)["jobs"]) == 500
+
+
+def test_upload_multipart(handlers, aws):
+    """A multipart upload started through the API is assembled from the parts
+    uploaded to its presigned URLs."""
+
+    response = call(handlers, "/upload_multipart", upload_request(part_count=1))
+    assert response["statusCode"] == 200, response
+    upload = response_body(response)
+    assert [part["part_number"] for part in upload["parts"]] == [1]
+
+    part = aws.s3.upload_part(
+        Bucket=os.environ["BUCKET_NAME"],
+        Key=upload["key"],
+        UploadId=upload["upload_id"],
+        PartNumber=1,
+        Body=b"[]",
+    )
+
+    response = call(
+        handlers,
+        "/upload_multipart/complete",
+        {
+            "job_id": upload["job_id"],
+            "key": upload["key"],
+            "upload_id": upload["upload_id"],
+            "parts": [{"part_number": 1, "etag": part["ETag"]}],
+        },
+    )
+    assert response["statusCode"] == 200, response
+
+    body = aws.s3.get_object(Bucket=os.environ["BUCKET_NAME"], Key=upload["key"])
+    assert body["Body"].read() == b"[]"
+
+
+@pytest.mark.parametrize(
+    "file_size, part_size, part_count",
+    [
+        (1, 64 * 1024 * 1024, 1),
+        (640 * 1024 * 1024, 64 * 1024 * 1024, 10),
+        # Parts grow so the file fits in 1000 of them
+        (100 * 1024 * 1024 * 1024, 107374183, 1000),
+    ],
+)
+def test_upload_multipart_layout(handlers, file_size, part_size, part_count):
+    response = call(handlers, "/upload_multipart", upload_request(file_size=file_size))
+
+    assert response["statusCode"] == 200, response
+    upload = response_body(response)
+    assert upload["part_size"] == part_size
+    assert len(upload["parts"]) == part_count
+
+
+@pytest.mark.parametrize(
+    "fields",
+    [
+        {},
+        {"part_count": 0},
+        {"part_count": 1001},
+        {"part_count": "10"},
+        {"file_size": 0},
+        {"file_size": 1.5},
+        # More than 1000 parts of the largest size
+        {"file_size": 1000 * 5 * 1024 * 1024 * 1024 + 1},
+        {"part_count": 1, "mime_type": "text/plain"},
+    ],
+)
+def test_upload_multipart_validation(handlers, fields):
+    response = call(handlers, "/upload_multipart", upload_request(**fields))
+
+    assert response["statusCode"] == 400, response
+
+
+def test_upload_multipart_part_limit(handlers):
+    response = call(handlers, "/upload_multipart", upload_request(part_count=1000))
+
+    assert response["statusCode"] == 200, response
+    assert len(response_body(response)["parts"]) == 1000
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        {"job_id": "a", "key": "input_reports/a.json", "upload_id": "u"},
+        {
+            "job_id": "a",
+            "key": "input_reports/b.json",
+            "upload_id": "u",
+            "parts": [{"part_number": 1, "etag": "e"}],
+        },
+        {"job_id": "a", "key": "input_reports/a.json", "upload_id": "u", "parts": []},
+        {
+            "job_id": "a",
+            "key": "input_reports/a.json",
+            "upload_id": "u",
+            "parts": [{"part_number": "1", "etag": "e"}],
+        },
+    ],
+)
+def test_complete_multipart_validation(handlers, body):
+    response = call(handlers, "/upload_multipart/complete", body)
+
+    assert response["statusCode"] == 400, response
+
+
+def classify_request(**fields) -> dict:
+    return {
+        "config_id": CONFIG_ID,
+        "institution_id": INSTITUTION,
+        "report": REPORT_TEXT,
+        **fields,
+    }
+
+
+def test_classify_starts_processing(handlers, aws):
+    """Reports submitted inline start processing with the report in the
+    execution input, without an S3 upload."""
+
+    response = call(handlers, "/classify", classify_request())
+    # Routes returning a dict carry their status code in the body
+    assert json.loads(response["body"])["statusCode"] == 202, response
+    job_id = response_body(response)["job_id"]
+
+    sfn = boto3.client("stepfunctions")
+    executions = sfn.list_executions(stateMachineArn=os.environ["STEP_FUNCTION_ARN"])
+    inputs = [
+        json.loads(sfn.describe_execution(executionArn=e["executionArn"])["input"])
+        for e in executions["executions"]
+    ]
+    started = [execution for execution in inputs if execution["jobId"] == job_id]
+    assert started and started[0]["report"] == REPORT_TEXT
+
+    item = aws.dynamodb.get_item(
+        TableName=os.environ["JOB_TABLE"], Key={"job_id": {"S": job_id}}
+    )["Item"]
+    assert item["status"]["S"] == "started"
+
+
+@pytest.mark.parametrize(
+    "body",
+    [
+        {"config_id": CONFIG_ID, "institution_id": INSTITUTION},
+        classify_request(report=""),
+        classify_request(report="   "),
+        classify_request(report=["not", "a", "string"]),
+        classify_request(report="x" * (64 * 1024 + 1)),
+        classify_request(wait_seconds=-1),
+        classify_request(wait_seconds=11),
+        classify_request(wait_seconds="5"),
+    ],
+)
+def test_classify_validation(handlers, body):
+    response = call(handlers, "/classify", body)
+
+    assert response["statusCode"] == 400, response
+
+
+class FakeLambda:
+    """
+    Stands in for the API's Lambda client invoking the record processor,
+    answering with a classification or, with function_error, as a crashed
+    function would.
+    """
+
+    def __init__(self, function_error: bool = False):
+        self.function_error = function_error
+        self.invocations = []
+
+    def invoke(self, FunctionName, InvocationType, Payload):
+        self.invocations.append(json.loads(Payload))
+        if self.function_error:
+            return {
+                "FunctionError": "Unhandled",
+                "Payload": io.BytesIO(b'{"errorMessage": "Task timed out"}'),
+            }
+
+        payload = {
+            "result": {"output": {"classified": True}},
+            "usage": {"input_tokens": 10, "output_tokens": 5, "model_calls": 1},
+        }
+        return {"Payload": io.BytesIO(json.dumps(payload).encode("utf-8"))}
+
+
+@pytest.fixture
+def record_processor(handlers, monkeypatch):
+    def install(**options):
+        fake = FakeLambda(**options)
+        monkeypatch.setattr(handlers.api, "lambda_client", fake)
+        return fake
+
+    return install
+
+
+def sync_request() -> tuple[dict, str]:
+    """
+    A /classify/sync request for a report of its own, and its job ID.
+    """
+
+    report = f"{uuid.uuid4()}. {REPORT_TEXT}"
+    return classify_request(report=report), report
+
+
+def sync_job_id(handlers, report: str) -> str:
+    return handlers.api.sync_classify_job_id(report, CONFIG_ID, INSTITUTION)
+
+
+def put_sync_job(aws, job_id: str, **attributes) -> None:
+    aws.dynamodb.put_item(
+        TableName=os.environ["JOB_TABLE"],
+        Item={
+            "job_id": {"S": job_id},
+            "created_at": {"S": datetime.now(timezone.utc).isoformat()},
+            **{
+                name: {"S": value if isinstance(value, str) else json.dumps(value)}
+                for name, value in attributes.items()
+            },
+        },
+    )
+
+
+def ago(seconds: float) -> str:
+    return (datetime.now(timezone.utc) - timedelta(seconds=seconds)).isoformat()
+
+
+def sync_job(aws, job_id: str) -> dict:
+    return aws.dynamodb.get_item(
+        TableName=os.environ["JOB_TABLE"], Key={"job_id": {"S": job_id}}
+    )["Item"]
+
+
+def test_classify_sync_claims(handlers, aws, record_processor):
+    """The first request for a report classifies it and records the result on
+    the shared job."""
+
+    fake = record_processor()
+    body, report = sync_request()
+
+    response = call(handlers, "/classify/sync", body)
+
+    assert response["statusCode"] == 200, response
+    assert response_body(response)["result"] == {"output": {"classified": True}}
+    assert len(fake.invocations) == 1
+
+    item = sync_job(aws, sync_job_id(handlers, report))
+    assert item["status"]["S"] == "completed"
+    assert item["model_calls"]["N"] == "1"
+
+
+def test_classify_sync_reuses_result(handlers, aws, record_processor):
+    """A classification finished within SYNC_CLASSIFY_REUSE_SECONDS is
+    returned to identical requests without classifying again."""
+
+    fake = record_processor()
+    body, _ = sync_request()
+
+    first = call(handlers, "/classify/sync", body)
+    second = call(handlers, "/classify/sync", body)
+
+    assert response_body(second) == response_body(first)
+    assert len(fake.invocations) == 1
+
+
+def test_classify_sync_shares_claim_in_flight(handlers, aws, record_processor):
+    """A request losing the claim to one in flight waits for its result."""
+
+    fake = record_processor()
+    body, report = sync_request()
+    job_id = sync_job_id(handlers, report)
+    put_sync_job(aws, job_id, status="processing")
+
+    def finish():
+        time.sleep(0.3)
+        handlers.api.record_sync_classification(job_id, {"output": {"shared": True}})
+
+    thread = threading.Thread(target=finish)
+    thread.start()
+    response = call(handlers, "/classify/sync", body)
+    thread.join()
+
+    assert response_body(response)["result"] == {"output": {"shared": True}}
+    assert fake.invocations == []
+
+
+def test_classify_sync_wait_capped(handlers, aws, record_processor):
+    """A request waiting on a classification in flight answers 202 before its
+    invocation runs out of time."""
+
+    record_processor()
+    body, report = sync_request()
+    put_sync_job(aws, sync_job_id(handlers, report), status="processing")
+
+    start = time.monotonic()
+    response = handlers.api.handler(
+        api_event("/classify/sync", body), FakeContext("api", timeout_ms=2000)
+    )
+
+    assert time.monotonic() - start < 2
+    assert json.loads(response["body"])["statusCode"] == 202, response
+
+
+@pytest.mark.parametrize(
+    "attributes",
+    [
+        {"status": "failed", "result": {"error": "Processing did not complete."}},
+        {"status": "processing", "created_at": ago(120)},
+        {
+            "status": "completed",
+            "result": {"output": {"old": True}},
+            "completed_at": ago(600),
+        },
+    ],
+    ids=["failed", "stale", "expired"],
+)
+def test_classify_sync_replaces_claim(handlers, aws, record_processor, attributes):
+    """Failed, stale and expired classifications are classified again, on the
+    same job, which keeps its name and creation time."""
+
+    fake = record_processor()
+    body, report = sync_request()
+    job_id = sync_job_id(handlers, report)
+    put_sync_job(aws, job_id, job_name="first_report", **attributes)
+    created_at = sync_job(aws, job_id)["created_at"]
+
+    response = call(handlers, "/classify/sync", body)
+
+    assert response_body(response)["result"] == {"output": {"classified": True}}
+    assert len(fake.invocations) == 1
+
+    item = sync_job(aws, job_id)
+    assert item["status"]["S"] == "completed"
+    assert item["job_name"]["S"] == "first_report"
+    assert item["created_at"] == created_at
+
+
+def test_classify_sync_function_error(handlers, aws, record_processor):
+    """A crashed record processor fails the request and the shared job, so
+    the next identical request classifies again."""
+
+    record_processor(function_error=True)
+    body, report = sync_request()
+
+    response = call(handlers, "/classify/sync", body)
+
+    assert response["statusCode"] == 500, response
+    item = sync_job(aws, sync_job_id(handlers, report))
+    assert item["status"]["S"] == "failed"
+
+    fake = record_processor()
+    response = call(handlers, "/classify/sync", body)
+    assert response_body(response)["result"] == {"output": {"classified": True}}
+    assert len(fake.invocations) == 1
+
+    # The job keeps the error of the failed attempt
+    item = sync_job(aws, sync_job_id(handlers, report))
+    assert item["status"]["S"] == "completed"
+    assert [error["M"]["error"]["S"] for error in item["errors"]["L"]] == [
+        "Processing did not complete."
+    ]
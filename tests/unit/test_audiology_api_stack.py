@@ -1,15 +1,253 @@
+import json
+
 import aws_cdk as core
 import aws_cdk.assertions as assertions
+import pytest
+
+from cdk.audiology_api_stack import AudiologyApiStack
+from tests.support import ROOT
+
+API = "SubmissionApiAudiologyApiHandler"
+INTERACTIVE = "RecordProcessingAudiologyRecordProcessor"
+BULK = "RecordProcessingAudiologyRecordProcessorBulk"
 
-from audiology_api.audiology_api_stack import AudiologyApiStack
 
-# example tests. To run these tests, uncomment this file along with the example
-# resource in audiology_api/audiology_api_stack.py
-def test_sqs_queue_created():
-    app = core.App()
+def synth(monkeypatch, warm_start: dict | None = None) -> assertions.Template:
+    """
+    The stack's template with the given warm_start context, without bundling
+    the Lambda assets, which needs Docker.
+    """
+
+    monkeypatch.chdir(ROOT)
+    context = {"aws:cdk:bundling-stacks": []}
+    if warm_start is not None:
+        context["warm_start"] = warm_start
+
+    app = core.App(context=context)
     stack = AudiologyApiStack(app, "audiology-api")
-    template = assertions.Template.from_stack(stack)
+    return assertions.Template.from_stack(stack)
+
+
+def resource(template: assertions.Template, type: str, prefix: str) -> dict:
+    """
+    Properties of the resource of type whose logical ID is prefix followed
+    by CDK's hash.
+    """
+
+    resources = template.find_resources(type)
+    for logical_id, body in resources.items():
+        if logical_id.startswith(prefix) and len(logical_id) == len(prefix) + 8:
+            return body["Properties"]
+
+    raise AssertionError(f"No {type} named {prefix}: {sorted(resources)}")
+
+
+def aliases(template: assertions.Template) -> dict[str, dict]:
+    return {
+        properties["FunctionName"]["Ref"]: properties
+        for properties in (
+            body["Properties"]
+            for body in template.find_resources("AWS::Lambda::Alias").values()
+        )
+    }
+
+
+def test_without_warm_start(monkeypatch):
+    """Functions are invoked on demand, without aliases or SnapStart."""
+
+    template = synth(monkeypatch)
+
+    template.resource_count_is("AWS::Lambda::Alias", 0)
+    template.resource_count_is("AWS::ApplicationAutoScaling::ScalableTarget", 0)
+    template.resource_properties_count_is(
+        "AWS::Lambda::Function", {"SnapStart": assertions.Match.any_value()}, 0
+    )
+
+
+def test_snap_start(monkeypatch):
+    """SnapStart applies to the published versions of the configured
+    functions, which are invoked through their live alias."""
+
+    template = synth(monkeypatch, {"snap_start": True})
+
+    for prefix in (API, INTERACTIVE, BULK):
+        properties = resource(template, "AWS::Lambda::Function", prefix)
+        assert properties["SnapStart"] == {"ApplyOn": "PublishedVersions"}
+
+    live = aliases(template)
+    assert len(live) == 5
+    for properties in live.values():
+        assert properties["Name"] == "live"
+        assert "ProvisionedConcurrencyConfig" not in properties
+
+    # The API Gateway integration invokes the alias
+    template.has_resource_properties(
+        "AWS::ApiGateway::Method",
+        {
+            "Integration": {
+                "Uri": {
+                    "Fn::Join": assertions.Match.array_with(
+                        [
+                            assertions.Match.array_with(
+                                [
+                                    {
+                                        "Ref": assertions.Match.string_like_regexp(
+                                            f"{API}LiveAlias"
+                                        )
+                                    }
+                                ]
+                            )
+                        ]
+                    )
+                }
+            }
+        },
+    )
+
+
+def test_provisioned_concurrency(monkeypatch):
+    """Functions with provisioned concurrency get it on their live alias,
+    and no SnapStart, which Lambda doesn't allow alongside it."""
+
+    template = synth(
+        monkeypatch,
+        {"snap_start": True, "functions": {"api": {"provisioned_concurrency": 2}}},
+    )
+
+    assert "SnapStart" not in resource(template, "AWS::Lambda::Function", API)
+    assert "SnapStart" in resource(template, "AWS::Lambda::Function", BULK)
+
+    api_alias = next(
+        properties
+        for function, properties in aliases(template).items()
+        if function.startswith(API)
+    )
+    assert api_alias["ProvisionedConcurrencyConfig"] == {
+        "ProvisionedConcurrentExecutions": 2
+    }
+    template.resource_count_is("AWS::ApplicationAutoScaling::ScalableTarget", 0)
+
+
+def test_clinic_hours(monkeypatch):
+    """Clinic hours concurrency is scheduled with Application Auto Scaling,
+    keeping at least one environment provisioned outside clinic hours."""
+
+    template = synth(
+        monkeypatch,
+        {
+            "functions": {
+                "record_processor_interactive": {"clinic_hours_concurrency": 4}
+            },
+            "clinic_hours": {"timezone": "America/New_York", "open": 8},
+        },
+    )
+
+    assert "SnapStart" not in resource(template, "AWS::Lambda::Function", INTERACTIVE)
+    (function,) = aliases(template)
+    assert function.startswith(INTERACTIVE) and not function.startswith(BULK)
+
+    template.has_resource_properties(
+        "AWS::ApplicationAutoScaling::ScalableTarget",
+        {
+            "MinCapacity": 1,
+            "MaxCapacity": 4,
+            "ScalableDimension": "lambda:function:ProvisionedConcurrency",
+            "ScheduledActions": [
+                {
+                    "ScalableTargetAction": {"MinCapacity": 4},
+                    "Schedule": "cron(0 8 ? * MON-FRI *)",
+                    "ScheduledActionName": "ClinicHoursOpen",
+                    "Timezone": "America/New_York",
+                },
+                {
+                    "ScalableTargetAction": {"MinCapacity": 1},
+                    "Schedule": "cron(0 19 ? * MON-FRI *)",
+                    "ScheduledActionName": "ClinicHoursClose",
+                    "Timezone": "America/New_York",
+                },
+            ],
+        },
+    )
+
+
+def test_clinic_hours_above_provisioned(monkeypatch):
+    """Outside clinic hours, functions keep their provisioned concurrency."""
+
+    template = synth(
+        monkeypatch,
+        {
+            "functions": {
+                "api": {"provisioned_concurrency": 2, "clinic_hours_concurrency": 6}
+            }
+        },
+    )
+
+    template.has_resource_properties(
+        "AWS::ApplicationAutoScaling::ScalableTarget",
+        {
+            "MinCapacity": 2,
+            "MaxCapacity": 6,
+            "ScheduledActions": [
+                assertions.Match.object_like(
+                    {"ScalableTargetAction": {"MinCapacity": 6}}
+                ),
+                assertions.Match.object_like(
+                    {"ScalableTargetAction": {"MinCapacity": 2}}
+                ),
+            ],
+        },
+    )
+
+
+@pytest.mark.parametrize(
+    "options, message",
+    [
+        (
+            {"record_processor_bulk": {"clinic_hours_concurrency": 6}},
+            "exceeds its reserved concurrency",
+        ),
+        ({"api": {"provisioned_concurrency": -1}}, "non-negative integer"),
+    ],
+)
+def test_invalid_options(monkeypatch, options, message):
+    with pytest.raises(ValueError, match=message):
+        synth(monkeypatch, {"functions": options})
+
+
+def test_job_attempts(monkeypatch):
+    """Each lane's state machine counts record processor attempts in the
+    payload, apart from the retries of throttled invocations, and passes its
+    lane's timeout and retries to the record processor."""
+
+    template = synth(monkeypatch)
+
+    for prefix, timeout, retries in ((INTERACTIVE, 15, 3), (BULK, 900, 5)):
+        properties = resource(template, "AWS::Lambda::Function", prefix)
+        assert properties["Timeout"] == timeout
+        assert properties["Environment"]["Variables"]["JOB_RETRIES"] == str(retries)
+
+    machines = template.find_resources("AWS::StepFunctions::StateMachine")
+    assert len(machines) == 2
+    for machine in machines.values():
+        definition = "".join(
+            part if isinstance(part, str) else "<ref>"
+            for part in machine["Properties"]["DefinitionString"]["Fn::Join"][1]
+        )
+        states = json.loads(definition)["States"]
+        task = next(
+            state
+            for name, state in states.items()
+            if name.startswith("RecordProcessorTask")
+        )
 
-#     template.has_resource_properties("AWS::SQS::Queue", {
-#         "VisibilityTimeout": 300
-#     })
+        assert task["Parameters"]["Payload"]["attempt.$"] == "$.attempt"
+        assert all(
+            "JobIncomplete" not in retry["ErrorEquals"] for retry in task["Retry"]
+        )
+        assert task["Catch"][0]["ErrorEquals"] == [
+            "JobIncomplete",
+            "Sandbox.Timedout",
+            "Lambda.Unknown",
+        ]
+        retry = states[task["Catch"][0]["Next"]]
+        assert retry["Choices"][0]["NumericLessThan"] in (3, 5)
@@ -0,0 +1,74 @@
+import json
+import os
+
+import boto3
+
+from tests.support import REPORT_TEXT, FakeContext, s3_event
+
+
+def test_duplicate_start_events(pipeline, handlers, aws):
+    """Repeated S3 events for an upload, and re-uploads of the job's input,
+    start a single execution, and keep the time the job was first queued."""
+
+    job_id, key = pipeline.upload(REPORT_TEXT)
+    sfn = boto3.client("stepfunctions")
+
+    queued_at = set()
+    for etag in ("etag-1", "etag-1", "etag-2"):
+        response = handlers.bucket_response.handler(
+            s3_event(os.environ["BUCKET_NAME"], key, etag),
+            FakeContext("bucket_response"),
+        )
+        assert response["statusCode"] == 200, response
+
+        item = aws.dynamodb.get_item(
+            TableName=os.environ["JOB_TABLE"], Key={"job_id": {"S": job_id}}
+        )["Item"]
+        queued_at.add(item["queued_at"]["S"])
+
+    assert len(queued_at) == 1
+
+    executions = sfn.list_executions(stateMachineArn=os.environ["STEP_FUNCTION_ARN"])
+    started = [
+        execution
+        for execution in executions["executions"]
+        if execution["name"].startswith(job_id)
+    ]
+    assert len(started) == 1
+
+
+def test_priority_lanes(pipeline, handlers, aws, monkeypatch):
+    """Jobs are started in the state machine of their priority's lane."""
+
+    sfn = boto3.client("stepfunctions")
+    bulk = sfn.create_state_machine(
+        name="benchmark-record-processing-bulk",
+        definition=json.dumps(
+            {"StartAt": "Done", "States": {"Done": {"Type": "Pass", "End": True}}}
+        ),
+        roleArn="arn:aws:iam::123456789012:role/benchmark",
+    )["stateMachineArn"]
+    monkeypatch.setattr(
+        handlers.bucket_response,
+        "step_function_arns",
+        {"interactive": os.environ["STEP_FUNCTION_ARN"], "bulk": bulk},
+    )
+
+    bulk_job, bulk_key = pipeline.upload(REPORT_TEXT, priority="bulk")
+    interactive_job, interactive_key = pipeline.upload(REPORT_TEXT)
+    pipeline.start(bulk_key)
+    pipeline.start(interactive_key)
+
+    def started(state_machine_arn: str) -> set[str]:
+        executions = sfn.list_executions(stateMachineArn=state_machine_arn)
+        return {execution["name"] for execution in executions["executions"]}
+
+    assert bulk_job in started(bulk)
+    assert interactive_job in started(os.environ["STEP_FUNCTION_ARN"])
+    assert bulk_job not in started(os.environ["STEP_FUNCTION_ARN"])
+
+    item = aws.dynamodb.get_item(
+        TableName=os.environ["JOB_TABLE"], Key={"job_id": {"S": bulk_job}}
+    )["Item"]
+    assert item["priority"]["S"] == "bulk"
+    assert "queued_at" in item
@@ -0,0 +1,135 @@
+import importlib
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+TABLE_NAME = "jobs-to-clear"
+
+
+@pytest.fixture
+def clear_jobs():
+    return importlib.import_module("scripts.clear_jobs")
+
+
+@pytest.fixture
+def job_table(aws):
+    """
+    A job table holding jobs of each status, created 1 and 30 days ago.
+    """
+
+    aws.dynamodb.create_table(
+        TableName=TABLE_NAME,
+        KeySchema=[{"AttributeName": "job_id", "KeyType": "HASH"}],
+        AttributeDefinitions=[{"AttributeName": "job_id", "AttributeType": "S"}],
+        BillingMode="PAY_PER_REQUEST",
+    )
+
+    now = datetime.now(timezone.utc)
+    for status in ("created", "completed", "failed"):
+        for age in (1, 30):
+            aws.dynamodb.put_item(
+                TableName=TABLE_NAME,
+                Item={
+                    "job_id": {"S": f"{status}-{age}"},
+                    "status": {"S": status},
+                    "created_at": {"S": (now - timedelta(days=age)).isoformat()},
+                },
+            )
+
+    yield TABLE_NAME
+    aws.dynamodb.delete_table(TableName=TABLE_NAME)
+
+
+def job_ids(aws) -> set[str]:
+    items = aws.dynamodb.scan(TableName=TABLE_NAME)["Items"]
+    return {item["job_id"]["S"] for item in items}
+
+
+JOBS = {
+    f"{status}-{age}"
+    for status in ("created", "completed", "failed")
+    for age in (1, 30)
+}
+
+
+@pytest.mark.parametrize(
+    "filters, deleted",
+    [
+        ({}, JOBS),
+        (
+            {"statuses": ["completed", "failed"]},
+            {"completed-1", "completed-30", "failed-1", "failed-30"},
+        ),
+        ({"older_than_days": 7}, {"created-30", "completed-30", "failed-30"}),
+        ({"statuses": ["failed"], "older_than_days": 7}, {"failed-30"}),
+    ],
+    ids=["all", "status", "age", "status-and-age"],
+)
+def test_filters(clear_jobs, job_table, aws, filters, deleted):
+    """Only jobs matching every filter are deleted, across scan segments."""
+
+    total = clear_jobs.clear_dynamodb_table(job_table, segments=3, **filters)
+
+    assert total == len(deleted)
+    assert job_ids(aws) == JOBS - deleted
+
+
+def test_dry_run(clear_jobs, job_table, aws):
+    """A dry run counts the matching jobs without deleting them."""
+
+    total = clear_jobs.clear_dynamodb_table(
+        job_table, statuses=["failed"], dry_run=True
+    )
+
+    assert total == 2
+    assert len(job_ids(aws)) == 6
+
+
+class ThrottledClient:
+    """
+    Passes calls to the client, except that the first throttled_writes batch
+    writes process nothing and return every request as unprocessed.
+    """
+
+    def __init__(self, client, throttled_writes: int):
+        self.client = client
+        self.throttled_writes = throttled_writes
+        self.batch_writes = 0
+
+    def batch_write_item(self, RequestItems):
+        self.batch_writes += 1
+        if self.batch_writes <= self.throttled_writes:
+            return {"UnprocessedItems": RequestItems}
+        return self.client.batch_write_item(RequestItems=RequestItems)
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+
+def test_unprocessed_deletes_retried(clear_jobs, job_table, aws, monkeypatch):
+    """Deletes left unprocessed by a batch write are retried."""
+
+    monkeypatch.setattr(clear_jobs.time, "sleep", lambda seconds: None)
+    client = ThrottledClient(aws.dynamodb, throttled_writes=2)
+    keys = [{"job_id": {"S": job_id}} for job_id in sorted(JOBS)]
+
+    clear_jobs.delete_keys(client, job_table, keys)
+
+    assert client.batch_writes == 3
+    assert job_ids(aws) == set()
+
+
+def test_unprocessed_deletes_give_up(clear_jobs, job_table, aws, monkeypatch):
+    """Deletes still unprocessed after every attempt fail the run."""
+
+    monkeypatch.setattr(clear_jobs.time, "sleep", lambda seconds: None)
+    client = ThrottledClient(
+        aws.dynamodb, throttled_writes=clear_jobs.BATCH_WRITE_ATTEMPTS
+    )
+    keys = [{"job_id": {"S": job_id}} for job_id in sorted(JOBS)]
+
+    with pytest.raises(Exception, match="Could not delete 6 items"):
+        clear_jobs.delete_keys(client, job_table, keys)
+
+    assert client.batch_writes == clear_jobs.BATCH_WRITE_ATTEMPTS
+    assert job_ids(aws) == JOBS
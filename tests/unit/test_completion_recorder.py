@@ -0,0 +1,169 @@
+import csv
+import importlib
+import io
+import os
+
+import pyarrow.parquet as pq
+import pytest
+
+from tests.support import INSTITUTION, batch_body
+
+
+def test_parquet_export_streamed(pipeline, handlers, aws, config, monkeypatch):
+    """Multi-patient jobs are exported to Parquet a row group at a time, under
+    the institution's CSV headers."""
+
+    archive = importlib.import_module("archive")
+    monkeypatch.setenv("PARQUET_EXPORT", "true")
+    monkeypatch.setattr(archive, "PARQUET_ROW_GROUP_ROWS", 4)
+
+    job_id = pipeline.run(batch_body(10))
+
+    body = aws.s3.get_object(
+        Bucket=os.environ["OUTPUT_BUCKET_NAME"],
+        Key=f"completed_jobs/{job_id}.parquet",
+    )["Body"].read()
+    parquet = pq.ParquetFile(io.BytesIO(body))
+
+    assert parquet.metadata.num_row_groups == 3
+    assert parquet.metadata.num_rows == 10
+    assert parquet.schema_arrow.names == config["templates"][INSTITUTION]["csv_headers"]
+
+
+def test_failed_archive_leaves_job_incomplete(pipeline, handlers, aws, monkeypatch):
+    """A job whose S3 archive can't be written isn't marked as completed, so
+    pollers never see a result key that points at nothing."""
+
+    job_id, key = pipeline.upload(batch_body(2))
+    pipeline.start(key)
+    payload = pipeline.process(job_id)
+
+    def fail(job_id, job_info):
+        raise ValueError("Error logging job to S3: unavailable")
+
+    monkeypatch.setattr(handlers.completion_recorder, "place_job_s3", fail)
+    with pytest.raises(Exception, match="S3 archive"):
+        pipeline.complete(payload)
+
+    item = aws.dynamodb.get_item(
+        TableName=os.environ["JOB_TABLE"], Key={"job_id": {"S": job_id}}
+    )["Item"]
+    assert item["status"]["S"] != "completed"
+    assert "result_key" not in item
+
+
+def leaf_values(template: dict, prefix: tuple = ()) -> dict:
+    """The template with each leaf set to its path, e.g. "Attributes/Reasoning"."""
+
+    output = {}
+    for key, value in template.items():
+        path = prefix + (key,)
+        if isinstance(value, dict):
+            output[key] = leaf_values(value, path)
+        else:
+            output[key] = "/".join(path) if isinstance(value, str) else ["/".join(path)]
+    return output
+
+
+HEARING = "Attributes/Hearing Type/"
+RECORD = ["PAT00000001", "Left ear normal.", "500 Hz: 20 dB; 1000 Hz: 25 dB"]
+
+CSV_ROWS = {
+    "MassEyeAndEar": RECORD
+    + [
+        HEARING + "Left Ear/Type of Loss",
+        HEARING + "Left Ear/Degree of Loss",
+        HEARING + "Left Ear/Neuro Type",
+        HEARING + "Right Ear/Type of Loss",
+        HEARING + "Right Ear/Degree of Loss",
+        HEARING + "Right Ear/Neuro Type",
+        "Attributes/Reasoning",
+    ],
+    "CDC": RECORD
+    + [
+        HEARING + "Left Ear Overall Result",
+        HEARING + "Left Ear Degree",
+        HEARING + "Right Ear Overall Result",
+        HEARING + "Right Ear Degree",
+        "Attributes/Reasoning",
+    ],
+    "Redcap": RECORD
+    + [
+        HEARING + "Left Ear/Type",
+        HEARING + "Left Ear/Degree",
+        HEARING + "Right Ear/Type",
+        HEARING + "Right Ear/Degree",
+        "Attributes/Known Hearing Loss Risk Indicators/Known Hearing Loss Risk",
+        "Attributes/Known Hearing Loss Risk Indicators/Risk Factors/Tier One",
+        "Attributes/Known Hearing Loss Risk Indicators/Risk Factors/Tier Two",
+        "Attributes/Reasoning",
+    ],
+    "Dawn": RECORD
+    + [
+        HEARING + "Left Ear/Overall Result",
+        HEARING + "Left Ear/Degree",
+        HEARING + "Right Ear/Overall Result",
+        HEARING + "Right Ear/Degree",
+        "Attributes/Reasoning",
+    ],
+}
+
+
+@pytest.mark.parametrize("institution", sorted(CSV_ROWS))
+def test_csv_export(pipeline, handlers, aws, config, institution):
+    """Records are exported to CSV under each institution's headers, each
+    filled from the input or the template value it names."""
+
+    job_id, _ = pipeline.upload(batch_body(1))
+    institution_data = config["templates"][institution]
+    record = {
+        "record_id": RECORD[0],
+        "report": RECORD[1],
+        "results": RECORD[2].split("; "),
+        "output": leaf_values(institution_data["template"]),
+    }
+
+    handlers.completion_recorder.report_job_completion(
+        job_id,
+        {"records": [record]},
+        export={
+            "template": institution_data["template"],
+            "csv_headers": institution_data["csv_headers"],
+        },
+    )
+
+    body = aws.s3.get_object(
+        Bucket=os.environ["OUTPUT_BUCKET_NAME"], Key=f"completed_jobs/{job_id}.csv"
+    )["Body"].read()
+    header, row = csv.reader(io.StringIO(body.decode("utf-8")))
+
+    assert header == institution_data["csv_headers"]
+    assert row == CSV_ROWS[institution]
+
+
+def test_failed_job_not_exported(pipeline, handlers, aws, config):
+    """A failed job is archived and recorded, but has no CSV export."""
+
+    job_id, _ = pipeline.upload(batch_body(1))
+    institution_data = config["templates"][INSTITUTION]
+
+    handlers.completion_recorder.report_job_completion(
+        job_id,
+        {"error": "Processing did not complete."},
+        export={
+            "template": institution_data["template"],
+            "csv_headers": institution_data["csv_headers"],
+        },
+    )
+
+    keys = [
+        item["Key"]
+        for item in aws.s3.list_objects_v2(
+            Bucket=os.environ["OUTPUT_BUCKET_NAME"], Prefix=f"completed_jobs/{job_id}"
+        ).get("Contents", [])
+    ]
+    assert keys == [f"completed_jobs/{job_id}.json"]
+    item = aws.dynamodb.get_item(
+        TableName=os.environ["JOB_TABLE"], Key={"job_id": {"S": job_id}}
+    )["Item"]
+    assert item["status"]["S"] == "failed"
@@ -0,0 +1,87 @@
+import importlib
+import json
+import time
+
+from tests.stub_bedrock import StubBedrockServer
+
+
+def invoke(client) -> dict:
+    response = client.invoke_model(
+        modelId="benchmark",
+        body=json.dumps({"messages": [{"content": [{"text": "Classify."}]}]}),
+        contentType="application/json",
+        accept="application/json",
+    )
+    return json.loads(response["body"].read())
+
+
+def test_throttled_calls_retried_within_deadline(handlers):
+    """Throttled calls made with a deadline are retried with backoff, and
+    return before the deadline."""
+
+    deadline_module = importlib.import_module("deadline")
+    stub = StubBedrockServer(throttle_first=1).start()
+    try:
+        clients = deadline_module.TimeoutClients(
+            "bedrock-runtime", region_name="us-west-2", endpoint_url=stub.endpoint
+        )
+        deadline = deadline_module.Deadline(remaining_ms=20_000, reserve_ms=0)
+
+        start = time.monotonic()
+        response = invoke(clients.for_deadline(deadline))
+        elapsed = time.monotonic() - start
+    finally:
+        stub.stop()
+
+    assert response["content"][0]["text"] == "{}"
+    assert stub.throttle_count == 1 and stub.request_count == 2
+    assert elapsed < 20 and deadline.remaining() > 0
+
+
+def test_attempts_fit_in_time_left(handlers):
+    """Calls are attempted no more often than their read timeouts fit in the
+    time left, and deadlines share a handful of clients."""
+
+    deadline_module = importlib.import_module("deadline")
+    clients = deadline_module.TimeoutClients("dynamodb", region_name="us-west-2")
+
+    def retries(timeout: float) -> tuple[int, int]:
+        config = clients.get(timeout).meta.config
+        return config.read_timeout, config.retries["total_max_attempts"]
+
+    assert retries(1.5) == (1, 1)
+    assert retries(4) == (2, 2)
+    assert retries(20) == (10, 2)
+    assert retries(50) == (15, 3)
+    assert retries(600) == (60, 3)
+
+    for tenths in range(10, 900):
+        clients.get(tenths / 10)
+    assert len(clients.clients) <= 3 * len(deadline_module.TIMEOUT_BUCKETS)
+
+
+def test_slow_model_call_within_deadline(handlers, monkeypatch):
+    """A model call answered after 7 s succeeds within a 15 s invocation,
+    getting a single attempt with a read timeout of the time left."""
+
+    deadline_module = importlib.import_module("deadline")
+    model_backends = importlib.import_module("model_backends")
+    stub = StubBedrockServer(latency_ms=7000).start()
+    monkeypatch.setenv("AWS_ENDPOINT_URL_BEDROCK_RUNTIME", stub.endpoint)
+    try:
+        backend = model_backends.BedrockBackend()
+        deadline = deadline_module.Deadline(remaining_ms=15_000)
+        response = backend.invoke(
+            "benchmark",
+            {"messages": [{"content": [{"text": "Classify."}]}]},
+            deadline_module.remaining_time(deadline),
+        )
+    finally:
+        stub.stop()
+
+    assert response["content"][0]["text"] == "{}"
+    assert stub.request_count == 1
+    assert deadline.remaining() > 0
+
+    config = backend.clients.get(13.5).meta.config
+    assert (config.read_timeout, config.retries["total_max_attempts"]) == (13, 1)
@@ -0,0 +1,202 @@
+import importlib
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from tests.support import INSTITUTION, REPORT_TEXT, SerializedClient
+
+
+def scheduler(aws, table_name: str, **kwargs):
+    fair_share = importlib.import_module("fair_share")
+    return fair_share.FairShareScheduler(
+        SerializedClient(aws.dynamodb), table_name, poll_seconds=0.01, **kwargs
+    )
+
+
+def test_shares_and_caps(scheduler_table, aws):
+    """Shares split capacity by weight between active institutions, within
+    each institution's cap."""
+
+    fair_share = scheduler(
+        aws, scheduler_table, capacity=12, weights={"a": 2}, caps={"c": 2}
+    )
+    now = str(time.time())
+    item = {
+        "counts": {"M": {"a": {"N": "6"}, "b": {"N": "0"}}},
+        "waiting": {"M": {"b": {"N": now}}},
+    }
+
+    assert fair_share.share("a", {}) == 12
+    assert fair_share.share("a", item) == 8
+    assert fair_share.share("b", item) == 4
+    assert fair_share.share("c", {}) == 2
+
+    lock = threading.Lock()
+    in_flight = [0, 0]
+
+    def call(_):
+        with fair_share.slot("c"):
+            with lock:
+                in_flight[0] += 1
+                in_flight[1] = max(in_flight)
+            time.sleep(0.02)
+            with lock:
+                in_flight[0] -= 1
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(call, range(8)))
+
+    assert in_flight[1] <= 2
+
+
+def test_expired_leases_reclaimed(scheduler_table, aws):
+    """Slots held by calls that never released them are reclaimed once their
+    leases expire."""
+
+    fair_share = scheduler(aws, scheduler_table, capacity=1, lease_seconds=0)
+    fair_share.acquire("lost")
+    time.sleep(1)
+
+    lease_id = fair_share.acquire(INSTITUTION)
+    assert fair_share.release(INSTITUTION, lease_id)
+
+
+def test_waiting_callers_poll_with_reads(scheduler_table, aws):
+    """Callers waiting for a full pool poll it with reads rather than
+    failing conditional writes."""
+
+    calls = Counter()
+
+    class CountedClient(SerializedClient):
+        def __getattr__(self, name):
+            calls[name] += 1
+            return super().__getattr__(name)
+
+    fair_share = importlib.import_module("fair_share").FairShareScheduler(
+        CountedClient(aws.dynamodb),
+        scheduler_table,
+        capacity=1,
+        poll_seconds=0.01,
+        max_wait_seconds=1,
+    )
+    fair_share.acquire("holder")
+    calls.clear()
+
+    with pytest.raises(importlib.import_module("deadline").DeadlineExceeded):
+        fair_share.acquire(INSTITUTION)
+
+    assert calls["get_item"] >= 3
+    # The first attempt and marking the institution as waiting
+    assert calls["update_item"] <= 2
+
+
+def test_config(aws):
+    """Scheduler options are read from the [fair_share] config."""
+
+    fair_share = importlib.import_module("fair_share").FairShareScheduler.from_config(
+        aws.dynamodb,
+        "benchmark-scheduler",
+        {"capacity": 4, "lease_seconds": 60, "waiting_seconds": 5},
+    )
+
+    assert fair_share.capacity == 4
+    assert fair_share.lease_seconds == 60
+    assert fair_share.waiting_seconds == 5
+
+
+def test_model_calls_hold_slots(scheduler_table, aws, handlers, config, monkeypatch):
+    """Model calls of a job hold a slot of its institution's share."""
+
+    record_processor = handlers.record_processor
+    fair_share = importlib.import_module("fair_share")
+    monkeypatch.setattr(
+        record_processor, "model_scheduler", scheduler(aws, scheduler_table, capacity=2)
+    )
+    token = fair_share.current_institution.set(INSTITUTION)
+
+    seen = []
+    backend = record_processor.model_backend
+
+    class ObservedBackend:
+        def invoke(self, model_id, request_body, timeout=None):
+            item = aws.dynamodb.get_item(
+                TableName=scheduler_table, Key={"pool_id": {"S": "model-calls"}}
+            )["Item"]
+            seen.append(item["counts"]["M"][INSTITUTION]["N"])
+            return backend.invoke(model_id, request_body, timeout)
+
+    monkeypatch.setattr(record_processor, "model_backend", ObservedBackend())
+    try:
+        result = record_processor.process_audiology_data(
+            REPORT_TEXT, INSTITUTION, config
+        )
+    finally:
+        fair_share.current_institution.reset(token)
+
+    assert "output" in result
+    assert seen and all(held == "1" for held in seen)
+    item = aws.dynamodb.get_item(
+        TableName=scheduler_table, Key={"pool_id": {"S": "model-calls"}}
+    )["Item"]
+    assert item["counts"]["M"][INSTITUTION]["N"] == "0"
+
+
+@pytest.mark.parametrize("capacity, hedged", [(1, False), (2, True)])
+def test_hedges_hold_slots(scheduler_table, aws, handlers, capacity, hedged):
+    """A hedge takes a slot of its own alongside its call's, and is skipped
+    if none is free."""
+
+    fair_share = importlib.import_module("fair_share")
+    model_backends = importlib.import_module("model_backends")
+    fair_share_scheduler = scheduler(aws, scheduler_table, capacity=capacity)
+
+    def held() -> str:
+        item = aws.dynamodb.get_item(
+            TableName=scheduler_table, Key={"pool_id": {"S": "model-calls"}}
+        )["Item"]
+        return item["counts"]["M"][INSTITUTION]["N"]
+
+    class SlowBackend:
+        def invoke(self, model_id, request_body, timeout=None):
+            time.sleep(0.3)
+            return {"from": "primary"}
+
+    class HedgeBackend:
+        def __init__(self):
+            self.held = []
+
+        def invoke(self, model_id, request_body, timeout=None):
+            self.held.append(held())
+            return {"from": "hedge"}
+
+    alternate = HedgeBackend()
+    backend = model_backends.HedgedBackend(
+        SlowBackend(),
+        [(alternate, None)],
+        initial_delay_ms=50,
+        min_delay_ms=10,
+        max_hedge_rate=1,
+        window=10,
+        scheduler=fair_share_scheduler,
+    )
+
+    token = fair_share.current_institution.set(INSTITUTION)
+    try:
+        with fair_share.model_slot(fair_share_scheduler):
+            response = backend.invoke("model", {})
+    finally:
+        fair_share.current_institution.reset(token)
+
+    assert response == {"from": "hedge" if hedged else "primary"}
+    assert alternate.held == (["2"] if hedged else [])
+    assert backend.hedges == int(hedged)
+
+    # The hedge frees its slot once it finishes, just after answering
+    for _ in range(50):
+        if held() == "0":
+            break
+        time.sleep(0.01)
+    assert held() == "0"
@@ -0,0 +1,99 @@
+import importlib
+import json
+import os
+import sys
+
+import pytest
+
+from tests.support import batch_body
+
+INPUT_PREFIX = "dummy-input/raw/"
+OUTPUT_PREFIX = "dummy-input/batch/"
+
+
+@pytest.fixture
+def generate_dummy_input(handlers):
+    # Imports the record processor's prompts, like the deployed function
+    return importlib.import_module("scripts.generate_dummy_input")
+
+
+class PagedClient:
+    """
+    Passes calls to the client, listing objects a single key per page.
+    """
+
+    def __init__(self, client):
+        self.client = client
+        self.pages = 0
+
+    def get_paginator(self, operation_name):
+        paginator = self.client.get_paginator(operation_name)
+        client = self
+
+        class OneKeyPages:
+            def paginate(self, **kwargs):
+                for page in paginator.paginate(
+                    **kwargs, PaginationConfig={"PageSize": 1}
+                ):
+                    client.pages += 1
+                    yield page
+
+        return OneKeyPages()
+
+    def __getattr__(self, name):
+        return getattr(self.client, name)
+
+
+def test_paginated_generation(generate_dummy_input, aws, monkeypatch, capsys):
+    """Every JSON input file across the listing's pages gets a JSONL file of
+    batch inference records, one per patient with a report or results."""
+
+    bucket = os.environ["BUCKET_NAME"]
+    inputs = {
+        "first.json": batch_body(3),
+        "second.json": batch_body(2),
+        "empty.json": json.dumps([{"report": " ", "results": []}]),
+        "notes.txt": "Not an input file.",
+    }
+    for name, body in inputs.items():
+        aws.s3.put_object(Bucket=bucket, Key=INPUT_PREFIX + name, Body=body)
+
+    client = PagedClient(aws.s3)
+    monkeypatch.setattr(generate_dummy_input.boto3, "client", lambda service: client)
+    monkeypatch.setattr(
+        sys,
+        "argv",
+        [
+            "generate_dummy_input.py",
+            "--bucket",
+            bucket,
+            "--input-prefix",
+            INPUT_PREFIX,
+            "--output-prefix",
+            OUTPUT_PREFIX,
+            "--institution",
+            "CDC",
+            "--workers",
+            "2",
+        ],
+    )
+
+    generate_dummy_input.main()
+
+    assert client.pages == len(inputs)
+    assert "5 records in 2 files" in capsys.readouterr().out
+
+    outputs = aws.s3.list_objects_v2(Bucket=bucket, Prefix=OUTPUT_PREFIX)["Contents"]
+    assert sorted(item["Key"] for item in outputs) == [
+        OUTPUT_PREFIX + "first_cdc_batch.jsonl",
+        OUTPUT_PREFIX + "second_cdc_batch.jsonl",
+    ]
+
+    body = aws.s3.get_object(Bucket=bucket, Key=OUTPUT_PREFIX + "first_cdc_batch.jsonl")
+    records = [json.loads(line) for line in body["Body"].read().splitlines()]
+    assert [record["recordId"] for record in records] == [
+        "PAT00000001",
+        "PAT00000002",
+        "PAT00000003",
+    ]
+    assert all(record["modelInput"]["messages"] for record in records)
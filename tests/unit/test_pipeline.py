@@ -0,0 +1,67 @@
+import json
+import os
+
+from tests.support import CONFIG_ID, INSTITUTION, REPORT_TEXT
+
+
+def test_stage_metrics(pipeline, capsys):
+    """Each handler emits its stage metrics, tagged with the job's institution
+    and config ID, as embedded metric format lines."""
+
+    capsys.readouterr()
+    pipeline.run(REPORT_TEXT)
+
+    emitted = {}
+    for line in capsys.readouterr().out.splitlines():
+        if not line.startswith("{"):
+            continue
+        document = json.loads(line)
+        for directive in document.get("_aws", {}).get("CloudWatchMetrics", []):
+            for metric in directive["Metrics"]:
+                emitted[metric["Name"]] = document
+
+    for name in (
+        "DynamoDBGetItemDuration",
+        "S3GetObjectBytes",
+        "PromptBuildDuration",
+        "ModelInvokeDuration",
+        "ModelInputTokens",
+        "ModelOutputTokens",
+        "ModelOutputValid",
+    ):
+        assert name in emitted, name
+
+    assert emitted["ModelInvokeDuration"]["institution"] == INSTITUTION
+    assert emitted["ModelInvokeDuration"]["config_id"] == CONFIG_ID
+
+
+def test_token_usage_recorded(pipeline, aws):
+    """The model tokens a job used are recorded on its job record."""
+
+    job_id = pipeline.run(REPORT_TEXT)
+
+    item = aws.dynamodb.get_item(
+        TableName=os.environ["JOB_TABLE"], Key={"job_id": {"S": job_id}}
+    )["Item"]
+
+    assert int(item["input_tokens"]["N"]) > 0
+    assert int(item["output_tokens"]["N"]) > 0
+    assert item["model_calls"]["N"] == "1"
+    assert item["token_budget_exceeded"]["BOOL"] is False
+
+
+def test_restored_clients(pipeline, handlers):
+    """Jobs run with the clients recreated by the SnapStart after-restore hooks."""
+
+    stale = handlers.record_processor.dynamodb
+    for handler in (
+        handlers.api,
+        handlers.record_processor,
+        handlers.api_authorizer,
+        handlers.websocket_authorizer,
+    ):
+        handler.create_clients()
+
+    assert handlers.record_processor.dynamodb is not stale
+    job_id = pipeline.run(REPORT_TEXT)
+    assert job_id
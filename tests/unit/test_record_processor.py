@@ -0,0 +1,181 @@
+import importlib
+import json
+
+from tests.backends import (
+    CASCADE_CONFIG,
+    FAST_MODEL,
+    PACKING_CONFIG,
+    CascadeBackend,
+    PackingBackend,
+    normal_ears,
+)
+from tests.support import INSTITUTION, REPORT_TEXT, batch_body
+
+
+def test_replay_by_prompt(model_backends, fake_backend, handlers, config):
+    """Recorded responses are replayed for the prompt they were recorded for."""
+
+    institution = config["templates"][INSTITUTION]
+    prompt = handlers.record_processor.build_prompt(
+        REPORT_TEXT,
+        institution["template"],
+        institution.get("valid_values", {}),
+        institution["processing_rules"]["rules"],
+    )
+    request = handlers.record_processor.model_request(prompt, {})
+
+    fake_backend(
+        recordings=[
+            {
+                "prompt_sha256": model_backends.prompt_key(request),
+                "text": json.dumps({"recorded": True}),
+            }
+        ]
+    )
+
+    result = handlers.record_processor.process_audiology_data(
+        REPORT_TEXT, INSTITUTION, config
+    )
+
+    assert result == {"output": {"recorded": True}}
+
+
+def test_token_budget_stops_corrections(fake_backend, handlers, config):
+    """Once a job's token budget is used up, malformed output is not sent back
+    to the model for correction."""
+
+    backend = fake_backend(malformed_rate=1.0)
+    usage = handlers.record_processor.TokenUsage(budget=1)
+
+    result = handlers.record_processor.process_audiology_data(
+        REPORT_TEXT, INSTITUTION, config, usage=usage
+    )
+
+    assert "Token budget" in result["error"]
+    assert backend.calls == usage.model_calls == 1
+    assert usage.budget_exceeded and usage.total_tokens > 0
+
+
+def test_deadline_stops_corrections(fake_backend, handlers, config):
+    """Model calls aren't started without MIN_MODEL_CALL_SECONDS left before the
+    deadline, so a slow job ends with an error instead of a Lambda timeout."""
+
+    deadline_module = importlib.import_module("deadline")
+    backend = fake_backend(malformed_rate=1.0, latency="fixed:300")
+    # Time for the first call and one correction only
+    deadline = deadline_module.Deadline(
+        remaining_ms=(deadline_module.MIN_MODEL_CALL_SECONDS + 0.5) * 1000,
+        reserve_ms=0,
+    )
+
+    result = handlers.record_processor.process_audiology_data(
+        REPORT_TEXT, INSTITUTION, config, deadline=deadline
+    )
+
+    assert "Not enough time" in result["error"]
+    assert backend.calls == 2
+    assert deadline.exceeded and deadline.remaining() > 0
+
+
+def test_cascade_accepts_blank_fields(
+    model_backends, install_backend, handlers, config
+):
+    """Normal hearing, with the fields that don't apply left blank, is
+    accepted from the fast model rather than escalated."""
+
+    template = config["templates"]["MassEyeAndEar"]
+    output = normal_ears(template["template"])
+    assert not handlers.record_processor.validation_problems(
+        output, template["template"], template["valid_values"], ["Unknown"]
+    )
+
+    backend = install_backend(
+        model_backends.FakeBackend(default_text=json.dumps(output)),
+        CASCADE_CONFIG=CASCADE_CONFIG,
+    )
+
+    result = handlers.record_processor.process_audiology_data(
+        REPORT_TEXT, "MassEyeAndEar", config
+    )
+
+    assert result == {"output": output}
+    assert backend.calls == 1
+
+
+def test_cascade_escalates_invalid_values(install_backend, handlers, config):
+    """Values outside the institution's valid values are escalated."""
+
+    backend = install_backend(
+        CascadeBackend(
+            config["templates"][INSTITUTION]["template"],
+            fast_value="Hearing loss",
+            uncertain_every=1,
+        ),
+        CASCADE_CONFIG=CASCADE_CONFIG,
+    )
+
+    result = handlers.record_processor.process_audiology_data(
+        REPORT_TEXT, INSTITUTION, config
+    )
+
+    hearing_type = result["output"]["Attributes"]["Hearing Type"]
+    assert set(hearing_type.values()) == {"No hearing loss"}
+    assert backend.calls[FAST_MODEL] == 1
+
+
+def test_packing_fallback(install_backend, handlers, config):
+    """Records missing from a packed response are classified on their own."""
+
+    backend = install_backend(
+        PackingBackend(
+            config["templates"][INSTITUTION]["template"], skip=("PAT00000002",)
+        ),
+        PACKING_CONFIG=PACKING_CONFIG,
+    )
+    records = handlers.record_processor.parse_records(batch_body(3))
+
+    summary = handlers.record_processor.process_records(
+        "packing-fallback", records, INSTITUTION, config
+    )
+
+    assert summary["error_count"] == 0
+    assert backend.calls == 2
+
+
+def test_packing_validates_outputs(install_backend, handlers, config):
+    """Packed outputs with values outside the valid values are classified
+    on their own, and the rest are used as answered."""
+
+    backend = install_backend(
+        PackingBackend(
+            config["templates"][INSTITUTION]["template"], invalid=("PAT00000002",)
+        ),
+        PACKING_CONFIG=PACKING_CONFIG,
+    )
+    records = handlers.record_processor.parse_records(batch_body(3))
+
+    results = handlers.record_processor.classify_packed(records, INSTITUTION, config)
+
+    assert backend.calls == 2
+    for result in results:
+        hearing_type = result["output"]["Attributes"]["Hearing Type"]
+        assert set(hearing_type.values()) == {"No hearing loss"}
+
+
+def test_packing_accepts_blank_fields(install_backend, handlers, config):
+    """Packed normal-hearing results, with the fields that don't apply left
+    blank, are used as answered rather than classified one by one."""
+
+    template = config["templates"]["MassEyeAndEar"]["template"]
+    backend = install_backend(
+        PackingBackend(template, valid=normal_ears(template)),
+        PACKING_CONFIG=PACKING_CONFIG,
+    )
+    records = handlers.record_processor.parse_records(batch_body(3))
+
+    results = handlers.record_processor.classify_packed(
+        records, "MassEyeAndEar", config
+    )
+
+    assert backend.calls == 1
+    assert results == [{"output": normal_ears(template)}] * len(records)